@@ -5,6 +5,8 @@ from typing import Callable, Dict, Any, Optional, List
 
 from PySide6.QtCore import QObject, Signal
 
+from app.core.bus.executor import Lane
+
 @dataclass
 class BenchPlan:
     # 地址
@@ -22,7 +24,7 @@ class BenchPlan:
     recv_timeout_ms: int     # 可选接收等待（目前大多数命令不强制）
 
 class BenchWorker(QObject):
-    progress = Signal(dict)   # {sent, ok, err, last_ms, avg_ms, min_ms, max_ms}
+    progress = Signal(dict)   # {sent, ok, err, last_ms, avg_ms, min_ms, max_ms, bus_util_pct}
     finished = Signal(dict)   # {sent, ok, err, avg_ms, min_ms, max_ms, durations}
     log = Signal(str)
 
@@ -40,48 +42,40 @@ class BenchWorker(QObject):
         self._stop.set()
 
     # --- 任务映射 ---
+    def _task_args(self, i: int) -> tuple:
+        """任务 → (编译动作, 参数)。"""
+        p = self.plan
+        if p.task == "arc_fixed":
+            return "arc", (int(p.params.get("arc", 128)),)
+        if p.task == "arc_sweep":
+            lo = int(p.params.get("lo", 0))
+            hi = int(p.params.get("hi", 254))
+            step = max(1, int(p.params.get("step", 5)))
+            # 循环扫描：i 决定当前值
+            rng = hi - lo + 1
+            v = lo + ((i * step) % rng)
+            return "arc", (max(lo, min(hi, v)),)
+        if p.task == "scene_recall":
+            return "scene_recall", (int(p.params.get("scene", 0)),)
+        if p.task == "dt8_tc_fixed":
+            return "dt8_tc_kelvin", (int(p.params.get("kelvin", 4000)),)
+        if p.task == "dt8_xy_fixed":
+            return "dt8_xy", (float(p.params.get("x", 0.313)), float(p.params.get("y", 0.329)))
+        if p.task == "dt8_rgbw_fixed":
+            # rgbw_path: activate | primary，缺省按 ops.dt8_rgbw_mode
+            return "dt8_rgbw", (int(p.params.get("r", 0)), int(p.params.get("g", 0)),
+                                int(p.params.get("b", 0)), int(p.params.get("w", 0)),
+                                p.params.get("rgbw_path"))
+        raise ValueError(f"未知任务：{p.task}")
+
     def _send_once(self, i: int):
         p = self.plan
         t0 = time.perf_counter()
 
         try:
-            if p.task == "arc_fixed":
-                v = int(p.params.get("arc", 128))
-                self.ctrl.send_arc(p.mode, v, p.addr_val, p.unaddr)
-
-            elif p.task == "arc_sweep":
-                lo = int(p.params.get("lo", 0))
-                hi = int(p.params.get("hi", 254))
-                step = max(1, int(p.params.get("step", 5)))
-                # 循环扫描：i 决定当前值
-                rng = hi - lo + 1
-                v = lo + ((i * step) % rng)
-                v = max(lo, min(hi, v))
-                self.ctrl.send_arc(p.mode, v, p.addr_val, p.unaddr)
-
-            elif p.task == "scene_recall":
-                sc = int(p.params.get("scene", 0))
-                self.ctrl.scene_recall(p.mode, sc, p.addr_val, p.unaddr)
-
-            elif p.task == "dt8_tc_fixed":
-                k = int(p.params.get("kelvin", 4000))
-                self.ctrl.dt8_set_tc_kelvin(p.mode, k, p.addr_val, p.unaddr)
-
-            elif p.task == "dt8_xy_fixed":
-                x = float(p.params.get("x", 0.313))
-                y = float(p.params.get("y", 0.329))
-                self.ctrl.dt8_set_xy(p.mode, x, y, p.addr_val, p.unaddr)
-
-            elif p.task == "dt8_rgbw_fixed":
-                r = int(p.params.get("r", 0))
-                g = int(p.params.get("g", 0))
-                b = int(p.params.get("b", 0))
-                w = int(p.params.get("w", 0))
-                self.ctrl.dt8_set_rgbw(p.mode, r, g, b, w, p.addr_val, p.unaddr)
-
-            else:
-                raise ValueError(f"未知任务：{p.task}")
-
+            action, args = self._task_args(i)
+            # 同一任务的命令只在首次编译，之后命中编译缓存
+            self.ctrl.execute(self.ctrl.compile(action, p.mode, p.addr_val, p.unaddr, *args))
             ok = True
         except Exception as e:
             ok = False
@@ -102,21 +96,28 @@ class BenchWorker(QObject):
             "last_ms": dt_ms, "avg_ms": avg,
             "min_ms": min(self._durations) if self._durations else 0.0,
             "max_ms": max(self._durations) if self._durations else 0.0,
+            "bus_util_pct": self._bus_util(),
         })
 
+    def _bus_util(self) -> float:
+        fn = getattr(self.ctrl, "bus_utilisation", None)
+        return float(fn()) if callable(fn) else 0.0
+
     def run(self):
         p = self.plan
         interval = max(0.0, float(p.interval_ms) / 1000.0)
-        for i in range(p.total):
-            if self._stop.is_set():
-                break
-            start = time.perf_counter()
-            self._send_once(i)
-            # 节流到指定间隔
-            used = time.perf_counter() - start
-            remain = interval - used
-            if remain > 0:
-                time.sleep(remain)
+        # 压测流量走 bulk 通道：GUI/定时任务的命令可在两次发送之间插队
+        with self.ctrl.lane(Lane.BULK):
+            for i in range(p.total):
+                if self._stop.is_set():
+                    break
+                start = time.perf_counter()
+                self._send_once(i)
+                # 节流到指定间隔（interval_ms=0 时本来就不睡眠，节奏由总线配速 gateway.pacing 决定）
+                used = time.perf_counter() - start
+                remain = interval - used
+                if remain > 0:
+                    time.sleep(remain)
 
         avg = statistics.fmean(self._durations) if self._durations else 0.0
         self.finished.emit({
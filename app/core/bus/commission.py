@@ -0,0 +1,243 @@
+from __future__ import annotations
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .executor import Lane
+from .program import ProgramBuilder
+from .scan import ScanEngine
+
+# IEC 62386-102 特殊命令（地址字节）
+TERMINATE = 0xA1
+INITIALISE = 0xA5
+RANDOMISE = 0xA7
+COMPARE = 0xA9
+WITHDRAW = 0xAB
+SEARCHADDR_H = 0xB1
+SEARCHADDR_M = 0xB3
+SEARCHADDR_L = 0xB5
+PROGRAM_SHORT = 0xB7
+VERIFY_SHORT = 0xB9
+
+SEARCH_MAX = 0xFFFFFF
+
+
+@dataclass
+class PhaseStat:
+    frames: int = 0
+    queries: int = 0
+    ms: float = 0.0
+
+
+@dataclass
+class CommissionReport:
+    assigned: Dict[int, int] = field(default_factory=dict)     # short → 随机地址
+    phases: Dict[str, PhaseStat] = field(default_factory=dict)
+    compares: int = 0
+    search_frames_saved: int = 0
+    exhausted: bool = False                                     # 短址用完但仍有未分配设备
+    failed_verify: List[int] = field(default_factory=list)
+    researches: int = 0                                         # 校验落空后从 0 重新搜索的次数
+
+    @property
+    def frames(self) -> int:
+        return sum(p.frames for p in self.phases.values())
+
+    @property
+    def elapsed_ms(self) -> float:
+        return sum(p.ms for p in self.phases.values())
+
+    def summary(self) -> str:
+        parts = [f"{name}: {p.frames} 帧 / {p.ms:.0f} ms" for name, p in self.phases.items()]
+        return (f"分配 {len(self.assigned)} 台，COMPARE {self.compares} 次，"
+                f"共 {self.frames} 帧 / {self.elapsed_ms:.0f} ms（" + "；".join(parts) + "）")
+
+
+class Commissioner:
+    """随机地址分配：INITIALISE → RANDOMISE → 二分搜索 COMPARE → PROGRAM SHORT → WITHDRAW → TERMINATE。
+
+    二分搜索的优化：
+    - 每次找到的是剩余设备中最小的随机地址，之前所有 COMPARE=NO 的结论对下一台依然成立，
+      下一轮直接从上一台之后开始，不回到 0；
+    - 找到 ESTIMATE_AFTER 台以后，按已知设备的分布密度估计剩余台数，分割点取“剩余设备中最小
+      随机地址”的中位数而不是区间中点（满总线 64 台时平均每台约 21 次 COMPARE，普通二分约 26 次）；
+    - SEARCHADDR H/M/L 只发送与上一次不同的字节；设置搜索地址与 COMPARE 合并为一个帧程序，
+      每一步只有一次往返；
+    - COMPARE 无应答即为 NO，超时取配对层按实测往返时间给出的自适应值。
+    随机地址完全相同的两台设备会被编程为同一短址（透传网关无法识别冲突），需复位后重做。
+    """
+    ESTIMATE_AFTER = 4
+    VERIFY_TIMEOUT = 0.3
+
+    def __init__(self, ctrl, mode: str = "unaddressed", shorts: Iterable[int] | None = None,
+                 verify: bool = True, randomise_wait: float = 0.1):
+        if mode not in ("unaddressed", "all"):
+            raise ValueError("mode 必须是 'unaddressed' 或 'all'")
+        self.ctrl = ctrl
+        self.mode = mode
+        self.shorts = None if shorts is None else [int(s) for s in shorts]
+        self.verify = bool(verify)
+        self.randomise_wait = float(randomise_wait)
+        self._log = logging.getLogger("Commissioner")
+        self._search: List[Optional[int]] = [None, None, None]
+        self._report = CommissionReport()
+        self._phase_name = "init"
+
+    # ---------- 入口 ----------
+    def run(self, on_progress: Optional[Callable[[int, int], None]] = None,
+            stop: threading.Event | None = None) -> CommissionReport:
+        """执行分配；on_progress(short, random_addr) 每分配一台回调一次。"""
+        rep = self._report = CommissionReport()
+        self._search = [None, None, None]
+        pool = self._pool()
+        try:
+            with self._phase("initialise"):
+                data = 0x00 if self.mode == "all" else 0xFF
+                self._tx(ProgramBuilder("initialise").send(INITIALISE, data).send(INITIALISE, data))
+            with self._phase("randomise"):
+                self._tx(ProgramBuilder("randomise").send(RANDOMISE, 0).send(RANDOMISE, 0))
+                if self.randomise_wait > 0:
+                    time.sleep(self.randomise_wait)
+
+            lo = 0
+            retried: set[int] = set()
+            while not (stop is not None and stop.is_set()):
+                with self._phase("search"):
+                    found = self._find_lowest(lo, len(rep.assigned))
+                if found is None:
+                    break
+                if not pool:
+                    rep.exhausted = True
+                    break
+                short = pool.pop(0)
+                with self._phase("program"):
+                    ok = self._program(short)
+                    if not ok:
+                        ok = self._verify(short)
+                if not ok and found not in retried:
+                    # 搜索途中有 COMPARE 的 YES 迟到被当成 NO，下界越过了某台设备，
+                    # 这次的“最小地址”处并没有设备：短址放回，从 0 重新搜索
+                    retried.add(found)
+                    rep.researches += 1
+                    pool.insert(0, short)
+                    lo = 0
+                    continue
+                rep.assigned[short] = found
+                if not ok:
+                    rep.failed_verify.append(short)
+                if on_progress is not None:
+                    on_progress(short, found)
+                lo = found + 1
+        finally:
+            with self._phase("terminate"):
+                self._tx(ProgramBuilder("terminate").send(TERMINATE, 0))
+            # 短地址已改写，设备影子与扫描得到的在线设备集合全部作废
+            registry = getattr(self.ctrl, "registry", None)
+            if registry is not None:
+                registry.invalidate()
+            invalidate_population = getattr(self.ctrl, "invalidate_population", None)
+            if invalidate_population is not None:
+                invalidate_population()
+        self._log.info(rep.summary())
+        return rep
+
+    # ---------- 搜索 ----------
+    def _find_lowest(self, lo: int, found: int) -> Optional[int]:
+        """返回尚未撤出的设备中最小的随机地址（≥ lo）；没有则返回 None。"""
+        if lo > SEARCH_MAX or not self._compare(SEARCH_MAX):
+            return None
+        hi = SEARCH_MAX
+        m = self._estimate_remaining(lo, found)
+        while lo < hi:
+            mid = self._pivot(lo, hi, m)
+            if self._compare(mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        # hi 处 COMPARE 已确认为 YES；把搜索地址停在 hi，供 PROGRAM SHORT / WITHDRAW 使用
+        self._set_search(hi, ProgramBuilder("searchaddr"), flush=True)
+        return hi
+
+    @staticmethod
+    def _estimate_remaining(lo: int, found: int) -> float:
+        """按已找到设备在 [0, lo) 的密度外推 [lo, MAX] 内还剩几台；样本太少时按 1 台处理。"""
+        if found < Commissioner.ESTIMATE_AFTER or lo <= 0:
+            return 1.0
+        return max(1.0, found * (SEARCH_MAX - lo) / lo)
+
+    @staticmethod
+    def _pivot(lo: int, hi: int, m: float) -> int:
+        """取“剩余 m 台中最小随机地址”条件分布的中位数作为分割点；m=1 即普通二分。"""
+        if m <= 1.0:
+            return (lo + hi) // 2
+        span = SEARCH_MAX - lo + 1
+        q = 1.0 - (1.0 - (hi - lo + 1) / span) ** m        # P(最小值 ≤ hi)
+        x = span * (1.0 - (1.0 - q / 2.0) ** (1.0 / m))
+        return min(max(lo + int(x), lo), hi - 1)
+
+    def _compare(self, value: int) -> bool:
+        pb = ProgramBuilder("compare", timeout=None)
+        self._set_search(value, pb)
+        pb.query(COMPARE, 0)
+        self._report.compares += 1
+        return self._tx(pb)[0] is not None
+
+    def _set_search(self, value: int, pb: ProgramBuilder, flush: bool = False):
+        """只写入与缓存不同的 SEARCHADDR 字节。"""
+        for i, code in enumerate((SEARCHADDR_H, SEARCHADDR_M, SEARCHADDR_L)):
+            b = (value >> (16 - 8 * i)) & 0xFF
+            if self._search[i] == b:
+                self._report.search_frames_saved += 1
+                continue
+            pb.send(code, b)
+            self._search[i] = b
+        if flush and len(pb.build()):
+            self._tx(pb)
+
+    def _program(self, short: int) -> bool:
+        code = ((short & 0x3F) << 1) | 1
+        pb = ProgramBuilder("program_short", timeout=None).send(PROGRAM_SHORT, code)
+        if self.verify:
+            pb.query(VERIFY_SHORT, code)
+        pb.send(WITHDRAW, 0)
+        replies = self._tx(pb)
+        return (not self.verify) or replies[0] is not None
+
+    def _verify(self, short: int) -> bool:
+        """用固定的长超时再确认一次，避免自适应超时下的迟到应答被误判为短址空闲。"""
+        code = ((short & 0x3F) << 1) | 1
+        pb = ProgramBuilder("verify_short", timeout=self.VERIFY_TIMEOUT).query(VERIFY_SHORT, code)
+        return self._tx(pb)[0] is not None
+
+    # ---------- 工具 ----------
+    def _pool(self) -> List[int]:
+        if self.shorts is not None:
+            return sorted(set(s for s in self.shorts if 0 <= s < 64))
+        if self.mode == "all":
+            return list(range(64))
+        with self._phase("scan") as st:
+            used = set(self.ctrl.scan_devices())
+            st.frames += 64 + ScanEngine.PROBES
+            st.queries += 64 + ScanEngine.PROBES
+        return [s for s in range(64) if s not in used]
+
+    def _tx(self, pb: ProgramBuilder) -> List[bytes | None]:
+        prog = pb.build()
+        st = self._report.phases.setdefault(self._phase_name, PhaseStat())
+        st.frames += len(prog)
+        st.queries += len(prog.queries)
+        return self.ctrl.run_program(prog, Lane.BULK)
+
+    @contextmanager
+    def _phase(self, name: str):
+        prev, self._phase_name = self._phase_name, name
+        st = self._report.phases.setdefault(name, PhaseStat())
+        t0 = time.perf_counter()
+        try:
+            yield st
+        finally:
+            st.ms += (time.perf_counter() - t0) * 1000.0
+            self._phase_name = prev
@@ -0,0 +1,233 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from .dtr import SPECIAL_DTR2
+from .program import FrameProgram, ProgramBuilder
+from ..config import apply_ops_defaults
+from ..dali.frames import addr_broadcast, addr_group, addr_short
+
+
+@dataclass(frozen=True)
+class CompiledCommand:
+    """预编码的高层命令：帧程序 + 合并键 + 写入设备影子的 (字段, 值) + 返回给调用方的结果。"""
+    action: str
+    mode: str
+    addr_val: Optional[int]
+    unaddr: bool
+    program: FrameProgram
+    key: Optional[tuple] = None                       # 最后值生效的合并键；None 不合并
+    notes: Tuple[Tuple[str, Any], ...] = ()          # 组/场景命令为 (("group"|"scene", n),)
+    result: Tuple[Tuple[str, Any], ...] = ()
+
+    def result_dict(self) -> Dict[str, Any]:
+        return dict(self.result)
+
+
+class CommandCompiler:
+    """把 (action, 目标, 参数) 编译为不可变、已编码的 CompiledCommand，按 LRU 缓存。
+
+    地址字节、ops 查表、钳位与 Mirek/xy 换算都只在首次编译时做一次；
+    压测/定时任务的热循环命中缓存后只剩把现成的帧程序交给执行器。
+    ops 缺省项按 apply_ops_defaults 补齐（不修改调用方的配置）。
+    """
+    ACTIONS = ("arc", "scene_recall", "scene_remove", "scene_store_level", "group_add", "group_remove",
+               "dt8_tc_kelvin", "dt8_tc_mirek", "dt8_xy", "dt8_primary", "dt8_rgbw")
+
+    def __init__(self, ops: dict | None = None, tc_cfg: dict | None = None, maxsize: int = 1024):
+        self.ops = apply_ops_defaults(dict(ops or {}))
+        tc_cfg = tc_cfg or {}
+        self.kmin = int(tc_cfg.get("kelvin_min", 1700))
+        self.kmax = int(tc_cfg.get("kelvin_max", 8000))
+        self.compile = lru_cache(maxsize=maxsize)(self._compile)
+
+    def stats(self) -> Dict[str, int]:
+        info = self.compile.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+
+    def clear(self) -> None:
+        self.compile.cache_clear()
+
+    # ---------- 编译 ----------
+    def _compile(self, action: str, mode: str, addr_val: Optional[int], unaddr: bool,
+                 *args) -> CompiledCommand:
+        fn = getattr(self, "_c_" + action, None)
+        if fn is None:
+            raise ValueError(f"未知动作：{action}")
+        return fn(mode, None if addr_val is None else int(addr_val), bool(unaddr), *args)
+
+    @staticmethod
+    def address_byte(mode: str, addr_val: int | None, unaddr: bool, is_command: bool) -> int:
+        if mode == "broadcast":
+            return addr_broadcast(is_command=is_command, unaddressed=unaddr)
+        elif mode == "short":
+            if addr_val is None: raise ValueError("短地址缺失")
+            return addr_short(int(addr_val), is_command=is_command)
+        elif mode == "group":
+            if addr_val is None: raise ValueError("组地址缺失")
+            return addr_group(int(addr_val), is_command=is_command)
+        else:
+            raise ValueError("未知目标模式")
+
+    @staticmethod
+    def target_key(kind: str, mode: str, addr_val: int | None, unaddr: bool) -> tuple:
+        """合并键：(地址模式, 地址, 动作类别)；广播忽略 addr_val。"""
+        if mode == "broadcast":
+            return (mode, bool(unaddr), kind)
+        return (mode, None if addr_val is None else int(addr_val), kind)
+
+    def _cmd(self, action, mode, addr_val, unaddr, pb: ProgramBuilder, key_kind: str | None = None,
+             notes=(), result=()) -> CompiledCommand:
+        key = self.target_key(key_kind, mode, addr_val, unaddr) if key_kind else None
+        # 高层动作都是设定值（组/场景/亮度/颜色），重复执行结果相同
+        pb.idempotent = True
+        return CompiledCommand(action, mode, addr_val, unaddr, pb.build(), key, tuple(notes), tuple(result))
+
+    def _single(self, action, mode, addr_val, unaddr, opcode: int, notes=()) -> CompiledCommand:
+        a = self.address_byte(mode, addr_val, unaddr, is_command=True)
+        return self._cmd(action, mode, addr_val, unaddr, ProgramBuilder("command").send(a, opcode & 0xFF),
+                         notes=notes)
+
+    # ---------- ARC / 组 / 场景 ----------
+    def _c_arc(self, mode, addr_val, unaddr, value):
+        value = max(0, min(254, int(value)))
+        if mode == "short" and addr_val is None:
+            raise ValueError("短地址缺失")
+        if mode == "group" and addr_val is None:
+            raise ValueError("组地址缺失")
+        if mode not in ("broadcast", "short", "group"):
+            raise ValueError("未知地址模式")
+        a = self.address_byte(mode, addr_val, unaddr, is_command=False)
+        return self._cmd("arc", mode, addr_val, unaddr, ProgramBuilder("arc").send(a, value), "arc",
+                         notes=(("level", value),))
+
+    def _c_group_add(self, mode, addr_val, unaddr, group):
+        return self._single("group_add", mode, addr_val, unaddr,
+                            int(self.ops["add_to_group_base"]) + int(group), notes=(("group", int(group)),))
+
+    def _c_group_remove(self, mode, addr_val, unaddr, group):
+        return self._single("group_remove", mode, addr_val, unaddr,
+                            int(self.ops["remove_from_group_base"]) + int(group), notes=(("group", int(group)),))
+
+    def _c_scene_recall(self, mode, addr_val, unaddr, scene):
+        return self._single("scene_recall", mode, addr_val, unaddr,
+                            int(self.ops["recall_scene_base"]) + int(scene), notes=(("scene", int(scene)),))
+
+    def _c_scene_remove(self, mode, addr_val, unaddr, scene):
+        return self._single("scene_remove", mode, addr_val, unaddr,
+                            int(self.ops["remove_from_scene_base"]) + int(scene),
+                            notes=((f"scene:{int(scene) & 0x0F}", 255),))
+
+    def _c_scene_store_level(self, mode, addr_val, unaddr, scene, level):
+        """先写 DTR，再发送“将 DTR 保存为场景 scene”的命令。"""
+        ops = self.ops
+        write_dtr = int(ops["write_dtr"])
+        store_base = int(ops["store_dtr_as_scene_base"])
+        scene = int(scene) & 0x0F
+        level = max(0, min(254, int(level)))
+
+        a = self.address_byte(mode, addr_val, unaddr, is_command=False)
+        a_cmd = self.address_byte(mode, addr_val, unaddr, is_command=True)
+        pb = ProgramBuilder("scene_store_level")
+        # Step1: 写DTR（命令发给目标）
+        pb.send(a_cmd, write_dtr)
+        # Step2: 有的网关把“写DTR值”实现为“先ARC=level，再WRITE_DTR”；
+        # 为了兼容性，先把ARC调到目标值（不影响最终存档），再写入DTR命令一次
+        pb.send(a, level)          # 设ARC（S=0）
+        pb.send(a_cmd, write_dtr)  # 写DTR（S=1）
+        # Step3: 将DTR保存为场景
+        pb.send(a_cmd, (store_base + scene) & 0xFF)
+        return self._cmd("scene_store_level", mode, addr_val, unaddr, pb,
+                         notes=(("level", level), (f"scene:{scene}", level)))
+
+    # ---------- DT8 ----------
+    def _tc_frames(self, pb: ProgramBuilder, a: int, mirek: int) -> ProgramBuilder:
+        ops = self.ops
+        # 写 DTR0 / DTR1（特殊地址字节）→ 启用 DT8 → Set Temporary Colour Temperature Tc（寻址）
+        return (pb.send(int(ops["write_dtr0_addr"]) & 0xFF, mirek & 0xFF)
+                .send(int(ops["write_dtr1_addr"]) & 0xFF, (mirek >> 8) & 0xFF)
+                .send(int(ops["dt8_enable_addr"]) & 0xFF, 8)
+                .send(a, int(ops["dt8_set_tc_opcode"]) & 0xFF))
+
+    def _c_dt8_tc_kelvin(self, mode, addr_val, unaddr, kelvin):
+        k = max(self.kmin, min(self.kmax, int(kelvin)))
+        # Mirek = 1e6 / K ；范围 1..65534（0保留），四舍五入
+        mirek = max(1, min(65534, int(round(1_000_000 / float(k)))))
+        a = self.address_byte(mode, addr_val, unaddr, is_command=True)
+        return self._cmd("dt8_tc_kelvin", mode, addr_val, unaddr, self._tc_frames(ProgramBuilder("dt8_tc"), a, mirek),
+                         "dt8_tc", notes=(("colour:tc_mirek", mirek),),
+                         result=(("kelvin", k), ("mirek", mirek)))
+
+    def _c_dt8_tc_mirek(self, mode, addr_val, unaddr, mirek):
+        mirek = max(1, min(65534, int(mirek)))
+        a = self.address_byte(mode, addr_val, unaddr, is_command=True)
+        return self._cmd("dt8_tc_mirek", mode, addr_val, unaddr, self._tc_frames(ProgramBuilder("dt8_tc"), a, mirek),
+                         "dt8_tc", notes=(("colour:tc_mirek", mirek),),
+                         result=(("mirek", mirek), ("kelvin", int(round(1_000_000 / mirek)))))
+
+    def _c_dt8_xy(self, mode, addr_val, unaddr, x, y):
+        """xy*65535 → 16位；依次写 X、写 Y，每次：写 DTR0/1 -> Enable DT8 -> 对应 opcode（寻址）。"""
+        ops = self.ops
+        w_dtr0 = int(ops["write_dtr0_addr"]) & 0xFF
+        w_dtr1 = int(ops["write_dtr1_addr"]) & 0xFF
+        ena = int(ops["dt8_enable_addr"]) & 0xFF
+        a = self.address_byte(mode, addr_val, unaddr, is_command=True)
+        pb = ProgramBuilder("dt8_xy")
+        words = []
+        for v, opcode in ((x, ops["dt8_set_x_opcode"]), (y, ops["dt8_set_y_opcode"])):
+            n = max(0, min(65535, int(round(float(v) * 65535.0))))
+            words.append(n)
+            pb.send(w_dtr0, n & 0xFF).send(w_dtr1, (n >> 8) & 0xFF).send(ena, 8).send(a, int(opcode) & 0xFF)
+        return self._cmd("dt8_xy", mode, addr_val, unaddr, pb, "dt8_xy",
+                         notes=(("colour:x", words[0]), ("colour:y", words[1])),
+                         result=(("x_u16", words[0]), ("y_u16", words[1]), ("x", float(x)), ("y", float(y))))
+
+    def _primary_frames(self, pb: ProgramBuilder, mode, addr_val, unaddr, channel: str, level: int) -> int:
+        opcode = self.ops.get("dt8_set_primary", {}).get(channel)
+        if opcode is None:
+            raise ValueError(f"配置中未定义主色通道 '{channel}' 的 opcode")
+        level = max(0, min(254, int(level)))
+        a = self.address_byte(mode, addr_val, unaddr, is_command=True)
+        pb.send(int(self.ops["write_dtr0_addr"]) & 0xFF, level).send(int(self.ops["dt8_enable_addr"]) & 0xFF, 8)
+        pb.send(a, int(opcode) & 0xFF)
+        return level
+
+    def _c_dt8_primary(self, mode, addr_val, unaddr, channel, level):
+        channel = str(channel).lower()
+        pb = ProgramBuilder("dt8_primary")
+        level = self._primary_frames(pb, mode, addr_val, unaddr, channel, level)
+        return self._cmd("dt8_primary", mode, addr_val, unaddr, pb,
+                         notes=((f"colour:{channel}", level),),
+                         result=(("channel", channel), ("level", level)))
+
+    def _c_dt8_rgbw(self, mode, addr_val, unaddr, r, g, b, w, path, with_w=True):
+        """path="primary"：逐通道 Set Primary；"activate"：DTR0/1/2 装载临时值 + Activate（with_w=False 省去 WAF）。"""
+        ops = self.ops
+        if path == "primary":
+            pb = ProgramBuilder("dt8_rgbw")
+            vals = [(ch, self._primary_frames(pb, mode, addr_val, unaddr, ch, v))
+                    for ch, v in (("r", r), ("g", g), ("b", b), ("w", w))]
+            # 四个通道作为一个程序下发，中途不会被其它调用方的 DTR 写入打断
+            return self._cmd("dt8_rgbw", mode, addr_val, unaddr, pb, "dt8_rgbw",
+                             notes=tuple((f"colour:{ch}", v) for ch, v in vals), result=tuple(vals))
+        if path != "activate":
+            raise ValueError(f"未知的 RGBW 下发方式 '{path}'")
+
+        vals = [(ch, max(0, min(254, int(v)))) for ch, v in (("r", r), ("g", g), ("b", b), ("w", w))]
+        v = dict(vals)
+        w_dtr0 = int(ops["write_dtr0_addr"]) & 0xFF
+        w_dtr1 = int(ops["write_dtr1_addr"]) & 0xFF
+        ena = int(ops["dt8_enable_addr"]) & 0xFF
+        a = self.address_byte(mode, addr_val, unaddr, is_command=True)
+        pb = ProgramBuilder("dt8_rgbw")
+        pb.send(w_dtr0, v["r"]).send(w_dtr1, v["g"]).send(SPECIAL_DTR2, v["b"])
+        pb.send(ena, 8).send(a, int(ops["dt8_set_temp_rgb_opcode"]) & 0xFF)
+        if with_w:
+            # A/F 通道写 MASK（255）保持不变
+            pb.send(w_dtr0, v["w"]).send(w_dtr1, 0xFF).send(SPECIAL_DTR2, 0xFF)
+            pb.send(ena, 8).send(a, int(ops["dt8_set_temp_waf_opcode"]) & 0xFF)
+        pb.send(ena, 8).send(a, int(ops["dt8_activate_opcode"]) & 0xFF)
+        # 省去 W 的程序用单独的合并键：不能取代尚未执行、带着新 W 值的程序
+        return self._cmd("dt8_rgbw", mode, addr_val, unaddr, pb, "dt8_rgbw" if with_w else "dt8_rgb",
+                         notes=tuple((f"colour:{ch}", x) for ch, x in vals), result=tuple(vals))
@@ -0,0 +1,83 @@
+from __future__ import annotations
+import time
+import threading
+from typing import Callable, Dict, Optional
+
+SPECIAL_DTR2 = 0xC5
+
+
+class DtrShadow:
+    """总线级 DTR0/1/2 影子：记录本机最后写入的值，跳过可证明冗余的 DTR 写入。
+
+    DTR 写入是广播特殊命令，所有装置同时收到，因此总线上只有一份“当前值”。
+    由 BusExecutor 在执行线程内逐帧调用 admit()，看到的顺序就是上总线的顺序：
+    - DTR 写入：值与影子相同且未过期 → 省略；否则照发并更新影子；
+    - ARC、DT8 启用、已知不改 DTR 的寻址命令（查询、场景回放、组增删、DT8 设置等）不影响影子；
+    - 其它寻址命令（如 write_dtr 把当前亮度写入 DTR0）和其它特殊命令一律作废影子；
+    - ttl 秒后影子过期，兜底总线上其它主机或重新上电的装置改写 DTR；ttl<=0 关闭省略。
+    重连、原始帧、发送异常由调用方 invalidate()。
+    """
+
+    def __init__(self, ops: dict, ttl: float = 2.0, clock: Callable[[], float] = time.monotonic):
+        self.ttl = float(ttl)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._regs: Dict[int, int] = {
+            int(ops.get("write_dtr0_addr", 163)) & 0xFF: 0,
+            int(ops.get("write_dtr1_addr", 195)) & 0xFF: 1,
+            SPECIAL_DTR2: 2,
+        }
+        self._enable = int(ops.get("dt8_enable_addr", 193)) & 0xFF
+        self._safe = self._safe_opcodes(ops)
+        self._vals: list[Optional[int]] = [None, None, None]
+        self._ts: list[float] = [0.0, 0.0, 0.0]
+        self.counters: Dict[str, int] = {"elided": 0, "invalidations": 0}
+
+    @staticmethod
+    def _safe_opcodes(ops: dict) -> frozenset:
+        safe = set(range(0, 32))                                    # 关灯/调光步进/最大最小等
+        for key in ("recall_scene_base", "store_dtr_as_scene_base", "remove_from_scene_base",
+                    "add_to_group_base", "remove_from_group_base", "query_scene_level_base"):
+            base = int(ops.get(key, -100))
+            safe.update(range(base, base + 16))
+        for key in ("query_status", "query_groups_0_7", "query_groups_8_15", "query_actual_level",
+                    "dt8_set_tc_opcode", "dt8_set_x_opcode", "dt8_set_y_opcode"):
+            if key in ops:
+                safe.add(int(ops[key]))
+        safe.update(int(v) for v in (ops.get("dt8_set_primary") or {}).values())
+        return frozenset(v & 0xFF for v in safe)
+
+    def admit(self, frame: bytes, elide: bool = True) -> bool:
+        """登记一帧；返回 False 表示该帧是冗余的 DTR 写入，可以不发。"""
+        a, d = frame[0], frame[1]
+        with self._lock:
+            reg = self._regs.get(a)
+            if reg is not None:
+                now = self._clock()
+                if (elide and self.ttl > 0 and self._vals[reg] == d
+                        and now - self._ts[reg] <= self.ttl):
+                    self.counters["elided"] += 1
+                    return False
+                self._vals[reg] = d
+                self._ts[reg] = now
+                return True
+            if a == self._enable:
+                return True
+            if 0xA0 <= a <= 0xFB and a & 1:
+                self._clear()                                       # 其它特殊命令
+            elif a & 1 and d not in self._safe:
+                self._clear()                                       # 可能改写 DTR 的寻址命令
+            return True
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def _clear(self) -> None:
+        if any(v is not None for v in self._vals):
+            self.counters["invalidations"] += 1
+        self._vals = [None, None, None]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
@@ -0,0 +1,357 @@
+from __future__ import annotations
+import time
+import queue
+import logging
+import threading
+import itertools
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from .dtr import DtrShadow
+from .program import FrameProgram
+from .reconnect import LinkSupervisor
+from ..transport.base import ConnectionLost
+from ..analysis.stats import compute_stats
+
+
+class Lane(IntEnum):
+    """优先级通道：数值越小越先执行。"""
+    INTERACTIVE = 0   # GUI 操作（滑条、按钮）
+    SCHEDULED = 1     # 定时任务
+    BULK = 2          # 压测、扫描、批量读写
+
+    @classmethod
+    def parse(cls, v: "Lane | str | int") -> "Lane":
+        if isinstance(v, str):
+            return cls[v.upper()]
+        return cls(int(v))
+
+
+@dataclass
+class _Job:
+    future: Future
+    program: Optional[FrameProgram] = None
+    call: Optional[Callable[[], Any]] = None
+    lane: Lane = Lane.INTERACTIVE
+    key: Optional[Hashable] = None
+    superseded: bool = False
+    submitted: float = field(default_factory=time.perf_counter)
+    seq: int = 0              # 入队序号：断线挂起的程序重连后按原序号回到队列
+    started: bool = False
+    replays: int = 0
+
+
+def _follow(target: Future, source: Future):
+    """把 source 的结果复制到被合并掉的 target 上。"""
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+        return
+    try:
+        exc = source.exception()
+        if exc is not None:
+            target.set_exception(exc)
+        else:
+            target.set_result(source.result())
+    except Exception:
+        pass
+
+
+class BusExecutor:
+    """单写者总线执行器：独占 link（QueryCorrelator/Transport），串行执行帧程序。
+
+    - 任意线程 submit() 帧程序并拿到 Future；同一程序内的多帧不会被其它调用方插入；
+    - 按 Lane 分优先级：每个程序执行完后都重新挑选最高优先级的任务，
+      因此批量流量只在程序边界让路，交互命令最多等待一个在途程序；
+    - submit(key=...) 做“最后值生效”合并：同 key 尚未开始执行的程序被新程序取代，
+      新程序排到队尾（保持与其它命令的先后关系），旧 Future 跟随新程序的结果；
+    - submit_call() 在执行线程内运行连接/断开等控制操作，避免与在途程序交错；
+    - stats() 汇总队列深度、排队等待与服务时间，是总线侧唯一的计量点；
+    - 给出 dtr 时逐帧经 DtrShadow 过滤，按实际上总线的顺序省略冗余的 DTR 写入；
+    - 程序内相邻的非查询帧经 send_many 整段写出，stats() 计 batches/batched_frames；
+    - 给出 supervisor 时，链路断开（ConnectionLost）期间的程序挂起在有界队列里（held），
+      中途失败的幂等程序一并挂起、重连后重放（replayed，最多 REPLAY_LIMIT 次），
+      队列满或非幂等程序中途失败时以 ConnectionLost 结束（dropped/failed）。
+    """
+    REPLAY_LIMIT = 3
+
+    def __init__(self, link, name: str = "bus", history: int = 512, dtr: DtrShadow | None = None,
+                 supervisor: LinkSupervisor | None = None):
+        self._link = link
+        self.dtr = dtr
+        self.supervisor = supervisor
+        self._held: deque[_Job] = deque()
+        self.name = name
+        self._q: "queue.PriorityQueue[tuple[int, int, _Job | None]]" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._log = logging.getLogger(f"BusExecutor[{name}]")
+        self._service_ms: deque[float] = deque(maxlen=history)
+        self._wait_ms: deque[float] = deque(maxlen=history)
+        self._lane_wait_ms: Dict[Lane, deque[float]] = {ln: deque(maxlen=history) for ln in Lane}
+        self._lane_depth: Dict[Lane, int] = {ln: 0 for ln in Lane}
+        self._counts: Dict[str, int] = {
+            "submitted": 0, "executed": 0, "failed": 0, "frames": 0,
+            "coalesced": 0, "frames_saved": 0, "dtr_elided": 0,
+            "batches": 0, "batched_frames": 0, "held": 0, "replayed": 0, "dropped": 0,
+        }
+        self._pending_keys: Dict[Hashable, _Job] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name=f"bus-{name}", daemon=True)
+        self._thread.start()
+
+    # ---------- 提交 ----------
+    def submit(self, program: FrameProgram, lane: Lane = Lane.INTERACTIVE,
+               key: Hashable | None = None) -> Future:
+        return self._enqueue(_Job(Future(), program=program, lane=Lane.parse(lane), key=key))
+
+    def submit_call(self, fn: Callable[[], Any], lane: Lane = Lane.INTERACTIVE) -> Future:
+        return self._enqueue(_Job(Future(), call=fn, lane=Lane.parse(lane)))
+
+    def run(self, program: FrameProgram, lane: Lane = Lane.INTERACTIVE,
+            timeout: float | None = None, key: Hashable | None = None) -> List[bytes | None]:
+        """提交并等待结果；在执行线程内调用时直接内联执行，避免自锁。"""
+        if threading.current_thread() is self._thread:
+            return self._execute(program)
+        return self.submit(program, lane, key=key).result(timeout)
+
+    def call(self, fn: Callable[[], Any], timeout: float | None = None) -> Any:
+        if threading.current_thread() is self._thread:
+            return fn()
+        return self.submit_call(fn).result(timeout)
+
+    def _enqueue(self, job: _Job) -> Future:
+        if self._closed:
+            raise RuntimeError("BusExecutor closed")
+        with self._lock:
+            self._counts["submitted"] += 1
+            self._lane_depth[job.lane] += 1
+            if job.key is not None:
+                old = self._pending_keys.get(job.key)
+                if old is not None:
+                    # 旧程序尚未出队：作废并让其 Future 跟随新程序
+                    old.superseded = True
+                    self._lane_depth[old.lane] -= 1
+                    self._counts["coalesced"] += 1
+                    self._counts["frames_saved"] += len(old.program) if old.program else 0
+                    job.future.add_done_callback(lambda f, o=old.future: _follow(o, f))
+                self._pending_keys[job.key] = job
+            job.seq = next(self._seq)
+        self._q.put((int(job.lane), job.seq, job))
+        return job.future
+
+    # ---------- 断线挂起 ----------
+    def _hold(self, job: _Job) -> None:
+        sup = self.supervisor
+        with self._lock:
+            full = len(self._held) >= sup.queue_max
+            if full:
+                self._counts["dropped"] += 1
+            else:
+                self._held.append(job)
+                self._counts["held"] += 1
+        if full and not job.future.done():
+            job.future.set_exception(ConnectionLost("链路断开，等待队列已满"))
+
+    def release_held(self) -> int:
+        """链路恢复后把挂起的程序按原序号放回队列，返回数量。"""
+        with self._lock:
+            jobs = list(self._held)
+            self._held.clear()
+            for job in jobs:
+                self._lane_depth[job.lane] += 1
+        for job in jobs:
+            self._q.put((int(job.lane), job.seq, job))
+        return len(jobs)
+
+    def resume(self, prepare: Callable[[], None] | None = None) -> int:
+        """重连成功后调用（supervisor.on_up）：在执行线程内依次 prepare()、标记链路恢复、放行挂起的程序。
+        期间执行线程被占用，不会有程序上总线；之后提交的程序序号更大，排在挂起的程序之后。返回放行数量。"""
+        def _resume() -> int:
+            if prepare is not None:
+                prepare()
+            self.supervisor.mark_up()
+            return self.release_held()
+        return self.call(_resume)
+
+    def expire_held(self, max_age: float) -> int:
+        """结束挂起超过 max_age 秒（自提交起）的程序，返回数量。"""
+        now = time.perf_counter()
+        with self._lock:
+            old = [j for j in self._held if now - j.submitted > max_age]
+            for job in old:
+                self._held.remove(job)
+            self._counts["dropped"] += len(old)
+        for job in old:
+            if not job.future.done():
+                job.future.set_exception(ConnectionLost("链路断开，等待重连超时"))
+        return len(old)
+
+    def fail_held(self, exc: BaseException | None = None) -> int:
+        """手动断开/关闭时结束全部挂起的程序，返回数量。"""
+        with self._lock:
+            jobs = list(self._held)
+            self._held.clear()
+            self._counts["dropped"] += len(jobs)
+        for job in jobs:
+            if not job.future.done():
+                job.future.set_exception(exc or ConnectionLost("链路已断开"))
+        return len(jobs)
+
+    # ---------- 统计 ----------
+    def queue_depth(self, lane: Lane | None = None) -> int:
+        with self._lock:
+            if lane is not None:
+                return self._lane_depth[Lane.parse(lane)]
+            return sum(self._lane_depth.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._counts)
+            service = list(self._service_ms)
+            wait = list(self._wait_ms)
+        out["queue_depth"] = self.queue_depth()
+        with self._lock:
+            out["held_now"] = len(self._held)
+        for ln in Lane:
+            key = ln.name.lower()
+            out[f"queue_depth_{key}"] = self.queue_depth(ln)
+            with self._lock:
+                lw = list(self._lane_wait_ms[ln])
+            if lw:
+                out[f"wait_p95_ms_{key}"] = compute_stats(key, lw).p95_ms
+        if service:
+            s = compute_stats("service", service)
+            out.update(service_mean_ms=s.mean_ms, service_p95_ms=s.p95_ms, service_max_ms=s.max_ms)
+        if wait:
+            w = compute_stats("wait", wait)
+            out.update(wait_mean_ms=w.mean_ms, wait_p95_ms=w.p95_ms, wait_max_ms=w.max_ms)
+        return out
+
+    def close(self, timeout: float = 2.0):
+        if self._closed:
+            return
+        self._closed = True
+        # 关闭哨兵排在所有通道之后，已排队的任务仍会执行完
+        self._q.put((len(Lane), next(self._seq), None))
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+    # ---------- 执行线程 ----------
+    def _loop(self):
+        while True:
+            _prio, _seq, job = self._q.get()
+            if job is None:
+                break
+            with self._lock:
+                if job.superseded:
+                    continue
+                self._lane_depth[job.lane] -= 1
+                if job.key is not None and self._pending_keys.get(job.key) is job:
+                    del self._pending_keys[job.key]
+            sup = self.supervisor
+            if job.program is not None and sup is not None and sup.is_down():
+                if job.started or not job.future.cancelled():
+                    self._hold(job)
+                continue
+            if not job.started:
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                job.started = True
+            t0 = time.perf_counter()
+            try:
+                if job.program is not None:
+                    result = self._execute(job.program)
+                else:
+                    result = job.call()
+            except ConnectionLost as exc:
+                if sup is not None and sup.state != sup.IDLE:
+                    sup.mark_down(exc)
+                    if job.program is not None and job.program.idempotent and job.replays < self.REPLAY_LIMIT:
+                        # 中途断线的幂等程序：重连后从头重放
+                        job.replays += 1
+                        with self._lock:
+                            self._counts["replayed"] += 1
+                        self._hold(job)
+                        continue
+                with self._lock:
+                    self._counts["failed"] += 1
+                job.future.set_exception(exc)
+            except BaseException as exc:
+                with self._lock:
+                    self._counts["failed"] += 1
+                self._log.debug("job failed: %r", exc)
+                job.future.set_exception(exc)
+            else:
+                job.future.set_result(result)
+            t1 = time.perf_counter()
+            with self._lock:
+                self._counts["executed"] += 1
+                self._wait_ms.append((t0 - job.submitted) * 1000.0)
+                self._lane_wait_ms[job.lane].append((t0 - job.submitted) * 1000.0)
+                self._service_ms.append((t1 - t0) * 1000.0)
+        # 关闭时丢弃剩余任务
+        while True:
+            try:
+                _prio, _seq, job = self._q.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None and not job.superseded and (job.started or job.future.set_running_or_notify_cancel()):
+                job.future.set_exception(RuntimeError("BusExecutor closed"))
+        self.fail_held(RuntimeError("BusExecutor closed"))
+
+    def _execute(self, program: FrameProgram) -> List[bytes | None]:
+        replies: List[bytes | None] = []
+        queries = set(program.queries)
+        dtr = self.dtr
+        elide = dtr is not None and not program.raw
+        sent = elided = batches = batched = 0
+        # 相邻的非查询帧攒成一段连续缓冲，查询前与程序末尾整段写出；
+        # 配对层允许多条查询在途（批量封包）时，相邻的查询也攒起来一起发
+        pending = bytearray()
+        asks: List[bytes] = []
+        multi = getattr(self._link, "window", 1) > 1
+        try:
+            for i in range(len(program)):
+                frame = program.frame(i)
+                if dtr is not None and not dtr.admit(frame, elide=elide and i not in queries):
+                    elided += 1
+                    continue
+                sent += 1
+                if i in queries:
+                    if pending:
+                        batches += 1
+                        batched += self._link.send_many(pending)
+                        pending = bytearray()
+                    if multi:
+                        asks.append(frame)
+                    else:
+                        replies.append(self._link.query(frame, timeout=program.timeout))
+                else:
+                    if asks:
+                        replies.extend(self._link.query_many(asks, timeout=program.timeout))
+                        asks = []
+                    pending += frame
+            if asks:
+                replies.extend(self._link.query_many(asks, timeout=program.timeout))
+            if pending:
+                batches += 1
+                batched += self._link.send_many(pending)
+        except BaseException:
+            # 不确定哪些帧已经上了总线
+            if dtr is not None:
+                dtr.invalidate()
+            raise
+        finally:
+            with self._lock:
+                self._counts["frames"] += sent
+                self._counts["dtr_elided"] += elided
+                self._counts["batches"] += batches
+                self._counts["batched_frames"] += batched
+        if program.raw and dtr is not None:
+            dtr.invalidate()
+        return replies
@@ -0,0 +1,141 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .program import FrameProgram, ProgramBuilder
+from ..dali.frames import addr_broadcast, addr_group, addr_short
+
+
+@dataclass(frozen=True)
+class PlannedFrame:
+    mode: str                 # broadcast | group | short
+    addr: Optional[int]       # 组号 / 短址；广播为 None
+    level: int
+
+    def addr_byte(self) -> int:
+        if self.mode == "broadcast":
+            return addr_broadcast(is_command=False)
+        if self.mode == "group":
+            return addr_group(int(self.addr), is_command=False)
+        return addr_short(int(self.addr), is_command=False)
+
+
+@dataclass
+class LevelPlan:
+    frames: List[PlannedFrame] = field(default_factory=list)
+    naive: int = 0            # 逐设备逐帧下发所需帧数
+    skipped: int = 0          # 已知已在目标亮度而省去的设备数
+
+    @property
+    def saved(self) -> int:
+        return self.naive - len(self.frames)
+
+    def program(self, label: str = "apply_levels") -> FrameProgram:
+        pb = ProgramBuilder(label, idempotent=True)
+        for f in self.frames:
+            pb.send(f.addr_byte(), f.level)
+        return pb.build()
+
+
+def plan_levels(targets: Mapping[int, int], memberships: Mapping[int, int],
+                current: Mapping[int, int] | None = None,
+                population: Iterable[int] | None = None) -> LevelPlan:
+    """为 {short: level} 求一组近似最少的 ARC 前向帧（按列表顺序发送，后发覆盖先发）。
+
+    population 为总线上全部在线短址（None 表示未知），memberships 为已知的 {short: 16 位组位图}：
+    - 在线设备未知时只用短址帧；
+    - 广播要求全部在线设备都在 targets 里；组要求全部在线设备的组位图都已知、且该组成员都在 targets 里，
+      保证不会改动调用方没有提到的设备；
+    - 贪心：每一步选“使亮度正确的设备数净增最多”的 (广播/组, 亮度)，净增不足 2 台时停止
+      （再用一帧组命令不比逐台修正划算），剩余不正确的设备逐台用短址修正；
+    - current 为已知的当前亮度，已在目标值的设备不再计入修正。
+    """
+    want = {int(s): max(0, min(254, int(v))) for s, v in targets.items()}
+    state: Dict[int, Optional[int]] = {s: (None if current is None else current.get(s)) for s in want}
+    plan = LevelPlan(naive=len(want))
+
+    scopes: List[Tuple[str, Optional[int], List[int]]] = []
+    online = None if population is None else {int(s) for s in population}
+    if want and online is not None and online <= set(want):
+        scopes.append(("broadcast", None, sorted(want)))
+    if online is not None and all(s in memberships for s in online):
+        for g in range(16):
+            members = sorted(s for s, m in memberships.items() if (int(m) >> g) & 1)
+            if members and all(s in want for s in members):
+                scopes.append(("group", g, members))
+
+    while True:
+        best = None
+        for mode, addr, members in scopes:
+            for level in sorted({want[s] for s in members}):
+                gain = 0
+                for s in members:
+                    if state[s] == want[s]:
+                        gain -= level != want[s]
+                    else:
+                        gain += level == want[s]
+                if gain >= 2 and (best is None or gain > best[0]):
+                    best = (gain, mode, addr, members, level)
+        if best is None:
+            break
+        _, mode, addr, members, level = best
+        plan.frames.append(PlannedFrame(mode, addr, level))
+        for s in members:
+            state[s] = level
+
+    for s in sorted(want):
+        if state[s] != want[s]:
+            plan.frames.append(PlannedFrame("short", s, want[s]))
+    if current is not None:
+        plan.skipped = sum(1 for s in want if current.get(s) == want[s])
+    return plan
+
+
+@dataclass
+class Dt8Plan:
+    frames: List[Tuple[int, int]] = field(default_factory=list)
+    naive: int = 0            # 每个目标各自写 DTR + 启用 + 设置所需帧数
+    targets: int = 0
+
+    @property
+    def saved(self) -> int:
+        return self.naive - len(self.frames)
+
+    def program(self, label: str = "dt8_batch") -> FrameProgram:
+        return ProgramBuilder(label, idempotent=True).extend(self.frames).build()
+
+
+def plan_dt8(steps: List[Tuple[int, int, int, Optional[int]]], ops: Mapping) -> Dt8Plan:
+    """把多目标的 DT8 设置合并为一个帧序列。
+
+    steps 为 (地址字节, opcode, dtr0, dtr1 或 None)。DTR 写入是广播特殊命令，
+    同一 (opcode, DTR 值) 的目标共用一次 DTR 写入，之后每个目标只发“启用 DT8 + 设置”；
+    按 (opcode, dtr1, dtr0) 排序，相邻分组 DTR1 相同时不再重写。
+    同一目标的不同 opcode（如先 X 后 Y）保持 opcode 首次出现的先后顺序。
+    """
+    w_dtr0 = int(ops.get("write_dtr0_addr", 163)) & 0xFF
+    w_dtr1 = int(ops.get("write_dtr1_addr", 195)) & 0xFF
+    ena = int(ops.get("dt8_enable_addr", 193)) & 0xFF
+    plan = Dt8Plan(targets=len({a for a, _, _, _ in steps}))
+    order: Dict[int, int] = {}
+    buckets: Dict[Tuple[int, int, int], List[int]] = {}
+    for a, opcode, d0, d1 in steps:
+        order.setdefault(opcode, len(order))
+        key = (opcode, -1 if d1 is None else d1, d0)
+        targets = buckets.setdefault(key, [])
+        if a not in targets:
+            targets.append(a)
+        plan.naive += (3 if d1 is None else 4)
+
+    last0 = last1 = None
+    for (opcode, d1, d0) in sorted(buckets, key=lambda k: (order[k[0]], k[1], k[2])):
+        if d1 >= 0 and d1 != last1:
+            plan.frames.append((w_dtr1, d1))
+            last1 = d1
+        if d0 != last0:
+            plan.frames.append((w_dtr0, d0))
+            last0 = d0
+        for a in buckets[(opcode, d1, d0)]:
+            plan.frames.append((ena, 8))
+            plan.frames.append((a, opcode & 0xFF))
+    return plan
@@ -0,0 +1,61 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+
+from ..dali.frames import make_forward_frame
+
+
+@dataclass(frozen=True)
+class FrameProgram:
+    """原子帧程序：一组必须连续上总线、不可被其它调用方插入的前向帧。
+
+    frames 为连续的 2 字节前向帧；queries 标记需要等待后向帧的帧序号，
+    执行结果为按 queries 顺序排列的应答列表（无应答为 None）。
+    timeout=None 表示由配对层按实测往返时间自适应。
+    raw=True 表示原样下发：执行器不省略其中的 DTR 写入，执行后作废 DTR 影子。
+    idempotent=True 表示重复执行结果相同（设定值、查询）：断线时中途失败的程序可在重连后重放。
+    """
+    frames: bytes
+    queries: Tuple[int, ...] = ()
+    timeout: Optional[float] = 0.3
+    label: str = ""
+    raw: bool = False
+    idempotent: bool = False
+
+    def __len__(self) -> int:
+        return len(self.frames) // 2
+
+    def frame(self, i: int) -> bytes:
+        return self.frames[2 * i:2 * i + 2]
+
+    def pairs(self) -> List[Tuple[int, int]]:
+        f = self.frames
+        return [(f[i], f[i + 1]) for i in range(0, len(f), 2)]
+
+
+@dataclass
+class ProgramBuilder:
+    """逐帧拼装 FrameProgram：send() 只发送，query() 发送后等待应答。"""
+    label: str = ""
+    timeout: Optional[float] = 0.3
+    raw: bool = False
+    idempotent: bool = False
+    _buf: bytearray = field(default_factory=bytearray)
+    _queries: List[int] = field(default_factory=list)
+
+    def send(self, addr_byte: int, data_byte: int) -> "ProgramBuilder":
+        self._buf += make_forward_frame(addr_byte, data_byte)
+        return self
+
+    def query(self, addr_byte: int, data_byte: int) -> "ProgramBuilder":
+        self._queries.append(len(self._buf) // 2)
+        return self.send(addr_byte, data_byte)
+
+    def extend(self, pairs: Iterable[Tuple[int, int]]) -> "ProgramBuilder":
+        for a, d in pairs:
+            self.send(a, d)
+        return self
+
+    def build(self) -> FrameProgram:
+        return FrameProgram(bytes(self._buf), tuple(self._queries), self.timeout, self.label, self.raw,
+                            self.idempotent)
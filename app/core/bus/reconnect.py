@@ -0,0 +1,128 @@
+from __future__ import annotations
+import time
+import random
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+
+class Backoff:
+    """指数退避 + 抖动：第 n 次重试前等待 min(maximum, initial × factor^n)，再乘以 [1-jitter, 1+jitter]。"""
+    def __init__(self, initial: float = 0.2, maximum: float = 10.0, factor: float = 2.0,
+                 jitter: float = 0.2, rng: random.Random | None = None):
+        self.initial = max(0.0, float(initial))
+        self.maximum = max(self.initial, float(maximum))
+        self.factor = max(1.0, float(factor))
+        self.jitter = max(0.0, min(1.0, float(jitter)))
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt: int) -> float:
+        base = min(self.maximum, self.initial * self.factor ** max(0, int(attempt)))
+        return base * (1.0 + self.jitter * (2.0 * self._rng.random() - 1.0))
+
+
+class LinkSupervisor:
+    """链路看护：断线后在后台线程按 Backoff 重连，并统计断线次数、重连耗时与累计停机时间。
+
+    状态：idle（未托管：从未连接或已手动断开）| up | down（后台重连中）。
+    - mark_up() 在连接成功后调用，进入托管；从 down 调用时计一次重连；
+    - mark_down() 由执行器在程序遇到 ConnectionLost 时调用，启动重连线程；
+    - stop() 手动断开时调用，停止重连并回到 idle；
+    重连成功后仍处于 down 时回调 on_up，由它完成复位并调用 mark_up()（执行器的 resume() 在执行线程内
+    依次复位、mark_up、放行挂起的程序，期间不会有新程序上总线）；没有 on_up 时直接 mark_up()。
+    on_up 出错或未调用 mark_up() 时继续重连。每次重连尝试前回调 on_attempt（用于让挂起过久的程序超时失败）。
+    """
+    IDLE, UP, DOWN = "idle", "up", "down"
+
+    def __init__(self, connect: Callable[[], None], backoff: Backoff | None = None,
+                 queue_max: int = 256, on_up: Optional[Callable[[], None]] = None,
+                 on_attempt: Optional[Callable[[], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self._connect = connect
+        self.backoff = backoff or Backoff()
+        self.queue_max = max(0, int(queue_max))
+        self.on_up = on_up
+        self.on_attempt = on_attempt
+        self._clock = clock
+        self._state = self.IDLE
+        self._down_since = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._log = logging.getLogger("LinkSupervisor")
+        self._counts: Dict[str, float] = {
+            "disconnects": 0, "reconnects": 0, "attempts": 0,
+            "downtime_s": 0.0, "last_reconnect_ms": 0.0, "max_reconnect_ms": 0.0,
+        }
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def is_down(self) -> bool:
+        return self._state == self.DOWN
+
+    def mark_up(self) -> None:
+        with self._lock:
+            if self._state == self.DOWN:
+                took = self._clock() - self._down_since
+                self._counts["reconnects"] += 1
+                self._counts["downtime_s"] += took
+                self._counts["last_reconnect_ms"] = took * 1000.0
+                self._counts["max_reconnect_ms"] = max(self._counts["max_reconnect_ms"], took * 1000.0)
+            self._state = self.UP
+
+    def mark_down(self, exc: BaseException | None = None) -> None:
+        with self._lock:
+            if self._state != self.UP:
+                return
+            self._state = self.DOWN
+            self._down_since = self._clock()
+            self._counts["disconnects"] += 1
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="link-reconnect", daemon=True)
+            self._thread.start()
+        self._log.warning("链路断开，后台重连: %s", exc)
+
+    def stop(self, timeout: float = 2.0) -> None:
+        with self._lock:
+            if self._state == self.DOWN:
+                self._counts["downtime_s"] += self._clock() - self._down_since
+            self._state = self.IDLE
+            self._stop.set()
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            out = dict(self._counts)
+            if self._state == self.DOWN:
+                out["downtime_s"] += self._clock() - self._down_since
+        out["down"] = int(self._state == self.DOWN)
+        return out
+
+    def _run(self) -> None:
+        attempt = 0
+        while not self._stop.wait(self.backoff.delay(attempt)):
+            attempt += 1
+            with self._lock:
+                self._counts["attempts"] += 1
+            if self.on_attempt is not None:
+                self.on_attempt()
+            try:
+                self._connect()
+                if self._state != self.DOWN:
+                    return
+                if self.on_up is not None:
+                    self.on_up()
+                else:
+                    self.mark_up()
+            except Exception as exc:
+                self._log.debug("重连失败（第 %d 次）: %s", attempt, exc)
+                continue
+            if self._state != self.DOWN:
+                if self._state == self.UP:
+                    self._log.info("链路已恢复（%.0f ms，%d 次尝试）",
+                                   self._counts["last_reconnect_ms"], attempt)
+                return
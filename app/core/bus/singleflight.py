@@ -0,0 +1,59 @@
+from __future__ import annotations
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """并发相同请求合并：同一 key 同时只执行一次，其余调用方等待并共享结果（或异常）。
+
+    只合并“同时在途”的调用：执行结束即移除，之后的调用重新执行，不做缓存。
+    tag 描述一次执行的条件（如通道与超时），joinable(在途的 tag) 为 False 的调用方不搭便车、另行执行；
+    同一 key 可同时有多次在途执行，调用方搭上第一个可加入的。
+    misses 为实际执行次数，hits 为搭便车的调用次数。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, List[Tuple[Any, Future]]] = {}
+        self._counts: Dict[str, int] = {"hits": 0, "misses": 0, "errors": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], T], tag: Any = None,
+           joinable: Optional[Callable[[Any], bool]] = None) -> T:
+        with self._lock:
+            flights = self._inflight.setdefault(key, [])
+            fut = next((f for t, f in flights if joinable is None or joinable(t)), None)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                entry = (tag, fut)
+                flights.append(entry)
+            self._counts["misses" if leader else "hits"] += 1
+        if not leader:
+            return fut.result()
+        try:
+            value = fn()
+        except BaseException as exc:
+            with self._lock:
+                self._land(key, entry)
+                self._counts["errors"] += 1
+            fut.set_exception(exc)
+            raise
+        # 先移除再发布结果：之后到达的调用重新执行，不会拿到已结束的结果
+        with self._lock:
+            self._land(key, entry)
+        fut.set_result(value)
+        return value
+
+    def _land(self, key: Hashable, entry: Tuple[Any, Future]) -> None:
+        flights = self._inflight.get(key, [])
+        flights.remove(entry)
+        if not flights:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict(self._counts)
+            out["inflight"] = sum(len(f) for f in self._inflight.values())
+        return out
@@ -9,7 +9,7 @@ except Exception:
 
 _DEFAULT = {
     "gateway": {
-        "type": "mock",   # "tcp" | "serial" | "hid" | "mock"
+        "type": "mock",   # "tcp" | "tcp_async" | "sim" | "serial" | "hid" | "mock"
         "host": "127.0.0.1",
         "port": 5588,
         "timeout_sec": 0.8,
@@ -27,6 +27,44 @@ def load_yaml(path: Path) -> dict:
         log.warning("未安装 pyyaml，使用默认配置")
     return {}
 
+def apply_ops_defaults(ops: dict) -> dict:
+    """就地补齐 ops 表缺省的 opcode，并返回 ops。"""
+    ops.setdefault("recall_scene_base", 64)
+    ops.setdefault("store_dtr_as_scene_base", 80)
+    ops.setdefault("remove_from_scene_base", 144)
+    ops.setdefault("add_to_group_base", 96)
+    ops.setdefault("remove_from_group_base", 112)
+    ops.setdefault("write_dtr", 163)
+    ops.setdefault("store_dtr_as_short_address", 128)
+    ops.setdefault("query_status", 144)
+    ops.setdefault("query_groups_0_7", 192)
+    ops.setdefault("query_groups_8_15", 193)
+    ops.setdefault("query_scene_level_base", 176)
+    ops.setdefault("query_actual_level", 160)
+    # DT8 默认
+    ops.setdefault("dt8_enable_addr", 193)
+    ops.setdefault("dt8_set_tc_opcode", 231)
+    ops.setdefault("write_dtr0_addr", 163)
+    ops.setdefault("write_dtr1_addr", 195)
+    # xy
+    ops.setdefault("dt8_set_x_opcode", 224)
+    ops.setdefault("dt8_set_y_opcode", 225)
+    # primary 映射
+    prim = ops.setdefault("dt8_set_primary", {})
+    prim.setdefault("r", 226)
+    prim.setdefault("g", 227)
+    prim.setdefault("b", 228)
+    prim.setdefault("w", 229)
+    # RGBW 整色：primary=逐通道 Set Primary（旧路径）；activate=DTR0/1/2 装载临时值 + Activate
+    ops.setdefault("dt8_rgbw_mode", "primary")
+    ops.setdefault("dt8_set_temp_rgb_opcode", 235)
+    ops.setdefault("dt8_set_temp_waf_opcode", 236)
+    ops.setdefault("dt8_activate_opcode", 226)
+    return ops
+
+def default_ops() -> dict:
+    return apply_ops_defaults({})
+
 def get_app_config(root_dir: Path) -> dict:
     cfg_dir = root_dir / "配置"
     if not cfg_dir.exists():
@@ -48,36 +86,12 @@ def get_app_config(root_dir: Path) -> dict:
                 cfg[k].setdefault(kk, vv)
 
     # ops 兜底
-    ops = cfg.setdefault("ops", {})
-    ops.setdefault("recall_scene_base", 64)
-    ops.setdefault("store_dtr_as_scene_base", 80)
-    ops.setdefault("remove_from_scene_base", 144)
-    ops.setdefault("add_to_group_base", 96)
-    ops.setdefault("remove_from_group_base", 112)
-    ops.setdefault("write_dtr", 163)
-    ops.setdefault("query_status", 144)
-    ops.setdefault("query_groups_0_7", 192)
-    ops.setdefault("query_groups_8_15", 193)
-    ops.setdefault("query_scene_level_base", 176)
-    # DT8 默认
-    ops.setdefault("dt8_enable_addr", 193)
-    ops.setdefault("dt8_set_tc_opcode", 231)
-    ops.setdefault("write_dtr0_addr", 163)
-    ops.setdefault("write_dtr1_addr", 195)
+    apply_ops_defaults(cfg.setdefault("ops", {}))
 
     # Tc 范围
     tc = cfg.setdefault("tc", {})
     tc.setdefault("kelvin_min", 1700)
     tc.setdefault("kelvin_max", 8000)
-    # xy
-    ops.setdefault("dt8_set_x_opcode", 224)
-    ops.setdefault("dt8_set_y_opcode", 225)
-    # primary 映射
-    prim = ops.setdefault("dt8_set_primary", {})
-    prim.setdefault("r", 226);
-    prim.setdefault("g", 227)
-    prim.setdefault("b", 228);
-    prim.setdefault("w", 229)
     cfg.setdefault("presets", [
         {"name": "红", "mode": "rgbw", "values": {"r": 254, "g": 0, "b": 0, "w": 0}},
         {"name": "绿", "mode": "rgbw", "values": {"r": 0, "g": 254, "b": 0, "w": 0}},
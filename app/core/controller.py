@@ -1,12 +1,34 @@
 from __future__ import annotations
+import time
 import logging
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, Iterable, List, Mapping
 from .transport.base import Transport, MockTransport
 from .transport.tcp_gateway import TcpGateway
+from .transport.async_tcp_gateway import AsyncTcpGateway
+from .transport.aio import AsyncTransportAdapter
+from .transport.correlator import QueryCorrelator, RttEstimator
+from .transport.paced import PacedTransport
+from .transport.framing import make_codec
 from .transport.serial_port import SerialGateway
+from .transport.udp_gateway import UdpGateway
 from .transport.hid_gateway import HidGateway
-from .dali.frames import addr_broadcast, addr_short, addr_group, make_forward_frame
+from .dali.frames import addr_broadcast, addr_short, addr_group
+from .dali.timing import BusPacer, DaliTiming
+from .bus.program import FrameProgram, ProgramBuilder
+from .bus.executor import BusExecutor, Lane
+from .bus.dtr import DtrShadow
+from .bus.reconnect import Backoff, LinkSupervisor
+from .bus.singleflight import SingleFlight
+from .bus.compiler import CommandCompiler, CompiledCommand
+from .bus.scan import ScanEngine, ScanHit
+from .bus.planner import Dt8Plan, LevelPlan, plan_dt8, plan_levels
+from .config import apply_ops_defaults
+from .registry import DeviceRegistry, SRC_COMMAND, SRC_QUERY
+from .sim.bus import SimBus
+from .sim.server import SimGatewayServer, SimUdpGateway, parse_shorts
 
 class Controller:
     """上位机核心：把GUI动作翻译为传输层帧。"""
@@ -15,17 +37,66 @@ class Controller:
         self._log = logging.getLogger("Controller")
         gw_cfg = cfg.get("gateway", {})
         gtype = gw_cfg.get("type", "mock").lower()
+        # 网关封包：raw 透传 | lpb 长度前缀批量（一包多帧、一包多条应答）
+        framing = str(gw_cfg.get("framing", "raw"))
+        framing_max = int(gw_cfg.get("framing_max_frames", 16))
         if gtype == "tcp":
             self._transport: Transport = TcpGateway(
                 host=gw_cfg.get("host", "127.0.0.1"),
                 port=int(gw_cfg.get("port", 5588)),
                 timeout=float(gw_cfg.get("timeout_sec", 0.8)),
+                codec=make_codec(framing, framing_max),
             )
+        elif gtype == "tcp_async":
+            # 所有异步网关共用一个事件循环线程
+            self._transport = AsyncTransportAdapter(AsyncTcpGateway(
+                host=gw_cfg.get("host", "127.0.0.1"),
+                port=int(gw_cfg.get("port", 5588)),
+                timeout=float(gw_cfg.get("timeout_sec", 0.8)),
+                max_inflight=int(gw_cfg.get("max_inflight", 16)),
+                orphan_guard=float(gw_cfg.get("orphan_guard_sec", 0.03)),
+            ))
+        elif gtype == "udp":
+            # 所有 UDP 网关共用一个套接字与收包线程
+            self._transport = UdpGateway(
+                host=gw_cfg.get("host", "127.0.0.1"),
+                port=int(gw_cfg.get("port", 5588)),
+                timeout=float(gw_cfg.get("timeout_sec", 0.8)),
+                max_frames=framing_max,
+                rto=float(gw_cfg.get("udp_rto_sec", 0.1)),
+                retries=int(gw_cfg.get("udp_retries", 3)),
+            )
+        elif gtype == "sim":
+            # 进程内仿真总线：按真实帧格式走本机 TCP（sim_protocol=udp 时走 UDP），便于离线压测/扫描
+            sim_bus = SimBus(parse_shorts(str(gw_cfg.get("sim_gears", "0-15"))),
+                             ops=apply_ops_defaults(dict(cfg.get("ops", {}))))
+            time_scale = float(gw_cfg.get("sim_time_scale", 1.0))
+            if str(gw_cfg.get("sim_protocol", "tcp")).lower() == "udp":
+                self._sim = SimUdpGateway(sim_bus, time_scale=time_scale)
+                self._transport = UdpGateway(
+                    host="127.0.0.1", port=self._sim.start(),
+                    timeout=float(gw_cfg.get("timeout_sec", 0.8)),
+                    max_frames=framing_max,
+                    rto=float(gw_cfg.get("udp_rto_sec", 0.1)),
+                    retries=int(gw_cfg.get("udp_retries", 3)),
+                )
+            else:
+                self._sim = SimGatewayServer(sim_bus, time_scale=time_scale,
+                                             codec=make_codec(framing, framing_max))
+                self._transport = TcpGateway(
+                    host="127.0.0.1", port=self._sim.start(),
+                    timeout=float(gw_cfg.get("timeout_sec", 0.8)),
+                    codec=make_codec(framing, framing_max),
+                )
         elif gtype == "serial":
             self._transport = SerialGateway(
                 port=gw_cfg.get("port", "COM1"),
                 baudrate=int(gw_cfg.get("baudrate", 19200)),
                 timeout=float(gw_cfg.get("timeout_sec", 0.8)),
+                codec=make_codec(framing, framing_max),
+                frame_gap_ms=float(gw_cfg.get("frame_gap_ms", 0.0)),
+                burst_frames=int(gw_cfg.get("burst_frames", 16)),
+                ring_size=int(gw_cfg.get("ring_size", 4096)),
             )
         elif gtype == "hid":
             vid = gw_cfg.get("vid")
@@ -38,49 +109,299 @@ class Controller:
         else:
             self._transport = MockTransport()
         self._log.info("Transport: %s", self._transport.__class__.__name__)
+        # 总线时序：pacing=true 时按 DALI 帧/沉降时间配速，否则只计量占用率
+        self._pacer = BusPacer(
+            DaliTiming.from_cfg(gw_cfg.get("timing")),
+            enforce=bool(gw_cfg.get("pacing", False)),
+        )
+        # 查询统一经过配对层，避免迟到的应答被算到下一条查询头上
+        self._scan_timeout = float(gw_cfg.get("scan_timeout_sec", 0.3))
+        # timeout=None 的查询按实测往返时间自适应，上限为 scan_timeout_sec
+        self._link = QueryCorrelator(
+            # batch_max：连续前向帧一次写出的上限（网关缓冲），1 表示逐帧写
+            PacedTransport(self._transport, self._pacer, max_batch=int(gw_cfg.get("batch_max", 32))),
+            orphan_guard=float(gw_cfg.get("orphan_guard_sec", 0.03)),
+            rtt=RttEstimator(floor=float(gw_cfg.get("rto_floor_sec", 0.02)), ceiling=self._scan_timeout),
+            # 批量封包每条查询都有明确结果，可一包多条查询同时在途
+            window=framing_max if getattr(self._transport, "explicit_replies", False) else 1,
+        )
+        # 高层命令编译缓存：地址/ops 查表/换算只做一次
+        self._compiler = CommandCompiler(cfg.get("ops", {}), cfg.get("tc", {}),
+                                         maxsize=int(gw_cfg.get("compile_cache_size", 1024)))
+        # DTR 影子：跳过与上次写入相同的 DTR0/1/2；dtr_cache_sec 为影子有效期，0 关闭
+        self._dtr = DtrShadow(self._compiler.ops, ttl=float(gw_cfg.get("dtr_cache_sec", 2.0)))
+        # 断线自动重连：指数退避 + 抖动；断线期间的程序挂起在有界队列里，幂等程序重连后重放
+        self._supervisor: LinkSupervisor | None = None
+        hold_sec = float(gw_cfg.get("reconnect_hold_sec", 30.0))
+        if bool(gw_cfg.get("reconnect", True)):
+            self._supervisor = LinkSupervisor(
+                self._transport.connect,
+                Backoff(initial=float(gw_cfg.get("reconnect_initial_sec", 0.2)),
+                        maximum=float(gw_cfg.get("reconnect_max_sec", 10.0))),
+                queue_max=int(gw_cfg.get("reconnect_queue", 256)),
+                on_up=self._on_link_up,
+                on_attempt=lambda: self._exec.expire_held(hold_sec),
+            )
+        # 单写者执行器：GUI/压测线程/定时任务的所有总线流量都经它串行化
+        self._exec = BusExecutor(self._link, name=gtype, dtr=self._dtr, supervisor=self._supervisor)
+        self._tls = threading.local()   # 每个线程当前的优先级通道
+        # 只读查询合并：面板、定时任务、API 同时查询同一设备时只上一次总线
+        self._queries = SingleFlight()
+        # 设备影子：命令推断 + 读回缓存，未过期时读操作不上总线
+        self.registry = DeviceRegistry(ttl=float(gw_cfg.get("registry_ttl_sec", 30.0)))
+        self._population: tuple[frozenset, float] | None = None   # 最近一次全地址扫描 (在线短址, 时刻)
 
     # 连接管理
     def connect(self) -> bool:
+        # 断线期间总线可能被其它主机改动过
+        self.registry.invalidate()
+        self._population = None
+        self._dtr.invalidate()
+        if self._supervisor is not None:
+            # 手动连接取代后台重连
+            self._supervisor.stop()
         try:
-            self._transport.connect()
-            return True
+            self._exec.call(self._transport.connect)
         except Exception as e:
             self._log.error("连接失败: %s", e, exc_info=True)
             return False
+        if self._supervisor is not None:
+            self._exec.resume(self._link.reset)
+        return True
 
     def disconnect(self) -> None:
+        self.registry.invalidate()
+        self._population = None
+        self._dtr.invalidate()
+        if self._supervisor is not None:
+            self._supervisor.stop()
+            self._exec.fail_held()
         try:
-            self._transport.disconnect()
+            self._exec.call(self._transport.disconnect)
         except Exception:
             pass
 
     def is_connected(self) -> bool:
         return self._transport.is_connected()
 
-    # 调光：发送 ARC 0..254（is_command=False）
-    def send_arc(self, mode: str, value: int, addr_val: int | None = None, unaddr: bool = False) -> None:
-        """mode: 'broadcast' | 'short' | 'group'"""
-        value = max(0, min(254, int(value)))
-        if mode == "broadcast":
-            a = addr_broadcast(is_command=False, unaddressed=unaddr)
-        elif mode == "short":
-            if addr_val is None:
-                raise ValueError("短地址缺失")
-            a = addr_short(int(addr_val), is_command=False)
-        elif mode == "group":
-            if addr_val is None:
-                raise ValueError("组地址缺失")
-            a = addr_group(int(addr_val), is_command=False)
+    def close(self) -> None:
+        """断开并停止总线执行线程（进程退出/测试清理用）。"""
+        self.disconnect()
+        self._exec.close()
+        if getattr(self, "_sim", None) is not None:
+            self._sim.stop()
+
+    def reconnect_stats(self) -> Dict[str, float]:
+        """断线重连计量：disconnects/reconnects/attempts、累计停机 downtime_s、
+        最近/最长重连耗时，以及挂起/重放/丢弃的程序数（held/replayed/dropped/held_now）。"""
+        out: Dict[str, float] = self._supervisor.stats() if self._supervisor is not None else {}
+        ex = self._exec.stats()
+        for k in ("held", "replayed", "dropped", "held_now"):
+            out[k] = ex[k]
+        return out
+
+    def _on_link_up(self) -> None:
+        n = self._exec.resume(self._reset_after_reconnect)
+        self._log.info("链路恢复，放行 %d 个挂起的程序", n)
+
+    def _reset_after_reconnect(self) -> None:
+        # 在执行线程内调用：断线前在途的查询与 DTR 状态、扫描得到的在线设备都不可信
+        self._dtr.invalidate()
+        self._population = None
+        self._link.reset()
+
+    def transport_stats(self) -> Dict[str, float]:
+        """传输层自身的计量（如串口的收发字节/帧、缓冲溢出、吞吐，UDP 的重传与丢失）；不提供时为空。"""
+        fn = getattr(self._transport, "stats", None)
+        return dict(fn()) if callable(fn) else {}
+
+    def link_stats(self) -> Dict[str, float]:
+        """查询配对层计数：queries/answered/timeouts/orphan_bytes/coalesced_reads，及 srtt/rto 等往返时间估计。"""
+        return self._link.stats()
+
+    def bus_stats(self) -> Dict[str, object]:
+        """执行器计量：队列深度、排队等待与服务时间、已执行帧数、合并节省的帧数、
+        省略的冗余 DTR 写入（dtr_elided）、批量写出次数与帧数（batches/batched_frames）、总线占用率。"""
+        out = self._exec.stats()
+        out["bus_util_pct"] = self._pacer.utilisation()
+        out["paced_wait_ms"] = self._pacer.stats()["paced_wait_ms"]
+        return out
+
+    def bus_utilisation(self) -> float:
+        """最近一个统计窗口内的总线占用百分比（按 DALI 帧时序估算）。"""
+        return self._pacer.utilisation()
+
+    def bus_timing(self) -> DaliTiming:
+        return self._pacer.timing
+
+    def invalidate_dtr(self) -> None:
+        """总线上有其它主机写过 DTR 时调用，下一条颜色命令会重新写入 DTR。"""
+        self._dtr.invalidate()
+
+    def registry_stats(self) -> Dict[str, float]:
+        """设备影子计数：hits/misses/records/invalidations/devices/facts/hit_pct。"""
+        return self.registry.stats()
+
+    # ========== 优先级通道 ==========
+    @contextmanager
+    def lane(self, lane: Lane | str):
+        """在 with 块内，本线程发出的所有命令使用指定通道（interactive/scheduled/bulk）。"""
+        prev = getattr(self._tls, "lane", None)
+        self._tls.lane = Lane.parse(lane)
+        try:
+            yield
+        finally:
+            self._tls.lane = prev
+
+    def current_lane(self) -> Lane:
+        return getattr(self._tls, "lane", None) or Lane.INTERACTIVE
+
+    # ========== 帧程序 ==========
+    def submit_program(self, program: FrameProgram, lane: Lane | str | None = None):
+        """异步提交帧程序，返回 Future（结果为查询应答列表）。"""
+        return self._exec.submit(program, Lane.parse(lane) if lane is not None else self.current_lane())
+
+    def run_program(self, program: FrameProgram, lane: Lane | str | None = None) -> List[bytes | None]:
+        """同步执行帧程序：程序内各帧连续上总线，不会被其它调用方插入。"""
+        return self._exec.run(program, Lane.parse(lane) if lane is not None else self.current_lane())
+
+    def _run_latest(self, program: FrameProgram, key: tuple, wait: bool):
+        """按 key 做最后值生效合并；wait=False 时立即返回 Future（用于滑条等高频更新）。"""
+        if wait:
+            return self._exec.run(program, self.current_lane(), key=key)
+        fut = self._exec.submit(program, self.current_lane(), key=key)
+        fut.add_done_callback(self._log_async_failure)
+        return fut
+
+    def _log_async_failure(self, fut):
+        if not fut.cancelled() and fut.exception() is not None:
+            self._log.warning("异步命令失败: %r", fut.exception())
+
+    # ========== 预编译命令 ==========
+    def compile(self, action: str, mode: str, addr_val: int | None = None, unaddr: bool = False,
+                *args) -> CompiledCommand:
+        """把高层动作编译为预编码的帧程序（LRU 缓存）；动作与参数见 CommandCompiler。
+        dt8_rgbw 的参数为 (r, g, b, w=0, path=None)，path 缺省取 ops.dt8_rgbw_mode。"""
+        if action == "dt8_rgbw":
+            args = self._rgbw_args(mode, addr_val, *args)
+        return self._compiler.compile(action, mode, None if addr_val is None else int(addr_val),
+                                      bool(unaddr), *args)
+
+    def execute(self, cmd: CompiledCommand, wait: bool = True):
+        """执行预编译命令并把效果记入设备影子；带合并键的命令同一目标最后值生效。
+        wait=False 时返回 Future；出队前被取消的命令没有上总线，其目标的影子随之作废。"""
+        if cmd.key is not None:
+            fut = self._run_latest(cmd.program, cmd.key, wait)
+        elif wait:
+            fut = None
+            self.run_program(cmd.program)
         else:
-            raise ValueError("未知地址模式")
+            fut = self.submit_program(cmd.program)
+            fut.add_done_callback(self._log_async_failure)
+        self._record(cmd)
+        if not wait:
+            fut.add_done_callback(lambda f: f.cancelled() and self._forget(cmd.mode, cmd.addr_val, cmd.unaddr))
+        return None if wait else fut
+
+    def compiler_stats(self) -> Dict[str, int]:
+        """命令编译缓存：hits/misses/size/maxsize。"""
+        return self._compiler.stats()
+
+    def _rgbw_args(self, mode: str, addr_val: int | None, r, g, b, w=0, path=None) -> tuple:
+        path = str(path or self._compiler.ops.get("dt8_rgbw_mode") or "primary").lower()
+        w = max(0, min(254, int(w)))
+        with_w = True
+        if path == "activate" and mode == "short" and addr_val is not None:
+            # 短地址目标的 W 在影子里未变时省去 WAF 一步
+            fact = self.registry.get(addr_val, "colour:w")
+            with_w = fact is None or int(fact.value) != w
+        return int(r), int(g), int(b), w, path, with_w
+
+    def _record(self, cmd: CompiledCommand) -> None:
+        """把命令的效果记入设备影子（仅发给未寻址设备的命令与影子无关）。"""
+        mode, addr_val = cmd.mode, cmd.addr_val
+        if mode == "broadcast" and cmd.unaddr:
+            return
+        if cmd.action in ("group_add", "group_remove"):
+            bit = 1 << (dict(cmd.notes)["group"] & 0x0F)
+            if cmd.action == "group_add":
+                self.registry.update_target(mode, addr_val, "groups", lambda m: int(m) | bit)
+            else:
+                self.registry.update_target(mode, addr_val, "groups", lambda m: int(m) & ~bit & 0xFFFF)
+        elif cmd.action == "scene_recall":
+            # 场景亮度已知的设备直接推断新亮度；未知的作废亮度
+            scene = dict(cmd.notes)["scene"] & 0x0F
+            shorts, exact = self.registry.targets(mode, addr_val)
+            for s in shorts:
+                fact = self.registry.get(s, f"scene:{scene}") if exact else None
+                if fact is None:
+                    self.registry.invalidate(s, ["level"])
+                elif int(fact.value) != 255:
+                    self.registry.record(s, "level", int(fact.value), SRC_COMMAND)
+        else:
+            for key, value in cmd.notes:
+                self.registry.record_target(mode, addr_val, key, value, SRC_COMMAND)
+
+    # 调光：发送 ARC 0..254（is_command=False）
+    def send_arc(self, mode: str, value: int, addr_val: int | None = None, unaddr: bool = False,
+                 wait: bool = True):
+        """mode: 'broadcast' | 'short' | 'group'
+        同一目标尚未发出的 ARC 会被新值取代；wait=False 时返回 Future 不阻塞。"""
+        return self.execute(self.compile("arc", mode, addr_val, unaddr, int(value)), wait)
+
+    def apply_levels(self, mapping: Mapping[int, int], present: Iterable[int] | None = None,
+                     skip_unchanged: bool = True) -> LevelPlan:
+        """批量设置 {short: level}：按组成员关系压缩为少量广播/组帧 + 逐台修正，走 bulk 通道。
+
+        present 为总线上全部在线短址；缺省取最近一次未过期的全地址扫描结果，两者都没有时
+        在线设备视为未知，只用短址帧（不会改动 mapping 以外的设备）。
+        组成员关系来自 query_groups（影子未过期时不上总线），任一在线设备的组位图未知时不用组帧。
+        skip_unchanged=True 时影子里已在目标亮度的设备不再下发。
+        """
+        want = {int(s): max(0, min(254, int(v))) for s, v in mapping.items()}
+        population = self.known_population() if present is None else {int(s) for s in present}
+        memberships: Dict[int, int] = {}
+        if population is not None:
+            population |= set(want)
+            with self.lane(Lane.BULK):
+                for short in sorted(population):
+                    lo, hi = self._group_bytes(short, 0.3, None)
+                    if lo is not None and hi is not None:
+                        memberships[short] = lo | (hi << 8)
+        current = None
+        if skip_unchanged:
+            current = {s: int(f.value) for s in want
+                       if (f := self.registry.get(s, "level")) is not None}
+        plan = plan_levels(want, memberships, current, population)
+        if plan.frames:
+            try:
+                self.run_program(plan.program(), Lane.BULK)
+            except Exception:
+                # 程序可能已部分上总线，目标设备的亮度不再可信
+                for s in want:
+                    self.registry.invalidate(s, ["level"])
+                raise
+        for s, v in want.items():
+            self.registry.record(s, "level", v, SRC_COMMAND)
+        self._log.info("apply_levels: %d 台 → %d 帧（逐台 %d 帧）", len(want), len(plan.frames), plan.naive)
+        return plan
+
+    def known_population(self) -> set[int] | None:
+        """最近一次全地址扫描得到的在线短址；未扫描、扫描已超过影子有效期或期间重连过时为 None。"""
+        scan = self._population
+        if scan is None or time.monotonic() - scan[1] > self.registry.ttl:
+            return None
+        return set(scan[0])
+
+    def invalidate_population(self) -> None:
+        """作废最近一次全地址扫描的结果：短地址可能已被改写（调试编址、原始帧等），
+        之后的 apply_levels 在重新扫描前不再用广播/组帧。"""
+        self._population = None
 
-        frame = make_forward_frame(a, value)
-        self._transport.send(frame)
     # 发送命令，并尝试读取一个响应包（通常是1字节）
     def send_command(self, mode: str, opcode: int,
                      addr_val: int | None = None, unaddr: bool = False,
                      timeout: float = 0.3) -> bytes | None:
-        from .dali.frames import addr_broadcast, addr_short, addr_group, make_forward_frame
         opcode = int(opcode) & 0xFF
 
         if mode == "broadcast":
@@ -94,58 +415,118 @@ class Controller:
         else:
             raise ValueError("未知地址模式")
 
-        frame = make_forward_frame(a, opcode)
-        self._transport.send(frame)
-        return self._transport.recv(timeout=timeout)
+        read_only = self._is_read_only(opcode)
+        if not read_only:
+            self._forget(mode, addr_val, unaddr)
+            if opcode == int(self._cfg_ops().get("store_dtr_as_short_address", 128)):
+                self.invalidate_population()
+        prog = ProgramBuilder("query", timeout=timeout, idempotent=read_only).query(a, opcode).build()
+        if read_only:
+            return self._run_query(("q", a, opcode), prog)[0]
+        return self.run_program(prog)[0]
+
+    def _run_query(self, key: tuple, prog: FrameProgram) -> List[bytes | None]:
+        """只读程序：同 key（地址字节 + opcode）并发的调用共享同一次总线事务的结果。
+        在途事务的通道不低于调用方（交互调用不会跟在 bulk 查询后面排队）、
+        超时不短于调用方（长超时的调用不会拿到短超时的 None）时才加入，否则另行执行。"""
+        lane = self.current_lane()
+        timeout = prog.timeout
+
+        def joinable(tag) -> bool:
+            other_lane, other_timeout = tag
+            return other_lane <= lane and (timeout is None or (other_timeout is not None
+                                                               and other_timeout >= timeout))
+
+        return self._queries.do(key, lambda: self.run_program(prog, lane), (lane, timeout), joinable)
+
+    def query_dedup_stats(self) -> Dict[str, int]:
+        """只读查询合并计数：hits（共享他人结果）/misses（实际上总线）/errors/inflight。"""
+        return self._queries.stats()
 
     # ========== 设备查询 ==========
     def query_status(self, short_addr: int, timeout: float = 0.3) -> bytes | None:
         opcode = int(self._cfg_ops().get("query_status", 144))
         return self.send_command("short", opcode, addr_val=int(short_addr), timeout=timeout)
 
-    def query_groups(self, short_addr: int, timeout: float = 0.3) -> Dict[int, int]:
-        ops = self._cfg_ops()
+    def query_level(self, short_addr: int, timeout: float = 0.3,
+                    max_age: float | None = None) -> int | None:
+        """当前亮度；影子未过期时不上总线（max_age=0 强制读回）。"""
+        fact = self.registry.get(short_addr, "level", max_age)
+        if fact is not None:
+            return int(fact.value)
+        opcode = int(self._cfg_ops().get("query_actual_level", 160))
+        a = addr_short(int(short_addr), is_command=True)
+        prog = (ProgramBuilder("query_level", timeout=timeout, idempotent=True)
+                .query(a, opcode & 0xFF).build())
+        resp = self._run_query(("q", a, opcode & 0xFF), prog)[0]
+        if not resp:
+            return None
+        self.registry.record(short_addr, "level", int(resp[0]), SRC_QUERY)
+        return int(resp[0])
+
+    def query_groups(self, short_addr: int, timeout: float = 0.3,
+                     max_age: float | None = None) -> Dict[int, int]:
+        """组成员关系 {group: 0/1}；影子未过期时不上总线（max_age=0 强制读回）。"""
+        lo, hi = self._group_bytes(short_addr, timeout, max_age)
         groups: Dict[int, int] = {i: 0 for i in range(16)}
-
-        lo_opcode = int(ops.get("query_groups_0_7", 192))
-        hi_opcode = int(ops.get("query_groups_8_15", 193))
-
-        lo_resp = self.send_command("short", lo_opcode, addr_val=int(short_addr), timeout=timeout)
-        hi_resp = self.send_command("short", hi_opcode, addr_val=int(short_addr), timeout=timeout)
-
-        if lo_resp:
-            mask = lo_resp[0]
-            for bit in range(8):
-                groups[bit] = 1 if (mask >> bit) & 1 else 0
-        if hi_resp:
-            mask = hi_resp[0]
-            for bit in range(8):
-                groups[8 + bit] = 1 if (mask >> bit) & 1 else 0
+        for base, mask in ((0, lo), (8, hi)):
+            if mask is not None:
+                for bit in range(8):
+                    groups[base + bit] = 1 if (mask >> bit) & 1 else 0
         return groups
 
-    def query_scene_levels(self, short_addr: int, timeout: float = 0.3) -> Dict[int, int | None]:
+    def _group_bytes(self, short_addr: int, timeout: float,
+                     max_age: float | None) -> tuple[int | None, int | None]:
+        """组位图的低/高字节；无应答的一半为 None，两半都有应答时记入影子。"""
+        fact = self.registry.get(short_addr, "groups", max_age)
+        if fact is not None:
+            return int(fact.value) & 0xFF, (int(fact.value) >> 8) & 0xFF
         ops = self._cfg_ops()
-        base = int(ops.get("query_scene_level_base", 176))
-        levels: Dict[int, int | None] = {}
-        for scene in range(16):
-            opcode = (base + scene) & 0xFF
-            resp = self.send_command("short", opcode, addr_val=int(short_addr), timeout=timeout)
-            if resp and len(resp) > 0:
-                levels[scene] = int(resp[0])
-            else:
-                levels[scene] = None
-        return levels
+        lo_opcode = int(ops.get("query_groups_0_7", 192))
+        hi_opcode = int(ops.get("query_groups_8_15", 193))
 
-    def scan_devices(self, short_range: range | List[int] = range(64), timeout: float = 0.3) -> List[int]:
-        found: List[int] = []
-        for short in short_range:
-            try:
-                resp = self.query_status(int(short), timeout=timeout)
-                if resp is not None:
-                    found.append(int(short))
-            except Exception as exc:  # pragma: no cover - transport failures only logged
-                self._log.debug("query_status failed for %s: %s", short, exc)
-        return found
+        a = addr_short(int(short_addr), is_command=True)
+        prog = (ProgramBuilder("query_groups", timeout=timeout, idempotent=True)
+                .query(a, lo_opcode & 0xFF).query(a, hi_opcode & 0xFF).build())
+        lo_resp, hi_resp = self._run_query(("groups", a), prog)
+        lo = lo_resp[0] if lo_resp else None
+        hi = hi_resp[0] if hi_resp else None
+        if lo is not None and hi is not None:
+            self.registry.record(short_addr, "groups", lo | (hi << 8), SRC_QUERY)
+        return lo, hi
+
+    def query_scene_levels(self, short_addr: int, timeout: float = 0.3,
+                           max_age: float | None = None) -> Dict[int, int | None]:
+        """16 个场景亮度；只查询影子里缺失或过期的场景（max_age=0 全部读回）。"""
+        # 16 条查询逐条走 bulk 通道：每条之间都给交互命令让路
+        with self.lane(Lane.BULK):
+            return {scene: self.query_scene_level(short_addr, scene, timeout, max_age)
+                    for scene in range(16)}
+
+    def query_scene_level(self, short_addr: int, scene: int, timeout: float = 0.3,
+                          max_age: float | None = None) -> int | None:
+        """单个场景亮度（255 表示不在该场景）；无应答返回 None。"""
+        scene = int(scene) & 0x0F
+        fact = self.registry.get(short_addr, f"scene:{scene}", max_age)
+        if fact is not None:
+            return int(fact.value)
+        opcode = (int(self._cfg_ops().get("query_scene_level_base", 176)) + scene) & 0xFF
+        resp = self.send_command("short", opcode, addr_val=int(short_addr), timeout=timeout)
+        if not resp:
+            return None
+        self.registry.record(short_addr, f"scene:{scene}", int(resp[0]), SRC_QUERY)
+        return int(resp[0])
+
+    def scan_devices(self, short_range: range | List[int] = range(64), timeout: float | None = None,
+                     on_found: Callable[[ScanHit], None] | None = None,
+                     stop: threading.Event | None = None) -> List[int]:
+        """扫描在线短地址。timeout=None 时按实测往返时间自适应（上限 scan_timeout_sec）；
+        on_found 每发现一台设备回调一次。"""
+        found = ScanEngine({"default": self}, timeout=timeout).scan(short_range, on_found, stop)
+        if set(range(64)) <= set(short_range) and (stop is None or not stop.is_set()):
+            # 全地址扫描完整结束：得到总线上的全部在线设备（apply_levels 据此决定能否用广播/组帧）
+            self._population = (frozenset(found["default"]), time.monotonic())
+        return found["default"]
 
     # ========== 组管理 ==========
     def group_add(self, target_mode: str, group: int, addr_val: int | None = None, unaddr: bool = False):
@@ -153,57 +534,35 @@ class Controller:
         将目标（短地址 / 广播）加入 group(0..15)。
         注：组成员关系写入设备，通常应对短地址或广播操作，不对“组地址”本身操作。
         """
-        ops = self._cfg_ops()
-        opcode = int(ops["add_to_group_base"] + int(group))
-        self._send_command_to_target(target_mode, opcode, addr_val, unaddr)
+        self.execute(self.compile("group_add", target_mode, addr_val, unaddr, int(group)))
 
     def group_remove(self, target_mode: str, group: int, addr_val: int | None = None, unaddr: bool = False):
         """从 group(0..15) 中移除目标。"""
-        ops = self._cfg_ops()
-        opcode = int(ops["remove_from_group_base"] + int(group))
-        self._send_command_to_target(target_mode, opcode, addr_val, unaddr)
+        self.execute(self.compile("group_remove", target_mode, addr_val, unaddr, int(group)))
 
     # ========== 场景管理 ==========
     def scene_recall(self, target_mode: str, scene: int, addr_val: int | None = None, unaddr: bool = False):
         """回放场景 scene(0..15)。"""
-        ops = self._cfg_ops()
-        opcode = int(ops["recall_scene_base"] + int(scene))
-        self._send_command_to_target(target_mode, opcode, addr_val, unaddr)
+        self.execute(self.compile("scene_recall", target_mode, addr_val, unaddr, int(scene)))
 
     def scene_store_level(self, target_mode: str, scene: int, level: int,
                           addr_val: int | None = None, unaddr: bool = False):
         """
         把 level(0..254) 写入为场景 scene(0..15) 的亮度：
-        先写 DTR，再发送“将 DTR 保存为场景 scene”的命令。
+        先写 DTR，再发送“将 DTR 保存为场景 scene”的命令；整段作为一个原子程序执行。
         """
-        ops = self._cfg_ops()
-        write_dtr = int(ops["write_dtr"])
-        store_base = int(ops["store_dtr_as_scene_base"])
-        scene = int(scene) & 0x0F
-        level = max(0, min(254, int(level)))
-
-        # Step1: 写DTR（命令发给目标）
-        self._send_command_to_target(target_mode, write_dtr, addr_val, unaddr)
-        # Step2: 再发一次写DTR值？——有的网关把“写DTR值”实现为“先ARC=level，再WRITE_DTR”
-        # 为了兼容性，先把ARC调到目标值（不影响最终存档），再写入DTR命令一次：
-        from .dali.frames import make_forward_frame, addr_broadcast, addr_short, addr_group
-        # 设ARC（S=0）
-        a = self._address_byte(target_mode, addr_val, unaddr, is_command=False)
-        self._transport.send(make_forward_frame(a, level))
-        # 写DTR（S=1）
-        a_cmd = self._address_byte(target_mode, addr_val, unaddr, is_command=True)
-        self._transport.send(make_forward_frame(a_cmd, write_dtr))
-
-        # Step3: 将DTR保存为场景
-        self._send_command_to_target(target_mode, store_base + scene, addr_val, unaddr)
+        self.execute(self.compile("scene_store_level", target_mode, addr_val, unaddr, int(scene), int(level)))
 
     def scene_remove(self, target_mode: str, scene: int, addr_val: int | None = None, unaddr: bool = False):
         """将目标从场景 scene(0..15) 中移除。"""
-        ops = self._cfg_ops()
-        opcode = int(ops["remove_from_scene_base"] + int(scene))
-        self._send_command_to_target(target_mode, opcode, addr_val, unaddr)
+        self.execute(self.compile("scene_remove", target_mode, addr_val, unaddr, int(scene)))
 
     # ========== 工具函数 ==========
+    @property
+    def ops(self) -> dict:
+        """当前生效的 opcode 表。"""
+        return self._cfg_ops()
+
     def _cfg_ops(self) -> dict:
         # 从 MainWindow 传入的 config 获取 ops；若没挂入，回退默认
         try:
@@ -220,107 +579,54 @@ class Controller:
         return ops
 
     def _address_byte(self, mode: str, addr_val: int | None, unaddr: bool, is_command: bool) -> int:
-        from .dali.frames import addr_broadcast, addr_short, addr_group
-        if mode == "broadcast":
-            return addr_broadcast(is_command=is_command, unaddressed=unaddr)
-        elif mode == "short":
-            if addr_val is None: raise ValueError("短地址缺失")
-            return addr_short(int(addr_val), is_command=is_command)
-        elif mode == "group":
-            if addr_val is None: raise ValueError("组地址缺失")
-            return addr_group(int(addr_val), is_command=is_command)
+        return CommandCompiler.address_byte(mode, addr_val, unaddr, is_command)
+
+    def _note(self, mode: str, addr_val: int | None, unaddr: bool, key: str, value) -> None:
+        """把命令的效果记入设备影子（仅发给未寻址设备的命令与影子无关）。"""
+        if not (mode == "broadcast" and unaddr):
+            self.registry.record_target(mode, addr_val, key, value, SRC_COMMAND)
+
+    def _forget(self, mode: str, addr_val: int | None, unaddr: bool) -> None:
+        """效果未知的命令：作废目标设备的全部影子。"""
+        if mode == "broadcast" and unaddr:
+            return
+        if mode == "short" and addr_val is not None:
+            self.registry.invalidate(int(addr_val))
         else:
-            raise ValueError("未知目标模式")
+            self.registry.invalidate()
 
-    def _send_command_to_target(self, mode: str, opcode: int, addr_val: int | None, unaddr: bool):
-        from .dali.frames import make_forward_frame
-        a = self._address_byte(mode, addr_val, unaddr, is_command=True)
-        frame = make_forward_frame(a, int(opcode) & 0xFF)
-        self._transport.send(frame)
+    def _is_read_only(self, opcode: int) -> bool:
+        ops = self._cfg_ops()
+        qs = int(ops.get("query_scene_level_base", 176))
+        return (opcode in (int(ops.get("query_status", 144)), int(ops.get("query_groups_0_7", 192)),
+                           int(ops.get("query_groups_8_15", 193)), int(ops.get("query_actual_level", 160)))
+                or qs <= opcode < qs + 16)
 
     # ====== DT8 / Tc ======
     def dt8_set_tc_kelvin(self, mode: str, kelvin: int,
-                          addr_val: int | None = None, unaddr: bool = False):
+                          addr_val: int | None = None, unaddr: bool = False, wait: bool = True):
         """以 K 设置色温（DT8 / Tc）。内部自动换算 Mirek 并写 DTR0/1，再启用DT8后发送 Set-Tc。"""
-        ops = self._cfg.get("ops", {})
-        tc_cfg = self._cfg.get("tc", {})
-        kmin = int(tc_cfg.get("kelvin_min", 1700))
-        kmax = int(tc_cfg.get("kelvin_max", 8000))
-
-        k = max(kmin, min(kmax, int(kelvin)))
-        # Mirek = 1e6 / K ；范围 1..65534（0保留），四舍五入
-        mirek = max(1, min(65534, int(round(1_000_000 / float(k)))))
-        lsb = mirek & 0xFF
-        msb = (mirek >> 8) & 0xFF
-
-        from .dali.frames import make_forward_frame
-
-        # 写 DTR0 / DTR1 （特殊地址字节）
-        self._transport.send(make_forward_frame(int(ops["write_dtr0_addr"]) & 0xFF, lsb))
-        self._transport.send(make_forward_frame(int(ops["write_dtr1_addr"]) & 0xFF, msb))
-
-        # 启用 Device Type = 8（特殊地址字节 0xC1, data=8）
-        self._transport.send(make_forward_frame(int(ops["dt8_enable_addr"]) & 0xFF, 8))
-
-        # 发送“Set Temporary Colour Temperature Tc”（寻址命令）
-        a = self._address_byte(mode, addr_val, unaddr, is_command=True)
-        self._transport.send(make_forward_frame(a, int(ops["dt8_set_tc_opcode"]) & 0xFF))
-
-        return {"kelvin": k, "mirek": mirek}
+        cmd = self.compile("dt8_tc_kelvin", mode, addr_val, unaddr, int(kelvin))
+        self.execute(cmd, wait)
+        return cmd.result_dict()
 
     # 可选：直接以 Mirek 设置（给自动化/脚本用）
     def dt8_set_tc_mirek(self, mode: str, mirek: int,
-                         addr_val: int | None = None, unaddr: bool = False):
-        mirek = max(1, min(65534, int(mirek)))
-        lsb = mirek & 0xFF
-        msb = (mirek >> 8) & 0xFF
-        ops = self._cfg.get("ops", {})
-        from .dali.frames import make_forward_frame
-        self._transport.send(make_forward_frame(int(ops["write_dtr0_addr"]) & 0xFF, lsb))
-        self._transport.send(make_forward_frame(int(ops["write_dtr1_addr"]) & 0xFF, msb))
-        self._transport.send(make_forward_frame(int(ops["dt8_enable_addr"]) & 0xFF, 8))
-        a = self._address_byte(mode, addr_val, unaddr, is_command=True)
-        self._transport.send(make_forward_frame(a, int(ops["dt8_set_tc_opcode"]) & 0xFF))
-        return {"mirek": mirek, "kelvin": int(round(1_000_000 / mirek))}
+                         addr_val: int | None = None, unaddr: bool = False, wait: bool = True):
+        cmd = self.compile("dt8_tc_mirek", mode, addr_val, unaddr, int(mirek))
+        self.execute(cmd, wait)
+        return cmd.result_dict()
 
     # ====== DT8 / xy ======
     def dt8_set_xy(self, mode: str, x: float, y: float,
-                   addr_val: int | None = None, unaddr: bool = False):
+                   addr_val: int | None = None, unaddr: bool = False, wait: bool = True):
         """
         设置 CIE xy（0..1）。内部：xy*65535 → 16位；依次写 X、写 Y。
         每次：写 DTR0/1 -> Enable DT8 -> 发送对应 opcode（寻址）。
         """
-        ops = self._cfg.get("ops", {})
-        set_x = int(ops.get("dt8_set_x_opcode", 224))
-        set_y = int(ops.get("dt8_set_y_opcode", 225))
-        w_dtr0 = int(ops.get("write_dtr0_addr", 163))  # 0xA3
-        w_dtr1 = int(ops.get("write_dtr1_addr", 195))  # 0xC3
-        ena    = int(ops.get("dt8_enable_addr", 193))  # 0xC1
-
-        def _u16(v: float) -> tuple[int, int]:
-            n = max(0, min(65535, int(round(float(v) * 65535.0))))
-            return n & 0xFF, (n >> 8) & 0xFF
-
-        from .dali.frames import make_forward_frame
-        # X
-        lsb, msb = _u16(x)
-        self._transport.send(make_forward_frame(w_dtr0, lsb))
-        self._transport.send(make_forward_frame(w_dtr1, msb))
-        self._transport.send(make_forward_frame(ena, 8))
-        a = self._address_byte(mode, addr_val, unaddr, is_command=True)
-        self._transport.send(make_forward_frame(a, set_x & 0xFF))
-
-        # Y
-        lsb, msb = _u16(y)
-        self._transport.send(make_forward_frame(w_dtr0, lsb))
-        self._transport.send(make_forward_frame(w_dtr1, msb))
-        self._transport.send(make_forward_frame(ena, 8))
-        self._transport.send(make_forward_frame(a, set_y & 0xFF))
-
-        return {
-            "x_u16": int(round(x*65535)), "y_u16": int(round(y*65535)),
-            "x": float(x), "y": float(y)
-        }
+        cmd = self.compile("dt8_xy", mode, addr_val, unaddr, float(x), float(y))
+        self.execute(cmd, wait)
+        return cmd.result_dict()
 
     # ====== DT8 / RGBW(A/F) 单通道 ======
     def dt8_set_primary(self, mode: str, channel: str, level: int,
@@ -329,39 +635,116 @@ class Controller:
         设置单个主色通道（RGBW/可扩展 A,F）。
         level 0..254（常见做法：写入 DTR0 然后发 'Set Primary X'）
         """
-        ops = self._cfg.get("ops", {})
-        prim_map: dict = ops.get("dt8_set_primary", {})
+        cmd = self.compile("dt8_primary", mode, addr_val, unaddr, channel.lower(), int(level))
+        self.execute(cmd)
+        return cmd.result_dict()
+
+    # ====== DT8 / RGBW 整色 ======
+    def dt8_set_rgbw(self, mode: str, r: int, g: int, b: int, w: int = 0,
+                     addr_val: int | None = None, unaddr: bool = False, wait: bool = True,
+                     path: str | None = None):
+        """
+        RGBW 整色。path 缺省取 ops.dt8_rgbw_mode：
+        - "activate"：DTR0/1/2 装载 R/G/B → Set Temporary RGB，W 经 DTR0 → Set Temporary WAF，
+          最后一次 Activate，四个通道同时生效；短地址目标的 W 在影子里未变时省去 WAF 一步（12 → 7 帧）
+        - "primary"：逐通道 Set Primary（旧路径，兼容不支持临时值/Activate 的设备）
+        """
+        cmd = self.compile("dt8_rgbw", mode, addr_val, unaddr, r, g, b, w, path)
+        self.execute(cmd, wait)
+        return [{"channel": ch, "level": v} for ch, v in cmd.result]
+
+    # ====== DT8 批量（多目标共用 DTR 写入） ======
+    @staticmethod
+    def _batch_target(key) -> tuple:
+        """批量接口的目标键：int 为短地址，"broadcast" 为广播，或 (mode, addr_val) 元组。"""
+        if isinstance(key, tuple):
+            return str(key[0]), (None if key[1] is None else int(key[1]))
+        if key == "broadcast":
+            return "broadcast", None
+        return "short", int(key)
+
+    def _run_dt8_batch(self, label: str, steps: list, notes: list) -> Dt8Plan:
+        plan = plan_dt8(steps, self._compiler.ops)
+        if plan.frames:
+            self.run_program(plan.program(label))
+        for mode, addr_val, key, value in notes:
+            self._note(mode, addr_val, False, key, value)
+        self._log.info("%s: %d 个目标 %d 帧（逐个下发 %d 帧）", label, plan.targets, len(plan.frames), plan.naive)
+        return plan
+
+    def dt8_set_tc_batch(self, targets: Mapping) -> Dt8Plan:
+        """批量设置色温 {目标: K}：相同 Mirek 的目标共用一次 DTR0/DTR1 写入。"""
+        c = self._compiler
+        kmin, kmax = c.kmin, c.kmax
+        opcode = int(c.ops["dt8_set_tc_opcode"]) & 0xFF
+        steps, notes = [], []
+        for key, kelvin in targets.items():
+            mode, addr_val = self._batch_target(key)
+            k = max(kmin, min(kmax, int(kelvin)))
+            mirek = max(1, min(65534, int(round(1_000_000 / float(k)))))
+            a = self._address_byte(mode, addr_val, False, is_command=True)
+            steps.append((a, opcode, mirek & 0xFF, (mirek >> 8) & 0xFF))
+            notes.append((mode, addr_val, "colour:tc_mirek", mirek))
+        return self._run_dt8_batch("dt8_tc_batch", steps, notes)
+
+    def dt8_set_xy_batch(self, targets: Mapping) -> Dt8Plan:
+        """批量设置 CIE xy {目标: (x, y)}：先统一写 X，再统一写 Y。"""
+        ops = self._compiler.ops
+        set_x = int(ops["dt8_set_x_opcode"]) & 0xFF
+        set_y = int(ops["dt8_set_y_opcode"]) & 0xFF
+        steps, notes = [], []
+        for key, (x, y) in targets.items():
+            mode, addr_val = self._batch_target(key)
+            a = self._address_byte(mode, addr_val, False, is_command=True)
+            for opcode, v, name in ((set_x, x, "colour:x"), (set_y, y, "colour:y")):
+                n = max(0, min(65535, int(round(float(v) * 65535.0))))
+                steps.append((a, opcode, n & 0xFF, (n >> 8) & 0xFF))
+                notes.append((mode, addr_val, name, n))
+        return self._run_dt8_batch("dt8_xy_batch", steps, notes)
+
+    def dt8_set_primary_batch(self, channel: str, targets: Mapping) -> Dt8Plan:
+        """批量设置单个主色通道 {目标: level}：相同 level 的目标共用一次 DTR0 写入。"""
+        prim_map: dict = self._compiler.ops.get("dt8_set_primary", {})
         opcode = prim_map.get(channel.lower())
         if opcode is None:
             raise ValueError(f"配置中未定义主色通道 '{channel}' 的 opcode")
-        w_dtr0 = int(ops.get("write_dtr0_addr", 163))
-        ena    = int(ops.get("dt8_enable_addr", 193))
-
-        level = max(0, min(254, int(level)))
-        from .dali.frames import make_forward_frame
-
-        self._transport.send(make_forward_frame(w_dtr0, level & 0xFF))
-        self._transport.send(make_forward_frame(ena, 8))
-        a = self._address_byte(mode, addr_val, unaddr, is_command=True)
-        self._transport.send(make_forward_frame(a, int(opcode) & 0xFF))
-        return {"channel": channel.lower(), "level": level}
-
-    # ====== DT8 / RGBW 批量 ======
-    def dt8_set_rgbw(self, mode: str, r: int, g: int, b: int, w: int = 0,
-                     addr_val: int | None = None, unaddr: bool = False):
-        out = []
-        for ch, val in (("r", r), ("g", g), ("b", b), ("w", w)):
-            out.append(self.dt8_set_primary(mode, ch, val, addr_val=addr_val, unaddr=unaddr))
-        return out
+        steps, notes = [], []
+        for key, level in targets.items():
+            mode, addr_val = self._batch_target(key)
+            level = max(0, min(254, int(level)))
+            a = self._address_byte(mode, addr_val, False, is_command=True)
+            steps.append((a, int(opcode) & 0xFF, level, None))
+            notes.append((mode, addr_val, f"colour:{channel.lower()}", level))
+        return self._run_dt8_batch("dt8_primary_batch", steps, notes)
 
     # 原始两字节前向帧（addr, data）
     def send_raw(self, addr_byte: int, data_byte: int):
-        from .dali.frames import make_forward_frame
         a = int(addr_byte) & 0xFF
         d = int(data_byte) & 0xFF
-        self._transport.send(make_forward_frame(a, d))
+        self._forget_raw([a])
+        self.run_program(ProgramBuilder("raw", raw=True).send(a, d).build())
 
     # 批量发送多帧
-    def send_sequence(self, frames: list[tuple[int, int]]):
-        for a, d in frames:
-            self.send_raw(a, d)
+    def send_sequence(self, frames: list[tuple[int, int]] | bytes | bytearray | memoryview):
+        """frames 为 [(addr, data), ...] 或连续的 2 字节帧缓冲；整段作为一个原子程序，
+        连续帧由执行器一次写出。"""
+        if isinstance(frames, (bytes, bytearray, memoryview)):
+            buf = bytes(frames)
+            if len(buf) % 2:
+                raise ValueError("帧缓冲长度必须为偶数")
+        else:
+            buf = bytes(b for a, d in frames for b in (int(a) & 0xFF, int(d) & 0xFF))
+        self._forget_raw(list(buf[0::2]))
+        self.run_program(FrameProgram(buf, label="raw_seq", raw=True))
+
+    def _forget_raw(self, addrs: list[int]) -> None:
+        """原始帧不解析语义：短地址帧作废该设备影子，其余（组/广播/特殊命令）作废全部。
+        原始帧可能改写短地址（PROGRAM SHORT ADDRESS、DTR0 AS SHORT ADDRESS），在线设备集合一律作废。"""
+        if addrs:
+            self.invalidate_population()
+        for a in addrs:
+            if a < 0x80:
+                self.registry.invalidate((a >> 1) & 0x3F)
+            else:
+                self.registry.invalidate()
+                return
@@ -0,0 +1,102 @@
+from __future__ import annotations
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass, fields
+from typing import Dict
+
+# DALI 物理层：1200 bit/s，曼彻斯特编码，半比特时间 Te = 1/2400 s
+TE_MS = 1000.0 / 2400.0
+
+
+@dataclass(frozen=True)
+class DaliTiming:
+    """DALI 线路时序（毫秒），默认值取自 IEC 62386-101。"""
+    forward_ms: float = 38 * TE_MS        # 起始位 + 16 位 + 停止位 ≈ 15.8 ms
+    backward_ms: float = 22 * TE_MS       # 起始位 + 8 位 + 停止位 ≈ 9.2 ms
+    settle_forward_ms: float = 13.5       # 前向帧 → 下一前向帧 的最小间隔
+    reply_window_ms: float = 10.5         # 前向帧结束 → 后向帧开始 的最长等待
+    settle_backward_ms: float = 2.4       # 后向帧 → 下一前向帧 的最小间隔
+
+    @classmethod
+    def from_cfg(cls, cfg: dict | None) -> "DaliTiming":
+        cfg = cfg or {}
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: float(v) for k, v in cfg.items() if k in names})
+
+    def frame_slot_ms(self, expect_reply: bool = False) -> float:
+        """一帧占用总线的时间（含沉降）；查询按“有应答”的最长情况计。"""
+        if expect_reply:
+            return self.forward_ms + self.reply_window_ms + self.backward_ms + self.settle_backward_ms
+        return self.forward_ms + self.settle_forward_ms
+
+    def estimate_ms(self, frames: int, queries: int = 0) -> float:
+        """估算 frames 帧（其中 queries 条查询）所需的总线时间。"""
+        plain = max(0, int(frames) - int(queries))
+        return plain * self.frame_slot_ms(False) + int(queries) * self.frame_slot_ms(True)
+
+
+class BusPacer:
+    """按 DALI 线路时序给前向帧配速，并统计总线占用率。
+
+    - acquire(n) 在总线空闲前阻塞（enforce=False 时只计量不等待），然后为 n 帧预留时间；
+    - note_backward() 记录一次后向帧，占用其帧时间与后续沉降；
+    - utilisation() 返回最近 window_s 秒内的总线占用百分比。
+    任何 Transport 都可以通过 PacedTransport 挂上它。
+    """
+    def __init__(self, timing: DaliTiming | None = None, enforce: bool = True, window_s: float = 2.0):
+        self.timing = timing or DaliTiming()
+        self.enforce = bool(enforce)
+        self.window_s = float(window_s)
+        self._free_at = 0.0
+        self._busy: deque[tuple[float, float]] = deque()
+        self._lock = threading.Lock()
+        self._counts: Dict[str, float] = {"forward": 0, "backward": 0, "paced_wait_ms": 0.0}
+
+    def acquire(self, n: int = 1) -> float:
+        """为 n 个连续前向帧预留总线；返回为配速而等待的秒数。"""
+        n = max(1, int(n))
+        t = self.timing
+        with self._lock:
+            now = time.monotonic()
+            # 不配速时帧仍在网关里排队上线，占用按串行时间线计，只是不在本地等待
+            start = max(now, self._free_at)
+            wait = start - now if self.enforce else 0.0
+            dur = (n * t.forward_ms + (n - 1) * t.settle_forward_ms) / 1000.0
+            self._free_at = start + dur + t.settle_forward_ms / 1000.0
+            self._busy.append((start, start + dur))
+            self._counts["forward"] += n
+            self._counts["paced_wait_ms"] += wait * 1000.0
+            self._trim(now)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def note_backward(self) -> None:
+        t = self.timing
+        with self._lock:
+            now = time.monotonic()
+            start = now - t.backward_ms / 1000.0
+            self._busy.append((start, now))
+            self._free_at = max(self._free_at, now + t.settle_backward_ms / 1000.0)
+            self._counts["backward"] += 1
+            self._trim(now)
+
+    def utilisation(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            lo = now - self.window_s
+            busy = sum(max(0.0, min(e, now) - max(s, lo)) for s, e in self._busy)
+        return max(0.0, min(100.0, busy / self.window_s * 100.0))
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            out = dict(self._counts)
+        out["utilisation_pct"] = self.utilisation()
+        return out
+
+    def _trim(self, now: float):
+        lo = now - self.window_s
+        while self._busy and self._busy[0][1] < lo:
+            self._busy.popleft()
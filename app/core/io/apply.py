@@ -1,37 +1,107 @@
 from __future__ import annotations
+from dataclasses import dataclass, field
 from typing import List, Dict, Any
 from pathlib import Path
 
 from .state_io import GroupEntry, SceneEntry
+from ..dali.timing import DaliTiming
 
-def apply_groups(controller, entries: List[GroupEntry], clear_others: bool = False):
+# 每条命令的帧数：组加入/移除、场景回放各 1 帧，scene_store_level 为 4 帧
+_FRAMES_GROUP_CMD = 1
+_FRAMES_SCENE_STORE = 4
+_FRAMES_SCENE_RECALL = 1
+
+
+@dataclass
+class ApplyReport:
+    """一次应用的帧数统计；dry_run=True 时只读回与计算，不写设备。"""
+    frames: int = 0             # 写入帧数
+    queries: int = 0            # 为比对而读回的查询帧数（影子命中不计）
+    naive_frames: int = 0       # 不做比对时需要的写入帧数
+    est_ms: float = 0.0         # 读回 + 写入的估算总线时间
+    changes: List[str] = field(default_factory=list)
+    dry_run: bool = False
+
+    def summary(self) -> str:
+        return (f"{'预演' if self.dry_run else '已应用'}：{len(self.changes)} 处差异，写入 {self.frames} 帧"
+                f"（全量 {self.naive_frames} 帧），读回 {self.queries} 帧，约 {self.est_ms / 1000.0:.1f} s")
+
+
+def _finish(controller, rep: ApplyReport) -> ApplyReport:
+    timing = controller.bus_timing() if hasattr(controller, "bus_timing") else DaliTiming()
+    rep.est_ms = timing.estimate_ms(rep.frames + rep.queries, rep.queries)
+    return rep
+
+
+def _fresh(controller, short: int, key: str, max_age: float | None) -> bool:
+    registry = getattr(controller, "registry", None)
+    return registry is not None and registry.get(short, key, max_age) is not None
+
+
+def apply_groups(controller, entries: List[GroupEntry], clear_others: bool = False,
+                 delta: bool = False, dry_run: bool = False,
+                 max_age: float | None = None) -> ApplyReport:
     """
     将组成员关系应用到设备。
     - 若 clear_others=True，会对每个 short 发送“从所有未列出的组移除”，总最多16条。
     - 否则只发送“加入列表中的组”（不做移除）。
+    - delta=True 时先读回（或取设备影子中的）当前组位图，只发送有差异的加入/移除；
+      读不到的设备按全量处理。dry_run=True 时只统计不写入。
     """
+    rep = ApplyReport(dry_run=dry_run)
     for e in entries:
+        short = int(e.short)
         want = set(int(g) for g in e.groups)
-        if clear_others:
-            for g in range(16):
-                if g in want:
-                    controller.group_add("short", g, addr_val=int(e.short))
-                else:
-                    controller.group_remove("short", g, addr_val=int(e.short))
-        else:
-            for g in sorted(want):
-                controller.group_add("short", g, addr_val=int(e.short))
-
-def apply_scenes(controller, entries: List[SceneEntry], recall_after_store: bool = False):
+        full = set(range(16)) if clear_others else set(want)
+        rep.naive_frames += len(full) * _FRAMES_GROUP_CMD
+        todo = sorted(full)
+        if delta:
+            if not _fresh(controller, short, "groups", max_age):
+                rep.queries += 2
+            groups = controller.query_groups(short, max_age=max_age)
+            if _fresh(controller, short, "groups", None):
+                have = {g for g, v in groups.items() if v}
+                todo = sorted(g for g in full if (g in want) != (g in have))
+        for g in todo:
+            add = g in want
+            rep.changes.append(f"short {short}: {'+' if add else '-'}group {g}")
+            rep.frames += _FRAMES_GROUP_CMD
+            if dry_run:
+                continue
+            if add:
+                controller.group_add("short", g, addr_val=short)
+            else:
+                controller.group_remove("short", g, addr_val=short)
+    return _finish(controller, rep)
+
+def apply_scenes(controller, entries: List[SceneEntry], recall_after_store: bool = False,
+                 delta: bool = False, dry_run: bool = False,
+                 max_age: float | None = None) -> ApplyReport:
     """
     将亮度表写入场景。entries[i].levels 形如 {"2":128, "5":254}
+    delta=True 时只写入与设备当前场景亮度不同的场景（读回或取设备影子）。
     """
+    rep = ApplyReport(dry_run=dry_run)
+    per_scene = _FRAMES_SCENE_STORE + (_FRAMES_SCENE_RECALL if recall_after_store else 0)
     for e in entries:
+        short = int(e.short)
         for s_str, level in e.levels.items():
             scene = int(s_str)
-            controller.scene_store_level("short", scene, int(level), addr_val=int(e.short))
+            level = int(level)
+            rep.naive_frames += per_scene
+            if delta:
+                if not _fresh(controller, short, f"scene:{scene}", max_age):
+                    rep.queries += 1
+                if controller.query_scene_level(short, scene, max_age=max_age) == level:
+                    continue
+            rep.changes.append(f"short {short}: scene {scene} = {level}")
+            rep.frames += per_scene
+            if dry_run:
+                continue
+            controller.scene_store_level("short", scene, level, addr_val=short)
             if recall_after_store:
-                controller.scene_recall("short", scene, addr_val=int(e.short))
+                controller.scene_recall("short", scene, addr_val=short)
+    return _finish(controller, rep)
 
 def merge_presets(cfg_presets: List[Dict[str, Any]], user_presets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """按 name 去重合并（user 覆盖同名项）"""
@@ -0,0 +1,254 @@
+from __future__ import annotations
+import copy
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .controller import Controller
+
+
+@dataclass(frozen=True)
+class Target:
+    """站点内的寻址目标：(总线, 短地址/组/广播)。"""
+    bus: str
+    mode: str = "broadcast"           # 'broadcast' | 'short' | 'group'
+    addr_val: Optional[int] = None
+    unaddr: bool = False
+
+    @classmethod
+    def parse(cls, spec: str) -> "Target":
+        """'A:short:5' / 'A:group:3' / 'A:broadcast' → Target"""
+        parts = [p.strip() for p in str(spec).split(":")]
+        if len(parts) < 2 or parts[1] not in ("broadcast", "short", "group"):
+            raise ValueError(f"无效目标: {spec!r}")
+        return cls(parts[0], parts[1], int(parts[2]) if len(parts) > 2 and parts[2] else None)
+
+
+@dataclass
+class BusResult:
+    """一条总线的下发结果。超时的命令若尚未出队即被取消；已在执行的无法撤回，
+    稍后仍会在总线上生效（in_flight=True）。"""
+    ok: bool
+    latency_ms: float                 # 从开始下发到该总线帧写出完成
+    error: Optional[BaseException] = None
+    in_flight: bool = False           # 超时时命令已开始执行，之后仍可能生效
+
+
+@dataclass
+class FanOut:
+    """一次全站下发的结果：各总线成败与延迟，以及最早/最晚完成的总线之间的偏差。"""
+    action: str
+    buses: Dict[str, BusResult] = field(default_factory=dict)
+    skew_ms: float = 0.0
+    frame_ms: float = 0.0             # 一个 DALI 前向帧时间，作为偏差的参照
+
+    @property
+    def ok(self) -> bool:
+        return all(r.ok for r in self.buses.values())
+
+    @property
+    def failed(self) -> List[str]:
+        return [b for b, r in self.buses.items() if not r.ok]
+
+    @property
+    def within_frame(self) -> bool:
+        return self.skew_ms <= self.frame_ms
+
+    def summary(self) -> Dict[str, object]:
+        lat = [r.latency_ms for r in self.buses.values() if r.ok]
+        return {"action": self.action, "buses": len(self.buses), "failed": len(self.failed),
+                "max_latency_ms": max(lat, default=0.0), "skew_ms": self.skew_ms,
+                "within_frame": self.within_frame}
+
+
+class GatewayPool:
+    """多网关连接池：配置 gateways 列表中的每一项对应一条总线、一个 Controller。
+
+    - 每项可覆盖 gateway 段的任意字段，bus 为总线名（缺省为序号）；未配置 gateways 时只有一条总线；
+    - 每个 Controller 有自己的执行线程，因此不同总线上的命令天然并发，同一总线上仍严格串行；
+    - execute() 按目标所在总线路由，先把全部命令提交到各自的执行器再统一等待；
+      broadcast() 对全站每条总线同时下发广播，而不是逐条总线执行；
+    - fan_out() 先在各总线上编译好同一动作，再在一个紧凑循环里提交到所有执行器，
+      返回各总线成败、延迟与总线间偏差（scene_recall / dt8_set_tc_kelvin 为其快捷方式）。
+    """
+    def __init__(self, cfg: dict, factory: Callable[[dict], Controller] = Controller):
+        self._cfg = cfg
+        self._log = logging.getLogger("GatewayPool")
+        self._ctrls: Dict[str, Controller] = {}
+        base = dict(cfg.get("gateway", {}))
+        entries = cfg.get("gateways") or [dict(bus=base.get("bus", "0"))]
+        for i, entry in enumerate(entries):
+            entry = dict(entry)
+            bus = str(entry.pop("bus", i))
+            if bus in self._ctrls:
+                raise ValueError(f"总线名重复: {bus}")
+            sub = copy.copy(cfg)
+            sub["gateway"] = {**base, **entry}
+            self._ctrls[bus] = factory(sub)
+        self._fan_lock = threading.Lock()
+        self._fan_counts: Dict[str, float] = {"fan_outs": 0, "bus_failures": 0, "over_frame": 0,
+                                              "last_skew_ms": 0.0, "max_skew_ms": 0.0}
+        self._log.info("Gateway pool: %d buses", len(self._ctrls))
+
+    @property
+    def buses(self) -> List[str]:
+        return list(self._ctrls)
+
+    def controller(self, bus) -> Controller:
+        try:
+            return self._ctrls[str(bus)]
+        except KeyError:
+            raise ValueError(f"未知总线: {bus}") from None
+
+    # 连接管理：各总线并行连接/断开
+    def _each(self, fn: Callable[[Controller], object]) -> Dict[str, object]:
+        with ThreadPoolExecutor(max_workers=min(32, max(1, len(self._ctrls))),
+                                thread_name_prefix="pool") as ex:
+            futs = {bus: ex.submit(fn, c) for bus, c in self._ctrls.items()}
+        return {bus: f.result() for bus, f in futs.items()}
+
+    def connect(self) -> Dict[str, bool]:
+        res = self._each(lambda c: c.connect())
+        down = [b for b, ok in res.items() if not ok]
+        if down:
+            self._log.warning("以下总线连接失败: %s", ", ".join(down))
+        return res
+
+    def disconnect(self) -> None:
+        self._each(lambda c: c.disconnect())
+
+    def close(self) -> None:
+        self._each(lambda c: c.close())
+
+    def is_connected(self) -> Dict[str, bool]:
+        return {bus: c.is_connected() for bus, c in self._ctrls.items()}
+
+    # 路由与并发下发
+    def submit(self, action: str, target: Target, *args) -> Future:
+        """把一条高层动作（动作与参数同 Controller.compile）提交到目标所在总线，返回 Future。"""
+        ctrl = self.controller(target.bus)
+        return ctrl.execute(ctrl.compile(action, target.mode, target.addr_val, target.unaddr, *args),
+                            wait=False)
+
+    def execute(self, action: str, targets: Target | Iterable[Target], *args,
+                wait: bool = True) -> Dict[Target, object]:
+        """对多个目标执行同一动作：全部提交后再等待，各总线并发、同一总线按提交顺序。
+        wait=True 返回 {目标: None | 异常}（单条总线失败不影响其它总线）；wait=False 返回 {目标: Future}。"""
+        if isinstance(targets, Target):
+            targets = [targets]
+        futs: Dict[Target, Future] = {}
+        for t in targets:
+            try:
+                futs[t] = self.submit(action, t, *args)
+            except Exception as exc:
+                futs[t] = Future()
+                futs[t].set_exception(exc)
+        if not wait:
+            return futs
+        wait_futures(list(futs.values()))
+        out = {t: f.exception() for t, f in futs.items()}
+        failed = [t for t, e in out.items() if e is not None]
+        if failed:
+            self._log.warning("%s: %d/%d 个目标失败", action, len(failed), len(out))
+        return out
+
+    def broadcast(self, action: str, *args, buses: Iterable | None = None) -> Dict[str, object]:
+        """全站广播：每条总线各发一次广播帧，并行下发；返回 {总线: None | 异常}。"""
+        return {b: r.error for b, r in self.fan_out(action, *args, buses=buses).buses.items()}
+
+    def fan_out(self, action: str, *args, mode: str = "broadcast", addr_val: int | None = None,
+                buses: Iterable | None = None, timeout: float | None = None) -> FanOut:
+        """把同一动作同时下发到多条总线（默认每条总线广播），等待全部完成。
+
+        编译在提交前完成，提交循环里只剩入队；各总线的完成时刻在执行线程里记录，
+        skew_ms 为成功总线中最早与最晚完成之差。超过 timeout 仍未完成的总线记为失败：
+        还在排队的命令被取消，不会再上总线；已开始执行的无法撤回，记 in_flight=True，稍后仍会生效。
+        """
+        names = self.buses if buses is None else [str(b) for b in buses]
+        res = FanOut(action, frame_ms=self._frame_ms())
+        cmds = {}
+        for bus in names:
+            try:
+                ctrl = self.controller(bus)
+                cmds[bus] = (ctrl, ctrl.compile(action, mode, addr_val, False, *args))
+            except Exception as exc:
+                res.buses[bus] = BusResult(False, 0.0, exc)
+        done_at: Dict[str, float] = {}
+        futs: Dict[str, Future] = {}
+        # 完成回调先记时刻再放行（Future 在执行回调之前就会唤醒等待者）
+        pending = threading.Semaphore(0)
+
+        def _done(_f, b):
+            done_at[b] = time.perf_counter()
+            pending.release()
+
+        t0 = time.perf_counter()
+        for bus, (ctrl, cmd) in cmds.items():
+            try:
+                fut = ctrl.execute(cmd, wait=False)
+            except Exception as exc:
+                res.buses[bus] = BusResult(False, 0.0, exc)
+                continue
+            fut.add_done_callback(lambda f, b=bus: _done(f, b))
+            futs[bus] = fut
+        deadline = None if timeout is None else t0 + timeout
+        for _ in futs:
+            remain = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            if not pending.acquire(timeout=remain):
+                break
+        late = [bus for bus in futs if bus not in done_at]
+        for bus, fut in futs.items():
+            if bus in late:
+                # 取消会触发完成回调，因此先记下超时的总线再取消
+                in_flight = not fut.cancel()
+                msg = f"总线 {bus} 未在 {timeout}s 内完成" + ("，命令仍在执行" if in_flight else "，已取消")
+                res.buses[bus] = BusResult(False, (time.perf_counter() - t0) * 1000.0,
+                                           TimeoutError(msg), in_flight)
+                continue
+            exc = fut.exception()
+            res.buses[bus] = BusResult(exc is None, (done_at.get(bus, t0) - t0) * 1000.0, exc)
+        ok = [done_at[b] for b, r in res.buses.items() if r.ok and b in done_at]
+        res.skew_ms = (max(ok) - min(ok)) * 1000.0 if ok else 0.0
+        self._note_fan_out(res)
+        return res
+
+    def scene_recall(self, scene: int, buses: Iterable | None = None, mode: str = "broadcast",
+                     addr_val: int | None = None) -> FanOut:
+        """全站调用场景（默认每条总线广播）。"""
+        return self.fan_out("scene_recall", int(scene), mode=mode, addr_val=addr_val, buses=buses)
+
+    def dt8_set_tc_kelvin(self, kelvin: int, buses: Iterable | None = None, mode: str = "broadcast",
+                          addr_val: int | None = None) -> FanOut:
+        """全站设置 DT8 色温（默认每条总线广播）。"""
+        return self.fan_out("dt8_tc_kelvin", int(kelvin), mode=mode, addr_val=addr_val, buses=buses)
+
+    def _frame_ms(self) -> float:
+        ctrl = next(iter(self._ctrls.values()), None)
+        return ctrl.bus_timing().forward_ms if ctrl is not None else 0.0
+
+    def _note_fan_out(self, res: FanOut) -> None:
+        with self._fan_lock:
+            c = self._fan_counts
+            c["fan_outs"] += 1
+            c["bus_failures"] += len(res.failed)
+            c["over_frame"] += int(not res.within_frame)
+            c["last_skew_ms"] = res.skew_ms
+            c["max_skew_ms"] = max(c["max_skew_ms"], res.skew_ms)
+        if not res.ok:
+            self._log.warning("%s: %d/%d 条总线失败: %s", res.action, len(res.failed), len(res.buses),
+                              ", ".join(res.failed))
+
+    def fan_out_stats(self) -> Dict[str, float]:
+        """全站下发计量：次数、失败的总线数、偏差超过一帧的次数、最近/最大偏差。"""
+        with self._fan_lock:
+            return dict(self._fan_counts)
+
+    def send_arc(self, target: Target, value: int, wait: bool = True):
+        return self.execute("arc", target, int(value), wait=wait)[target]
+
+    # 计量
+    def bus_stats(self) -> Dict[str, Dict[str, object]]:
+        return {bus: c.bus_stats() for bus, c in self._ctrls.items()}
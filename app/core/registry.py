@@ -0,0 +1,164 @@
+from __future__ import annotations
+import time
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Optional
+
+# 数据来源
+SRC_QUERY = "query"        # 总线读回
+SRC_COMMAND = "command"    # 由本机发出的命令推断
+
+
+@dataclass
+class Fact:
+    value: object
+    ts: float
+    source: str
+
+    def age(self, now: float) -> float:
+        return now - self.ts
+
+
+@dataclass
+class DeviceShadow:
+    """单个短地址的影子状态；键为字段名（level/groups/scene:N/colour:xxx）。"""
+    short: int
+    facts: Dict[str, Fact] = field(default_factory=dict)
+
+
+class DeviceRegistry:
+    """设备影子登记表：按短地址缓存亮度、组位图、场景表和 DT8 颜色，带 TTL 与来源。
+
+    - record() 写入一条事实（来源 query/command）；get() 只返回未过期的事实；
+    - 组/广播目标的命令只更新组成员关系已知的设备，成员未知的设备对应字段直接作废，
+      避免把推断当成事实；
+    - 线程安全：GUI、执行器回调和后台线程都可能同时读写。
+    """
+
+    def __init__(self, ttl: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.ttl = float(ttl)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._devices: Dict[int, DeviceShadow] = {}
+        self.counters: Dict[str, int] = {"hits": 0, "misses": 0, "records": 0, "invalidations": 0}
+
+    # ---------- 读 ----------
+    def get(self, short: int, key: str, max_age: float | None = None) -> Optional[Fact]:
+        """返回未过期的事实；max_age=None 用 ttl，max_age=0 视为强制读总线。"""
+        limit = self.ttl if max_age is None else float(max_age)
+        with self._lock:
+            dev = self._devices.get(int(short))
+            fact = dev.facts.get(key) if dev is not None else None
+            if fact is None or limit <= 0 or fact.age(self._clock()) > limit:
+                self.counters["misses"] += 1
+                return None
+            self.counters["hits"] += 1
+            return fact
+
+    def peek(self, short: int, key: str) -> Optional[Fact]:
+        """不计命中、不看 TTL 地取最后一次记录（导出/显示用）。"""
+        with self._lock:
+            dev = self._devices.get(int(short))
+            return dev.facts.get(key) if dev is not None else None
+
+    def shorts(self) -> list[int]:
+        with self._lock:
+            return sorted(self._devices)
+
+    def members(self, group: int) -> Optional[list[int]]:
+        """组成员关系全部已知且未过期时返回成员列表，否则 None。"""
+        now = self._clock()
+        out = []
+        with self._lock:
+            for short, dev in self._devices.items():
+                fact = dev.facts.get("groups")
+                if fact is None or fact.age(now) > self.ttl:
+                    return None
+                if (int(fact.value) >> int(group)) & 1:
+                    out.append(short)
+        return sorted(out)
+
+    # ---------- 写 ----------
+    def record(self, short: int, key: str, value, source: str = SRC_QUERY) -> None:
+        with self._lock:
+            dev = self._devices.setdefault(int(short), DeviceShadow(int(short)))
+            dev.facts[key] = Fact(value, self._clock(), source)
+            self.counters["records"] += 1
+
+    def update(self, short: int, key: str, fn: Callable[[object], object],
+               source: str = SRC_COMMAND) -> bool:
+        """在未过期的旧值上做增量修改（如组位图置位）；旧值未知/过期时作废该字段。"""
+        with self._lock:
+            dev = self._devices.get(int(short))
+            fact = dev.facts.get(key) if dev is not None else None
+            if fact is None or fact.age(self._clock()) > self.ttl:
+                if fact is not None:
+                    del dev.facts[key]
+                    self.counters["invalidations"] += 1
+                return False
+            dev.facts[key] = Fact(fn(fact.value), self._clock(), source)
+            self.counters["records"] += 1
+            return True
+
+    def invalidate(self, short: int | None = None, keys: Iterable[str] | None = None) -> None:
+        """作废指定设备（None 为全部）的指定字段（None 为全部字段）。"""
+        with self._lock:
+            devs = list(self._devices.values()) if short is None else \
+                [d for d in (self._devices.get(int(short)),) if d is not None]
+            for dev in devs:
+                if keys is None:
+                    n = len(dev.facts)
+                    dev.facts.clear()
+                else:
+                    n = 0
+                    for k in list(dev.facts):
+                        if any(k == p or k.startswith(p + ":") for p in keys):
+                            del dev.facts[k]
+                            n += 1
+                self.counters["invalidations"] += n
+
+    # ---------- 按目标写入（命令推断） ----------
+    def targets(self, mode: str, addr_val: int | None) -> tuple[list[int], bool]:
+        """命令目标 → (受影响且已知的短地址, 是否完全确定)。"""
+        if mode == "short" and addr_val is not None:
+            return [int(addr_val)], True
+        if mode == "group" and addr_val is not None:
+            members = self.members(int(addr_val))
+            return (members, True) if members is not None else (self.shorts(), False)
+        return self.shorts(), True
+
+    def record_target(self, mode: str, addr_val: int | None, key: str, value,
+                      source: str = SRC_COMMAND) -> None:
+        shorts, exact = self.targets(mode, addr_val)
+        if not exact:
+            for s in shorts:
+                self.invalidate(s, [key])
+            return
+        for s in shorts:
+            self.record(s, key, value, source)
+
+    def update_target(self, mode: str, addr_val: int | None, key: str,
+                      fn: Callable[[object], object]) -> None:
+        shorts, exact = self.targets(mode, addr_val)
+        for s in shorts:
+            if exact:
+                self.update(s, key, fn)
+            else:
+                self.invalidate(s, [key])
+
+    # ---------- 统计/导出 ----------
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            out: Dict[str, float] = dict(self.counters)
+            out["devices"] = len(self._devices)
+            out["facts"] = sum(len(d.facts) for d in self._devices.values())
+        total = out["hits"] + out["misses"]
+        out["hit_pct"] = 100.0 * out["hits"] / total if total else 0.0
+        return out
+
+    def snapshot(self) -> Dict[int, Dict[str, dict]]:
+        now = self._clock()
+        with self._lock:
+            return {s: {k: {"value": f.value, "age_s": round(f.age(now), 3), "source": f.source}
+                        for k, f in d.facts.items()}
+                    for s, d in sorted(self._devices.items())}
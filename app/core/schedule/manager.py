@@ -7,6 +7,8 @@ from datetime import datetime, timedelta
 
 from PySide6.QtCore import QObject, Signal, QTimer, QDateTime
 
+from app.core.bus.executor import Lane
+
 # ---- 数据结构 ----
 @dataclass
 class Task:
@@ -215,33 +217,39 @@ class ScheduleManager(QObject):
             if not self.ctrl.is_connected():
                 self.message.emit(f"任务跳过（未连接）：{task.name}")
                 return
-            m = task.mode; a = task.addr_val; u = task.unaddr
-            act = (task.action or "").lower()
-            p = task.params or {}
-            if act == "arc":
-                v = int(p.get("value", 128))
-                self.ctrl.send_arc(m, v, addr_val=a, unaddr=u)
-            elif act == "scene":
-                sc = int(p.get("scene", 0))
-                self.ctrl.scene_recall(m, sc, addr_val=a, unaddr=u)
-            elif act == "dt8_tc":
-                k = int(p.get("kelvin", 4000))
-                self.ctrl.dt8_set_tc_kelvin(m, k, addr_val=a, unaddr=u)
-            elif act == "dt8_xy":
-                x = float(p.get("x", 0.313)); y = float(p.get("y", 0.329))
-                self.ctrl.dt8_set_xy(m, x, y, addr_val=a, unaddr=u)
-            elif act == "dt8_rgbw":
-                r = int(p.get("r", 0)); g = int(p.get("g", 0)); b = int(p.get("b", 0)); w = int(p.get("w", 0))
-                self.ctrl.dt8_set_rgbw(m, r, g, b, w, addr_val=a, unaddr=u)
-            elif act == "raw":
-                # frames: [[addr,data], ...]
-                frames = p.get("frames") or []
-                for pair in frames:
-                    if isinstance(pair, (list, tuple)) and len(pair) == 2:
-                        self.ctrl.send_raw(int(pair[0]), int(pair[1]))
-            else:
-                self.message.emit(f"未知动作：{act}")
-                return
-            self.message.emit(f"任务执行：{task.name}")
+            # 定时任务走 scheduled 通道：优先于压测/扫描，让位于界面操作
+            with self.ctrl.lane(Lane.SCHEDULED):
+                ok = self._dispatch(task)
+            if ok:
+                self.message.emit(f"任务执行：{task.name}")
         except Exception as e:
             self.message.emit(f"任务执行失败：{task.name} -> {e!r}")
+
+    def _dispatch(self, task: Task) -> bool:
+        m = task.mode; a = task.addr_val; u = task.unaddr
+        act = (task.action or "").lower()
+        p = task.params or {}
+        if act == "raw":
+            # frames: [[addr,data], ...]
+            frames = p.get("frames") or []
+            for pair in frames:
+                if isinstance(pair, (list, tuple)) and len(pair) == 2:
+                    self.ctrl.send_raw(int(pair[0]), int(pair[1]))
+            return True
+        if act == "arc":
+            args = (int(p.get("value", 128)),)
+        elif act == "scene":
+            act, args = "scene_recall", (int(p.get("scene", 0)),)
+        elif act == "dt8_tc":
+            act, args = "dt8_tc_kelvin", (int(p.get("kelvin", 4000)),)
+        elif act == "dt8_xy":
+            args = (float(p.get("x", 0.313)), float(p.get("y", 0.329)))
+        elif act == "dt8_rgbw":
+            args = (int(p.get("r", 0)), int(p.get("g", 0)), int(p.get("b", 0)), int(p.get("w", 0)),
+                    p.get("rgbw_path"))
+        else:
+            self.message.emit(f"未知动作：{act}")
+            return False
+        # 周期任务每次触发命中编译缓存，只剩执行
+        self.ctrl.execute(self.ctrl.compile(act, m, a, u, *args))
+        return True
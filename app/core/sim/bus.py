@@ -0,0 +1,243 @@
+from __future__ import annotations
+import random
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from ..config import default_ops
+
+MASK = 0xFF   # DALI 中 255 表示“无值/不改变”
+
+
+@dataclass
+class VirtualGear:
+    """一台虚拟控制装置（Control Gear）的状态。"""
+    short: Optional[int]                 # None 表示尚未分配短地址
+    level: int = 254
+    groups: int = 0                      # 16 位组位图
+    scenes: List[int] = field(default_factory=lambda: [MASK] * 16)
+    dtr0: int = 0
+    dtr1: int = 0
+    dtr2: int = 0
+    dt8: bool = True
+    tc_mirek: int = 250
+    x: int = 0
+    y: int = 0
+    primaries: Dict[str, int] = field(default_factory=lambda: {"r": 0, "g": 0, "b": 0, "w": 0})
+    temp: Dict[str, int] = field(default_factory=dict)      # 待 Activate 的临时主色值
+    random_addr: int = 0xFFFFFF          # 24 位随机地址
+    initialised: bool = False
+    withdrawn: bool = False
+
+    def in_group(self, g: int) -> bool:
+        return bool((self.groups >> g) & 1)
+
+
+class SimBus:
+    """单条 DALI 总线的行为模型：逐帧处理前向帧，返回后向帧（或 None）。
+
+    opcode 解释跟随本仓库的 ops 表（配置/dali.yaml），这样仿真与 Controller 发出的帧一一对应：
+    - 特殊地址字节 write_dtr0_addr/write_dtr1_addr/0xC5 写 DTR0/1/2，dt8_enable_addr 仅对下一条命令有效；
+    - 寻址命令 write_dtr 视为“把当前亮度存入 DTR0”（scene_store_level 依赖该语义）；
+    - ops 里 query_status 与 remove_from_scene_base 重叠，按查询优先处理；
+    - 只有在线且被寻址的装置应答；多台同时应答视为冲突，返回 0xFF 并计入 collisions；
+    - 支持随机地址分配所需的 INITIALISE/RANDOMISE/COMPARE/WITHDRAW/SEARCHADDR/PROGRAM SHORT 等特殊命令。
+    """
+    SPECIAL_DTR2 = 0xC5
+    QUERY_ACTUAL_LEVEL = 0xA0
+    TERMINATE, INITIALISE, RANDOMISE, COMPARE, WITHDRAW = 0xA1, 0xA5, 0xA7, 0xA9, 0xAB
+    SEARCHADDR_H, SEARCHADDR_M, SEARCHADDR_L = 0xB1, 0xB3, 0xB5
+    PROGRAM_SHORT, VERIFY_SHORT, QUERY_SHORT = 0xB7, 0xB9, 0xBB
+    YES = 0xFF
+
+    def __init__(self, shorts: Iterable[int] = (), ops: dict | None = None, seed: int | None = None):
+        self.ops = ops or default_ops()
+        self.gears: List[VirtualGear] = [VirtualGear(short=int(s)) for s in shorts]
+        self._enabled_dt: Optional[int] = None
+        self._search = [0xFF, 0xFF, 0xFF]
+        self._rng = random.Random(seed)
+        self._log = logging.getLogger("SimBus")
+        self.counters: Dict[str, int] = {"frames": 0, "answers": 0, "collisions": 0}
+
+    def gear(self, short: int) -> Optional[VirtualGear]:
+        for g in self.gears:
+            if g.short == short:
+                return g
+        return None
+
+    def add_gear(self, short: Optional[int], **state) -> VirtualGear:
+        g = VirtualGear(short=short, **state)
+        self.gears.append(g)
+        return g
+
+    # ---------- 帧处理 ----------
+    def process(self, frame: bytes) -> Optional[bytes]:
+        if len(frame) != 2:
+            return None
+        a, d = frame[0], frame[1]
+        self.counters["frames"] += 1
+        ops = self.ops
+        # 特殊命令（不寻址，0xA0..0xFB 的奇数字节）
+        if 0xA0 <= a <= 0xFB and a & 1:
+            if a == int(ops["write_dtr0_addr"]):
+                for g in self.gears:
+                    g.dtr0 = d
+            elif a == int(ops["write_dtr1_addr"]):
+                for g in self.gears:
+                    g.dtr1 = d
+            elif a == self.SPECIAL_DTR2:
+                for g in self.gears:
+                    g.dtr2 = d
+            elif a == int(ops["dt8_enable_addr"]):
+                self._enabled_dt = d
+                return None
+            self._enabled_dt = None
+            return self._special(a, d)
+
+        targets = self._targets(a)
+        dt = self._enabled_dt
+        self._enabled_dt = None
+        if not a & 1:
+            # 直接亮度（ARC），255 为 MASK 不改变
+            if d != MASK:
+                for g in targets:
+                    g.level = d
+            return None
+        return self._answer([r for r in (self._command(g, d, dt) for g in targets) if r is not None])
+
+    # ---------- 随机地址分配 ----------
+    @property
+    def search_addr(self) -> int:
+        h, m, l = self._search
+        return (h << 16) | (m << 8) | l
+
+    def _special(self, a: int, d: int) -> Optional[bytes]:
+        if a == self.INITIALISE:
+            for g in self.gears:
+                if d == 0x00 or (d == 0xFF and g.short is None) or (d & 1 and g.short == d >> 1):
+                    g.initialised, g.withdrawn = True, False
+            return None
+        if a == self.TERMINATE:
+            for g in self.gears:
+                g.initialised = False
+            return None
+        if a in (self.SEARCHADDR_H, self.SEARCHADDR_M, self.SEARCHADDR_L):
+            self._search[(a - self.SEARCHADDR_H) // 2] = d
+            return None
+        active = [g for g in self.gears if g.initialised]
+        sa = self.search_addr
+        if a == self.RANDOMISE:
+            for g in active:
+                g.random_addr = self._rng.randrange(1 << 24)
+            return None
+        if a == self.COMPARE:
+            hits = [g for g in active if not g.withdrawn and g.random_addr <= sa]
+            return self._answer([self.YES] * len(hits))
+        selected = [g for g in active if g.random_addr == sa]
+        if a == self.WITHDRAW:
+            for g in selected:
+                g.withdrawn = True
+            return None
+        if a == self.PROGRAM_SHORT:
+            for g in selected:
+                g.short = None if d == 0xFF else (d >> 1) & 0x3F
+            return None
+        if a == self.VERIFY_SHORT:
+            return self._answer([self.YES for g in active if g.short == (d >> 1) & 0x3F])
+        if a == self.QUERY_SHORT:
+            return self._answer([((g.short << 1) | 1) if g.short is not None else 0xFF for g in selected])
+        return None
+
+    def _answer(self, answers: List[int]) -> Optional[bytes]:
+        if not answers:
+            return None
+        self.counters["answers"] += 1
+        if len(answers) > 1:
+            self.counters["collisions"] += 1
+            return b"\xFF"
+        return bytes([answers[0] & 0xFF])
+
+    def _targets(self, a: int) -> List[VirtualGear]:
+        if a < 0x80:
+            short = (a >> 1) & 0x3F
+            return [g for g in self.gears if g.short == short]
+        if a < 0xA0:
+            grp = (a >> 1) & 0x0F
+            return [g for g in self.gears if g.in_group(grp)]
+        if a in (0xFE, 0xFF):
+            return list(self.gears)
+        if a in (0xFC, 0xFD):
+            return [g for g in self.gears if g.short is None]
+        return []
+
+    def _command(self, g: VirtualGear, op: int, dt: Optional[int]) -> Optional[int]:
+        ops = self.ops
+        if dt == 8 and g.dt8:
+            return self._dt8_command(g, op)
+        # 查询（优先于与之重叠的场景移除）
+        if op == int(ops["query_status"]):
+            return 0x04 if g.level > 0 else 0x00      # bit2: lamp on
+        if op == int(ops["query_groups_0_7"]):
+            return g.groups & 0xFF
+        if op == int(ops["query_groups_8_15"]):
+            return (g.groups >> 8) & 0xFF
+        qs = int(ops["query_scene_level_base"])
+        if qs <= op < qs + 16:
+            return g.scenes[op - qs]
+        if op == int(ops.get("query_actual_level", self.QUERY_ACTUAL_LEVEL)):
+            return g.level
+        # 配置命令
+        if op == int(ops["write_dtr"]):
+            g.dtr0 = g.level
+            return None
+        base = int(ops["recall_scene_base"])
+        if base <= op < base + 16:
+            lv = g.scenes[op - base]
+            if lv != MASK:
+                g.level = lv
+            return None
+        base = int(ops["store_dtr_as_scene_base"])
+        if base <= op < base + 16:
+            g.scenes[op - base] = g.dtr0
+            return None
+        base = int(ops["remove_from_scene_base"])
+        if base <= op < base + 16:
+            g.scenes[op - base] = MASK
+            return None
+        base = int(ops["add_to_group_base"])
+        if base <= op < base + 16:
+            g.groups |= 1 << (op - base)
+            return None
+        base = int(ops["remove_from_group_base"])
+        if base <= op < base + 16:
+            g.groups &= ~(1 << (op - base)) & 0xFFFF
+            return None
+        if op == 0:
+            g.level = 0
+        return None
+
+    def _dt8_command(self, g: VirtualGear, op: int) -> Optional[int]:
+        ops = self.ops
+        if op == int(ops["dt8_set_tc_opcode"]):
+            g.tc_mirek = (g.dtr1 << 8) | g.dtr0
+        elif op == int(ops["dt8_set_x_opcode"]):
+            g.x = (g.dtr1 << 8) | g.dtr0
+        elif op == int(ops["dt8_set_y_opcode"]):
+            g.y = (g.dtr1 << 8) | g.dtr0
+        elif ops.get("dt8_rgbw_mode") == "activate":
+            # 临时值里的 255（MASK）表示该通道不变；Activate 后临时值清空
+            if op == int(ops["dt8_set_temp_rgb_opcode"]):
+                g.temp.update(r=g.dtr0, g=g.dtr1, b=g.dtr2)
+            elif op == int(ops["dt8_set_temp_waf_opcode"]):
+                g.temp["w"] = g.dtr0
+            elif op == int(ops["dt8_activate_opcode"]):
+                for ch, v in g.temp.items():
+                    if v != MASK:
+                        g.primaries[ch] = v
+                g.temp = {}
+        else:
+            for ch, code in ops.get("dt8_set_primary", {}).items():
+                if op == int(code):
+                    g.primaries[ch] = g.dtr0
+                    break
+        return None
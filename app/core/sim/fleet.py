@@ -0,0 +1,340 @@
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..config import default_ops
+from ..dali.timing import DaliTiming
+from ..transport.aio import LoopThread
+
+MASK = 0xFF
+NO_REPLY = -1
+
+
+class FleetBus:
+    """多总线向量化仿真：n_buses × 64 台装置的状态全部放在 NumPy 数组里。
+
+    process_round() 一次处理“每条总线至多一帧”的一批帧：同一总线上的帧必须保序，
+    不同总线互不影响，因此一轮内可以对所有总线做向量化更新。
+    opcode 语义与 SimBus 一致（跟随 ops 表），返回值 -1 表示无应答，多台应答冲突记为 0xFF。
+    """
+    def __init__(self, n_buses: int, present: np.ndarray | Sequence[int] | None = None,
+                 ops: dict | None = None):
+        n = int(n_buses)
+        self.n_buses = n
+        self.ops = ops or default_ops()
+        if present is None:
+            self.present = np.ones((n, 64), dtype=bool)
+        else:
+            p = np.asarray(present)
+            if p.dtype == bool and p.shape == (n, 64):
+                self.present = p.copy()
+            else:
+                self.present = np.zeros((n, 64), dtype=bool)
+                self.present[:, p.astype(int)] = True
+        self.level = np.full((n, 64), 254, dtype=np.uint8)
+        self.groups = np.zeros((n, 64), dtype=np.uint16)
+        self.scenes = np.full((n, 64, 16), MASK, dtype=np.uint8)
+        self.dtr0 = np.zeros((n, 64), dtype=np.uint8)
+        self.dtr1 = np.zeros((n, 64), dtype=np.uint8)
+        self.dtr2 = np.zeros((n, 64), dtype=np.uint8)
+        self.tc_mirek = np.full((n, 64), 250, dtype=np.uint16)
+        self.xy = np.zeros((n, 64, 2), dtype=np.uint16)
+        self.primaries = np.zeros((n, 64, 4), dtype=np.uint8)   # r, g, b, w
+        self.temp = np.full((n, 64, 4), MASK, dtype=np.uint8)   # 待 Activate 的临时主色值
+        self.enabled_dt = np.full(n, -1, dtype=np.int16)
+        self.counters: Dict[str, int] = {"frames": 0, "rounds": 0, "answers": 0, "collisions": 0}
+        self._prim_ops = [int(self.ops.get("dt8_set_primary", {}).get(ch, -1)) for ch in "rgbw"]
+
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.present, self.level, self.groups, self.scenes, self.dtr0,
+                                      self.dtr1, self.dtr2, self.tc_mirek, self.xy, self.primaries, self.temp,
+                                      self.enabled_dt))
+
+    # ---------- 向量化处理 ----------
+    def process_round(self, buses: np.ndarray, addr: np.ndarray, data: np.ndarray) -> np.ndarray:
+        """buses 内不得重复；返回每帧的应答（int16，-1 为无应答）。"""
+        b = np.asarray(buses, dtype=np.intp)
+        a = np.asarray(addr, dtype=np.int16)
+        d = np.asarray(data, dtype=np.int16)
+        k = len(b)
+        reply = np.full(k, NO_REPLY, dtype=np.int16)
+        if k == 0:
+            return reply
+        ops = self.ops
+        self.counters["frames"] += k
+        self.counters["rounds"] += 1
+
+        # —— 特殊命令：写 DTR0/1/2、使能设备类型 ——
+        special = (a >= 0xA0) & (a <= 0xFB) & ((a & 1) == 1)
+        for arr, code in ((self.dtr0, int(ops["write_dtr0_addr"])),
+                          (self.dtr1, int(ops["write_dtr1_addr"])),
+                          (self.dtr2, 0xC5)):
+            m = special & (a == code)
+            if m.any():
+                arr[b[m]] = d[m, None].astype(np.uint8)
+        enable = special & (a == int(ops["dt8_enable_addr"]))
+        dt = self.enabled_dt[b].copy()
+        self.enabled_dt[b] = np.where(enable, d, -1)
+
+        # —— 目标掩码 (k, 64) ——
+        present = self.present[b]
+        groups = self.groups[b]
+        idx = np.arange(64)
+        is_short = a < 0x80
+        is_group = (a >= 0x80) & (a < 0xA0)
+        is_bcast = a >= 0xFE
+        tgt = np.zeros((k, 64), dtype=bool)
+        tgt |= is_short[:, None] & (idx[None, :] == ((a >> 1) & 0x3F)[:, None])
+        grp_bit = ((groups >> ((a >> 1) & 0x0F)[:, None].astype(np.uint16)) & 1).astype(bool)
+        tgt |= is_group[:, None] & grp_bit
+        tgt |= is_bcast[:, None]
+        tgt &= present & ~special[:, None]
+
+        is_cmd = (a & 1) == 1
+        # —— ARC ——
+        arc = ~is_cmd & ~special & (d != MASK)
+        if arc.any():
+            m = tgt & arc[:, None]
+            lv = self.level[b]
+            lv[m] = np.broadcast_to(d[:, None], (k, 64))[m]
+            self.level[b] = lv
+
+        cmd = is_cmd & ~special & tgt.any(axis=1)
+        if not cmd.any():
+            return reply
+        op = np.where(cmd, d, -1)
+        dt8 = cmd & (dt == 8)
+        plain = cmd & ~dt8
+
+        def _in(base: int) -> np.ndarray:
+            return plain & (op >= base) & (op < base + 16)
+
+        # —— 查询（优先于与之重叠的场景移除）——
+        q_status = plain & (op == int(ops["query_status"]))
+        q_g0 = plain & (op == int(ops["query_groups_0_7"]))
+        q_g1 = plain & (op == int(ops["query_groups_8_15"]))
+        qs_base = int(ops["query_scene_level_base"])
+        q_scene = _in(qs_base)
+        q_level = plain & (op == int(ops.get("query_actual_level", 0xA0)))
+        query = q_status | q_g0 | q_g1 | q_scene | q_level
+        if query.any():
+            lv = self.level[b].astype(np.int16)
+            val = np.zeros((k, 64), dtype=np.int16)
+            val = np.where(q_status[:, None], np.where(lv > 0, 0x04, 0x00), val)
+            val = np.where(q_g0[:, None], (groups & 0xFF).astype(np.int16), val)
+            val = np.where(q_g1[:, None], (groups >> 8).astype(np.int16), val)
+            val = np.where(q_level[:, None], lv, val)
+            if q_scene.any():
+                sidx = np.clip(op - qs_base, 0, 15)
+                sc = self.scenes[b, :, :][np.arange(k), :, sidx].astype(np.int16)
+                val = np.where(q_scene[:, None], sc, val)
+            resp = tgt & query[:, None]
+            n_resp = resp.sum(axis=1)
+            first = np.argmax(resp, axis=1)
+            one = n_resp == 1
+            reply[one] = val[np.arange(k), first][one]
+            many = n_resp > 1
+            reply[many] = MASK
+            self.counters["answers"] += int((n_resp > 0).sum())
+            self.counters["collisions"] += int(many.sum())
+        plain &= ~query
+
+        # —— 配置命令 ——
+        m = plain & (op == int(ops["write_dtr"]))
+        if m.any():
+            t = tgt & m[:, None]
+            d0 = self.dtr0[b]
+            d0[t] = self.level[b][t]
+            self.dtr0[b] = d0
+        m = plain & (op == 0)
+        if m.any():
+            lv = self.level[b]
+            lv[tgt & m[:, None]] = 0
+            self.level[b] = lv
+        for base_key, kind in (("recall_scene_base", "recall"), ("store_dtr_as_scene_base", "store"),
+                               ("remove_from_scene_base", "remove")):
+            base = int(ops[base_key])
+            m = _in(base)
+            if not m.any():
+                continue
+            rows = np.nonzero(m)[0]
+            s = op[rows] - base
+            t = tgt[rows]
+            sc = self.scenes[b[rows], :, s]            # (r, 64)
+            if kind == "recall":
+                lv = self.level[b[rows]]
+                hit = t & (sc != MASK)
+                lv[hit] = sc[hit]
+                self.level[b[rows]] = lv
+            elif kind == "store":
+                sc = np.where(t, self.dtr0[b[rows]], sc)
+                self.scenes[b[rows], :, s] = sc
+            else:
+                self.scenes[b[rows], :, s] = np.where(t, MASK, sc)
+        for base_key, add in (("add_to_group_base", True), ("remove_from_group_base", False)):
+            base = int(ops[base_key])
+            m = _in(base)
+            if not m.any():
+                continue
+            bit = np.left_shift(np.uint16(1), (op - base).clip(0, 15).astype(np.uint16))[:, None]
+            g = self.groups[b]
+            t = tgt & m[:, None]
+            g = np.where(t, (g | bit) if add else (g & ~bit), g).astype(np.uint16)
+            self.groups[b] = g
+
+        # —— DT8 ——
+        if dt8.any():
+            word = (self.dtr1[b].astype(np.uint16) << 8) | self.dtr0[b]
+            m = dt8 & (op == int(ops["dt8_set_tc_opcode"]))
+            if m.any():
+                self.tc_mirek[b] = np.where(tgt & m[:, None], word, self.tc_mirek[b])
+            for j, key in enumerate(("dt8_set_x_opcode", "dt8_set_y_opcode")):
+                m = dt8 & (op == int(ops[key]))
+                if m.any():
+                    cur = self.xy[b, :, j]
+                    self.xy[b, :, j] = np.where(tgt & m[:, None], word, cur)
+            if ops.get("dt8_rgbw_mode") == "activate":
+                self._dt8_activate(b, tgt, dt8, op)
+            else:
+                for j, code in enumerate(self._prim_ops):
+                    m = dt8 & (op == code)
+                    if m.any():
+                        cur = self.primaries[b, :, j]
+                        self.primaries[b, :, j] = np.where(tgt & m[:, None], self.dtr0[b], cur)
+        return reply
+
+    def _dt8_activate(self, b, tgt, dt8, op):
+        ops = self.ops
+        m = dt8 & (op == int(ops["dt8_set_temp_rgb_opcode"]))
+        if m.any():
+            t = (tgt & m[:, None])[:, :, None]
+            new = np.stack([self.dtr0[b], self.dtr1[b], self.dtr2[b]], axis=-1)
+            self.temp[b, :, :3] = np.where(t, new, self.temp[b, :, :3])
+        m = dt8 & (op == int(ops["dt8_set_temp_waf_opcode"]))
+        if m.any():
+            self.temp[b, :, 3] = np.where(tgt & m[:, None], self.dtr0[b], self.temp[b, :, 3])
+        m = dt8 & (op == int(ops["dt8_activate_opcode"]))
+        if m.any():
+            t = (tgt & m[:, None])[:, :, None]
+            tmp = self.temp[b]
+            self.primaries[b] = np.where(t & (tmp != MASK), tmp, self.primaries[b])
+            self.temp[b] = np.where(t, MASK, tmp)
+
+
+class FleetServer:
+    """在一个进程、一个事件循环里为 FleetBus 的每条总线开一个 TCP 端口（帧格式同 TcpGateway）。
+
+    各连接只把收到的帧放进所属总线的待处理队列；调度协程每轮从每条“空闲”总线取一帧，
+    组成一批交给 FleetBus.process_round()，再把应答写回对应连接。
+    time_scale>0 时按 DaliTiming 推迟该总线的下一帧。
+    """
+    def __init__(self, fleet: FleetBus, host: str = "127.0.0.1", base_port: int = 0,
+                 timing: DaliTiming | None = None, time_scale: float = 0.0,
+                 loop: LoopThread | None = None):
+        self.fleet = fleet
+        self.host = host
+        self.base_port = int(base_port)
+        self.ports: List[int] = []
+        self.timing = timing or DaliTiming()
+        self.time_scale = float(time_scale)
+        self._own_loop = loop is None
+        self._loop = loop or LoopThread("fleet-sim")
+        self._servers: List[asyncio.AbstractServer] = []
+        self._pending: Dict[int, Deque[Tuple[bytes, asyncio.StreamWriter]]] = {}
+        self._busy_until = np.zeros(fleet.n_buses, dtype=np.float64)
+        self._wake: Optional[asyncio.Event] = None
+        self._sched: Optional[asyncio.Task] = None
+        self._clients: set[asyncio.Task] = set()
+        self._log = logging.getLogger("FleetServer")
+        self.batch_sizes: Deque[int] = deque(maxlen=1024)
+
+    def start(self) -> List[int]:
+        self._loop.run(self._start(), timeout=60.0)
+        self._log.info("fleet sim: %d buses on %s", self.fleet.n_buses, self.host)
+        return self.ports
+
+    def stop(self):
+        if self._servers:
+            self._loop.run(self._stop(), timeout=30.0)
+        if self._own_loop:
+            self._loop.stop()
+
+    async def _start(self):
+        self._wake = asyncio.Event()
+        for i in range(self.fleet.n_buses):
+            port = self.base_port + i if self.base_port else 0
+            srv = await asyncio.start_server(
+                lambda r, w, i=i: self._handle(i, r, w), self.host, port)
+            self._servers.append(srv)
+            self.ports.append(srv.sockets[0].getsockname()[1])
+        self._sched = asyncio.get_running_loop().create_task(self._scheduler())
+
+    async def _stop(self):
+        for srv in self._servers:
+            srv.close()
+        for task in list(self._clients) + [self._sched]:
+            task.cancel()
+        await asyncio.gather(*self._clients, self._sched, return_exceptions=True)
+        self._servers.clear()
+
+    async def _handle(self, bus: int, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._clients.add(task)
+        buf = b""
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                buf += data
+                n = len(buf) // 2 * 2
+                if n:
+                    q = self._pending.setdefault(bus, deque())
+                    q.extend((buf[i:i + 2], writer) for i in range(0, n, 2))
+                    buf = buf[n:]
+                    self._wake.set()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.discard(task)
+            writer.close()
+
+    async def _scheduler(self):
+        t = self.timing
+        slot_s = (t.forward_ms + t.settle_forward_ms) * self.time_scale / 1000.0
+        reply_s = (t.forward_ms + t.reply_window_ms / 2 + t.backward_ms
+                   + t.settle_backward_ms) * self.time_scale / 1000.0
+        while True:
+            if not self._pending:
+                self._wake.clear()
+                await self._wake.wait()
+            now = time.monotonic()
+            ready = [bus for bus in self._pending if self._busy_until[bus] <= now]
+            if not ready:
+                wait = float(min(self._busy_until[bus] for bus in self._pending)) - now
+                await asyncio.sleep(max(0.0, wait))
+                continue
+            frames, writers = [], []
+            for bus in ready:
+                q = self._pending[bus]
+                frame, writer = q.popleft()
+                if not q:
+                    del self._pending[bus]
+                frames.append(frame)
+                writers.append(writer)
+            raw = np.frombuffer(b"".join(frames), dtype=np.uint8).reshape(-1, 2)
+            buses = np.asarray(ready, dtype=np.intp)
+            replies = self.fleet.process_round(buses, raw[:, 0], raw[:, 1])
+            self.batch_sizes.append(len(ready))
+            if self.time_scale > 0:
+                self._busy_until[buses] = now + np.where(replies >= 0, reply_s, slot_s)
+            for writer, r in zip(writers, replies.tolist()):
+                if r >= 0 and not writer.is_closing():
+                    writer.write(bytes([r]))
+            # 让出事件循环，使连接协程有机会读入下一批帧
+            await asyncio.sleep(0)
@@ -0,0 +1,70 @@
+from __future__ import annotations
+import os
+import select
+import logging
+import threading
+from typing import Dict
+
+from .bus import SimBus
+from ..transport.framing import FrameCodec, RawCodec
+
+
+class SimSerialDevice:
+    """伪终端上的串口 DALI 接口仿真（仅 POSIX）：SerialGateway 打开 .port 即可联调。
+
+    从主端读出前向帧交给 SimBus，按 codec 回写应答（默认透传：有应答才回 1 字节）。
+    """
+    def __init__(self, bus: SimBus, codec: FrameCodec | None = None):
+        self.bus = bus
+        self.codec = codec or RawCodec()
+        self._master, self._slave = os.openpty()
+        self.port = os.ttyname(self._slave)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._log = logging.getLogger("SimSerialDevice")
+        self.counters: Dict[str, int] = {"reads": 0, "packets_in": 0, "frames_in": 0, "bytes_out": 0}
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._serve, name="sim-serial", daemon=True)
+        self._thread.start()
+        self._log.info("sim serial device on %s (%d gears)", self.port, len(self.bus.gears))
+        return self.port
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _serve(self):
+        buf = bytearray()
+        raw = isinstance(self.codec, RawCodec)
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._master], [], [], 0.05)
+            if not ready:
+                continue
+            try:
+                data = os.read(self._master, 4096)
+            except OSError:
+                return
+            self.counters["reads"] += 1
+            buf += data
+            for expect_reply, frames in self.codec.parse_requests(buf):
+                self.counters["packets_in"] += 1
+                replies = []
+                for i in range(0, len(frames) - 1, 2):
+                    self.counters["frames_in"] += 1
+                    reply = self.bus.process(frames[i:i + 2])
+                    if raw and reply:
+                        self._write(reply)
+                    replies.append(reply)
+                if expect_reply:
+                    self._write(self.codec.encode_replies(replies))
+
+    def _write(self, data: bytes):
+        os.write(self._master, data)
+        self.counters["bytes_out"] += len(data)
@@ -0,0 +1,263 @@
+from __future__ import annotations
+import asyncio
+import argparse
+import logging
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .bus import SimBus
+from ..dali.timing import DaliTiming
+from ..transport.aio import LoopThread
+from ..transport.framing import FrameCodec, RawCodec, make_codec
+from ..transport.udp_gateway import decode_request, encode_reply
+
+
+class SimGatewayServer:
+    """本地 DALI 总线仿真网关：TCP，与 TcpGateway 相同的帧格式（默认透传：2 字节前向 / 1 字节后向）。
+
+    每收到一帧交给 SimBus 处理，并按 DaliTiming × time_scale 延时后再处理下一帧，
+    因此压测、扫描、批量下发的耗时与真实总线同量级；time_scale=0 时不延时（单元测试用）。
+    同一总线上的多个连接共用一把锁，帧在总线上严格串行。
+    codec 为网关封包（默认透传）；批量封包时一个请求包内的帧依次上总线，查询包的结果合成一个应答包。
+    """
+    def __init__(self, bus: SimBus, host: str = "127.0.0.1", port: int = 0,
+                 timing: DaliTiming | None = None, time_scale: float = 1.0,
+                 loop: LoopThread | None = None, codec: FrameCodec | None = None):
+        self.bus = bus
+        self.codec = codec or RawCodec()
+        self.host = host
+        self.port = int(port)
+        self.timing = timing or DaliTiming()
+        self.time_scale = float(time_scale)
+        self._own_loop = loop is None
+        self._loop = loop or LoopThread("sim-gateway")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._bus_lock: Optional[asyncio.Lock] = None
+        self._clients: set[asyncio.Task] = set()
+        self._log = logging.getLogger("SimGatewayServer")
+        self.counters: Dict[str, int] = {"connections": 0, "packets_in": 0, "frames_in": 0, "bytes_out": 0}
+
+    # ---------- 生命周期 ----------
+    def start(self) -> int:
+        """启动监听并返回实际端口（port=0 时由系统分配）。"""
+        self._loop.run(self._start(), timeout=5.0)
+        self._log.info("sim gateway on %s:%s (%d gears)", self.host, self.port, len(self.bus.gears))
+        return self.port
+
+    def stop(self):
+        if self._server is not None:
+            self._loop.run(self._stop(), timeout=5.0)
+        if self._own_loop:
+            self._loop.stop()
+
+    async def _start(self):
+        self._bus_lock = asyncio.Lock()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def _stop(self):
+        self._server.close()
+        for task in list(self._clients):
+            task.cancel()
+        await asyncio.gather(*self._clients, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    # ---------- 连接处理 ----------
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.counters["connections"] += 1
+        task = asyncio.current_task()
+        self._clients.add(task)
+        buf = bytearray()
+        raw = isinstance(self.codec, RawCodec)
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                buf += data
+                for expect_reply, frames in self.codec.parse_requests(buf):
+                    self.counters["packets_in"] += 1
+                    replies = []
+                    for i in range(0, len(frames) - 1, 2):
+                        reply = await self._on_frame(frames[i:i + 2])
+                        if raw and reply:
+                            # 透传：后向帧随到随回
+                            writer.write(reply)
+                            self.counters["bytes_out"] += len(reply)
+                            await writer.drain()
+                        replies.append(reply)
+                    if expect_reply:
+                        out = self.codec.encode_replies(replies)
+                        writer.write(out)
+                        self.counters["bytes_out"] += len(out)
+                        await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.discard(task)
+            writer.close()
+
+    async def _on_frame(self, frame: bytes) -> Optional[bytes]:
+        t = self.timing
+        async with self._bus_lock:
+            self.counters["frames_in"] += 1
+            reply = self.bus.process(frame)
+            if self.time_scale > 0:
+                if reply is None:
+                    ms = t.forward_ms + t.settle_forward_ms
+                else:
+                    ms = t.forward_ms + t.reply_window_ms / 2 + t.backward_ms + t.settle_backward_ms
+                await asyncio.sleep(ms * self.time_scale / 1000.0)
+            return reply
+
+
+class SimUdpGateway(asyncio.DatagramProtocol):
+    """UDP 网关仿真：与 UdpGateway 相同的数据报格式，一个实例对应一条总线。
+
+    数据报内的帧依次上总线（时序同 SimGatewayServer），处理完回一个应答数据报；
+    每个客户端缓存最近一个序号的应答，重传的请求只回放缓存、不重复上总线，处理中的重传直接忽略。
+    loss 为收/发数据报的丢弃概率（按 seed 可复现），用于测试重传。
+    多个实例可以共用一个 LoopThread，模拟一台主机上的成百条总线。
+    """
+    def __init__(self, bus: SimBus, host: str = "127.0.0.1", port: int = 0,
+                 timing: DaliTiming | None = None, time_scale: float = 1.0,
+                 loop: LoopThread | None = None, loss: float = 0.0, seed: int = 0):
+        self.bus = bus
+        self.host = host
+        self.port = int(port)
+        self.timing = timing or DaliTiming()
+        self.time_scale = float(time_scale)
+        self.loss = max(0.0, min(1.0, float(loss)))
+        self._rng = random.Random(seed)
+        self._own_loop = loop is None
+        self._loop = loop or LoopThread("sim-udp")
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # 客户端地址 → (最近序号, 应答；None 表示处理中)
+        self._last: Dict[Tuple[str, int], Tuple[int, Optional[bytes]]] = {}
+        self._log = logging.getLogger("SimUdpGateway")
+        self.counters: Dict[str, int] = {"datagrams_in": 0, "frames_in": 0, "duplicates": 0,
+                                         "dropped": 0, "datagrams_out": 0}
+
+    # ---------- 生命周期 ----------
+    def start(self) -> int:
+        self._loop.run(self._start(), timeout=5.0)
+        self._log.info("sim UDP gateway on %s:%s (%d gears)", self.host, self.port, len(self.bus.gears))
+        return self.port
+
+    def stop(self):
+        if self._transport is not None:
+            self._loop.run(self._stop(), timeout=5.0)
+        if self._own_loop:
+            self._loop.stop()
+
+    async def _start(self):
+        self._queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(lambda: self, local_addr=(self.host, self.port))
+        self.port = self._transport.get_extra_info("sockname")[1]
+        self._worker = asyncio.ensure_future(self._serve())
+
+    async def _stop(self):
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._transport.close()
+        self._transport = None
+
+    # ---------- 数据报处理 ----------
+    def _lost(self) -> bool:
+        if self.loss > 0 and self._rng.random() < self.loss:
+            self.counters["dropped"] += 1
+            return True
+        return False
+
+    def datagram_received(self, data: bytes, addr):
+        req = decode_request(data)
+        if req is None or self._lost():
+            return
+        seq = req[0]
+        peer = addr[:2]
+        last = self._last.get(peer)
+        if last is not None and last[0] == seq:
+            self.counters["duplicates"] += 1
+            if last[1] is not None:
+                self._reply(last[1], peer)
+            return
+        self._last[peer] = (seq, None)
+        self._queue.put_nowait((peer, req))
+
+    async def _serve(self):
+        # 单个协程依次处理，帧在总线上严格串行
+        t = self.timing
+        while True:
+            peer, (seq, expect_reply, frames) = await self._queue.get()
+            self.counters["datagrams_in"] += 1
+            replies = []
+            ms = 0.0
+            for i in range(0, len(frames) - 1, 2):
+                self.counters["frames_in"] += 1
+                reply = self.bus.process(frames[i:i + 2])
+                replies.append(reply)
+                if reply is None:
+                    ms += t.forward_ms + t.settle_forward_ms
+                else:
+                    ms += t.forward_ms + t.reply_window_ms / 2 + t.backward_ms + t.settle_backward_ms
+            if self.time_scale > 0:
+                await asyncio.sleep(ms * self.time_scale / 1000.0)
+            out = encode_reply(seq, replies if expect_reply else [])
+            self._last[peer] = (seq, out)
+            self._reply(out, peer)
+
+    def _reply(self, data: bytes, peer):
+        if self._transport is None or self._lost():
+            return
+        self._transport.sendto(data, peer)
+        self.counters["datagrams_out"] += 1
+
+
+def parse_shorts(spec: str) -> List[int]:
+    """'0-15,20,33' → [0..15, 20, 33]"""
+    out: List[int] = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            out.extend(range(int(lo), int(hi) + 1))
+        else:
+            out.append(int(part))
+    return [s for s in out if 0 <= s < 64]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="本地 DALI 总线仿真网关")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5588)
+    parser.add_argument("--gears", default="0-15", help="在线短地址，如 0-15,20")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="时序倍率，0 表示不延时")
+    parser.add_argument("--framing", default="raw", help="网关封包：raw | lpb")
+    parser.add_argument("--udp", action="store_true", help="以 UDP 网关形式提供服务")
+    parser.add_argument("--loss", type=float, default=0.0, help="UDP 数据报丢弃概率（测试重传）")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    bus = SimBus(parse_shorts(args.gears))
+    if args.udp:
+        srv = SimUdpGateway(bus, args.host, args.port, time_scale=args.time_scale, loss=args.loss)
+    else:
+        srv = SimGatewayServer(bus, args.host, args.port,
+                               time_scale=args.time_scale, codec=make_codec(args.framing))
+    srv.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
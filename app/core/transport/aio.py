@@ -0,0 +1,96 @@
+from __future__ import annotations
+import asyncio
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Any, Coroutine
+
+from .base import Transport, AsyncTransport
+
+
+class LoopThread:
+    """在后台线程运行一个 asyncio 事件循环。
+
+    同步代码（Controller / GUI / 压测线程）通过 submit()/run() 把协程投递进来，
+    一个循环即可同时驱动任意多个异步网关，无需每个网关一个线程。
+    """
+    def __init__(self, name: str = "aio-loop"):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro: Coroutine[Any, Any, Any], timeout: float | None = None) -> Any:
+        return self.submit(coro).result(timeout)
+
+    def stop(self):
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=2.0)
+
+
+_shared: LoopThread | None = None
+_shared_lock = threading.Lock()
+
+
+def shared_loop() -> LoopThread:
+    """进程内共享的事件循环线程（惰性创建）。"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = LoopThread("aio-shared")
+        return _shared
+
+
+class AsyncTransportAdapter(Transport):
+    """把 AsyncTransport 包装成同步 Transport，供 Controller 直接使用。"""
+    def __init__(self, inner: AsyncTransport, loop: LoopThread | None = None):
+        self.inner = inner
+        self._loop = loop or shared_loop()
+        self._log = logging.getLogger("AsyncTransportAdapter")
+
+    def connect(self) -> None:
+        self._loop.run(self.inner.connect())
+
+    def disconnect(self) -> None:
+        self._loop.run(self.inner.disconnect())
+
+    def send(self, frame: bytes) -> None:
+        self._loop.run(self.inner.send(frame))
+
+    def send_many(self, frames: bytes | bytearray | memoryview, expect_reply: bool = False) -> int:
+        view = memoryview(frames)
+
+        async def _send_all() -> int:
+            for i in range(0, len(view) - 1, 2):
+                await self.inner.send(bytes(view[i:i + 2]))
+            return len(view) // 2
+        return self._loop.run(_send_all())
+
+    def recv(self, timeout: float = 0.5) -> bytes | None:
+        return self._loop.run(self.inner.recv(timeout))
+
+    def query(self, frame: bytes, timeout: float = 0.3) -> bytes | None:
+        return self._loop.run(self.inner.query(frame, timeout))
+
+    def drain(self) -> bytes:
+        drain = getattr(self.inner, "drain", None)
+        if not callable(drain):
+            return b""
+
+        async def _drain() -> bytes:
+            return drain()
+        return self._loop.run(_drain())
+
+    def is_connected(self) -> bool:
+        return self.inner.is_connected()
@@ -0,0 +1,190 @@
+from __future__ import annotations
+import asyncio
+import logging
+from collections import deque
+
+from .base import AsyncTransport, ConnectionLost
+
+
+class AsyncTcpGateway(AsyncTransport):
+    """asyncio 版 TCP 透传网关（与 TcpGateway 相同的 2 字节前向帧 / 1 字节后向帧）。
+
+    - send() 写出即返回，由 max_inflight 限制写缓冲中尚未发出的帧数；
+    - query() 登记一个等待者后写帧，后台读任务按 FIFO 把后向帧交给等待者；
+      与 QueryCorrelator 相同：查询超时后开启 orphan_guard 保护窗，窗内到达的字节视为迟到应答丢弃，
+      下一条查询等到窗口结束并排空滞留字节后才发出，迟到的应答不会被算到后面的查询上；
+    - 未被查询认领的字节留给 recv()；
+    - 读任务遇到对端关闭或读错误（连接被重置等）时拆除连接，在途与之后的调用抛 ConnectionLost。
+    透传帧的应答不带标识，因此同一连接上查询窗口为 1；多个网关可在同一事件循环内并发。
+    """
+    BACKWARD_SIZE = 1
+
+    def __init__(self, host: str, port: int, timeout: float = 0.8, max_inflight: int = 16,
+                 orphan_guard: float = 0.03):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_inflight = max(1, int(max_inflight))
+        self.orphan_guard = max(0.0, float(orphan_guard))
+        self.orphan_bytes = 0
+        self._guard_until = 0.0
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._rx_task: asyncio.Task | None = None
+        self._pending: deque[asyncio.Future] = deque()
+        self._window: asyncio.Semaphore | None = None
+        self._rx = bytearray()
+        self._rx_event: asyncio.Event | None = None
+        self._lost: ConnectionLost | None = None
+        self._log = logging.getLogger("AsyncTcpGateway")
+
+    async def connect(self) -> None:
+        if self._writer:
+            return
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), timeout=self.timeout)
+        # 写缓冲高水位 = max_inflight 帧：超过时 drain() 才会挂起
+        self._writer.transport.set_write_buffer_limits(high=self.max_inflight * 2)
+        self._window = asyncio.Semaphore(self.query_window)
+        self._rx_event = asyncio.Event()
+        self._lost = None
+        self._rx_task = asyncio.get_running_loop().create_task(self._read_loop())
+        self._log.info("TCP(async) connected %s:%s", self.host, self.port)
+
+    async def disconnect(self) -> None:
+        task, self._rx_task = self._rx_task, None
+        if task:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        writer, self._writer = self._writer, None
+        self._reader = None
+        if writer:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+            self._log.info("TCP(async) disconnected")
+        while self._pending:
+            fut = self._pending.popleft()
+            if not fut.done():
+                fut.set_result(None)
+
+    async def send(self, frame: bytes) -> None:
+        if not self._writer:
+            raise self._not_connected()
+        self._log.debug("SEND %s", bytes(frame).hex(" "))
+        try:
+            self._writer.write(frame)
+            await self._writer.drain()
+        except (ConnectionError, OSError) as exc:
+            self._log.warning("TCP(async) send failed: %s", exc)
+            await self.disconnect()
+            raise ConnectionLost(f"TCP connection lost: {exc}") from exc
+
+    async def query(self, frame: bytes, timeout: float = 0.3) -> bytes | None:
+        if not self._writer or self._window is None:
+            raise self._not_connected()
+        async with self._window:
+            await self._drain_orphans()
+            loop = asyncio.get_running_loop()
+            fut = loop.create_future()
+            self._pending.append(fut)
+            try:
+                await self.send(frame)
+                return await asyncio.wait_for(asyncio.shield(fut), timeout)
+            except asyncio.TimeoutError:
+                self._guard_until = loop.time() + self.orphan_guard
+                return None
+            finally:
+                try:
+                    self._pending.remove(fut)
+                except ValueError:
+                    pass
+
+    async def recv(self, timeout: float = 0.5) -> bytes | None:
+        if self._rx_event is None:
+            return None
+        if not self._rx and self._lost is not None:
+            raise self._not_connected()
+        if not self._rx:
+            self._rx_event.clear()
+            try:
+                await asyncio.wait_for(self._rx_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+            if not self._rx and self._lost is not None:
+                raise self._not_connected()
+        data, self._rx = bytes(self._rx), bytearray()
+        return data or None
+
+    def drain(self) -> bytes:
+        """取走未被查询认领的字节（需在事件循环线程内调用）。"""
+        data, self._rx = bytes(self._rx), bytearray()
+        return data
+
+    def is_connected(self) -> bool:
+        return self._writer is not None
+
+    async def _drain_orphans(self) -> None:
+        """处于保护窗内时等到窗口结束，再丢弃滞留的字节（上一次超时后迟到的应答）。"""
+        remain = self._guard_until - asyncio.get_running_loop().time()
+        if remain > 0:
+            await asyncio.sleep(remain)
+        if self._rx:
+            self._discard(len(self._rx))
+            self._rx = bytearray()
+
+    def _discard(self, n: int) -> None:
+        self.orphan_bytes += n
+        self._log.debug("discarded %d orphan byte(s)", n)
+
+    def _not_connected(self) -> ConnectionLost:
+        return ConnectionLost(str(self._lost)) if self._lost is not None else ConnectionLost("Not connected")
+
+    async def _read_loop(self):
+        assert self._reader is not None
+        why: object = "peer closed"
+        try:
+            while True:
+                data = await self._reader.read(1024)
+                if not data:
+                    break
+                self._log.debug("RECV %s", data.hex(" "))
+                # 粘包拆分：逐个后向帧交给最早的等待者
+                n = self.BACKWARD_SIZE
+                guarded = asyncio.get_running_loop().time() < self._guard_until
+                for i in range(0, len(data), n):
+                    chunk = data[i:i + n]
+                    while self._pending and self._pending[0].done():
+                        self._pending.popleft()
+                    if self._pending:
+                        self._pending.popleft().set_result(chunk)
+                    elif guarded:
+                        self._discard(len(chunk))
+                    else:
+                        self._rx.extend(chunk)
+                        if self._rx_event:
+                            self._rx_event.set()
+        except (OSError, asyncio.IncompleteReadError) as exc:
+            why = exc
+        self._teardown(why)
+
+    def _teardown(self, why) -> None:
+        """读任务内调用：连接已不可用，关闭写端并让在途查询以 ConnectionLost 结束。"""
+        self._log.warning("TCP(async) connection lost: %s", why)
+        self._lost = ConnectionLost(f"TCP connection lost: {why}")
+        writer, self._writer = self._writer, None
+        self._reader = None
+        self._rx_task = None
+        if writer is not None:
+            writer.close()
+        while self._pending:
+            fut = self._pending.popleft()
+            if not fut.done():
+                fut.set_exception(self._lost)
+        if self._rx_event:
+            self._rx_event.set()
@@ -3,6 +3,10 @@ from abc import ABC, abstractmethod
 import time
 import logging
 
+class ConnectionLost(RuntimeError):
+    """链路中断（对端关闭、写失败或未连接）；启用自动重连时由执行器挂起/重放程序。"""
+
+
 class Transport(ABC):
     """传输抽象层：屏蔽 TCP/串口/HID 差异。"""
 
@@ -17,6 +21,49 @@ class Transport(ABC):
     @abstractmethod
     def is_connected(self) -> bool: ...
 
+    def drain(self) -> bytes:
+        """非阻塞地取走当前已到达但未读取的字节（默认无缓冲）。"""
+        return b""
+
+    # 封包对每条查询都给出“应答/无应答”时为 True（见 framing.FrameCodec）
+    explicit_replies: bool = False
+
+    def send_many(self, frames: bytes | bytearray | memoryview, expect_reply: bool = False) -> int:
+        """写出一段连续的 2 字节前向帧，返回帧数；expect_reply 表示这些帧都是查询。
+        默认逐帧调用 send()；封包允许时子类应一次写出（一次系统调用）。"""
+        view = memoryview(frames)
+        n = len(view) // 2
+        for i in range(n):
+            self.send(bytes(view[2 * i:2 * i + 2]))
+        return n
+
+    def recv_replies(self, timeout: float = 0.5) -> list[bytes | None] | None:
+        """读取应答并拆成单条后向帧；explicit_replies 时 None 项表示该查询无应答。"""
+        data = self.recv(timeout=timeout)
+        return [data[i:i + 1] for i in range(len(data))] if data else None
+
+class AsyncTransport(ABC):
+    """异步传输抽象层：与 Transport 对应的 asyncio 版本。
+
+    - send() 只负责写出前向帧，不等待应答，因此多帧可同时在途；
+    - query() 写出一帧并等待与之配对的后向帧（无应答返回 None）；
+    - query_window 表示同一连接上最多允许多少个查询同时在途。
+    """
+    query_window: int = 1
+
+    @abstractmethod
+    async def connect(self) -> None: ...
+    @abstractmethod
+    async def disconnect(self) -> None: ...
+    @abstractmethod
+    async def send(self, frame: bytes) -> None: ...
+    @abstractmethod
+    async def recv(self, timeout: float = 0.5) -> bytes | None: ...
+    @abstractmethod
+    async def query(self, frame: bytes, timeout: float = 0.3) -> bytes | None: ...
+    @abstractmethod
+    def is_connected(self) -> bool: ...
+
 class MockTransport(Transport):
     """用于GUI联调与自动化测试的假设备。"""
     def __init__(self):
@@ -36,6 +83,13 @@ class MockTransport(Transport):
         self._last_sent = bytes(frame)
         self._log.info("SEND %s", frame.hex(" "))
 
+    def send_many(self, frames: bytes | bytearray | memoryview, expect_reply: bool = False) -> int:
+        data = bytes(frames)
+        if len(data) >= 2:
+            self._last_sent = data[-2:]
+        self._log.debug("SEND %d frames", len(data) // 2)
+        return len(data) // 2
+
     def recv(self, timeout: float = 0.5) -> bytes | None:
         import time
         time.sleep(min(timeout, 0.05))
@@ -0,0 +1,206 @@
+from __future__ import annotations
+import time
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+from .base import Transport
+
+
+@dataclass
+class _Outstanding:
+    frame: bytes
+    deadline: float
+    reply: bytes | None = None
+    done: bool = False
+    sent: float = 0.0
+    slot: int = 1             # 同一数据包内的查询条数，批量查询按此折算单条往返时间
+
+
+class RttEstimator:
+    """查询往返时间估计（Jacobson/Karels 平滑），给出自适应的“无应答”判定超时。
+
+    超时 = max(srtt + k·rttvar, 最近样本最大值 × 1.25)，再夹在 [floor, ceiling] 之间；
+    样本不足 min_samples 时直接用 ceiling（保守）。只有收到应答的查询才计入样本。
+    """
+    def __init__(self, floor: float = 0.02, ceiling: float = 0.3, k: float = 4.0,
+                 min_samples: int = 3, history: int = 32):
+        self.floor = float(floor)
+        self.ceiling = float(ceiling)
+        self.k = float(k)
+        self.min_samples = int(min_samples)
+        self.srtt: float | None = None
+        self.rttvar = 0.0
+        self.samples = 0
+        self._recent: deque[float] = deque(maxlen=history)
+
+    def add(self, rtt: float):
+        rtt = max(0.0, float(rtt))
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.samples += 1
+        self._recent.append(rtt)
+
+    def timeout(self, ceiling: float | None = None) -> float:
+        top = self.ceiling if ceiling is None else float(ceiling)
+        if self.samples < self.min_samples or self.srtt is None:
+            return top
+        rto = max(self.srtt + self.k * self.rttvar, max(self._recent) * 1.25)
+        return min(top, max(self.floor, rto))
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "srtt_ms": (self.srtt or 0.0) * 1000.0,
+            "rttvar_ms": self.rttvar * 1000.0,
+            "rto_ms": self.timeout() * 1000.0,
+            "rtt_samples": self.samples,
+        }
+
+
+class QueryCorrelator:
+    """Controller 与 Transport 之间的请求/应答配对层。
+
+    - 发送查询前先排空并丢弃滞留字节（上一次超时后迟到的应答）；
+    - 把一次 recv 读到的粘包按 backward_size 拆成单个后向帧，按 FIFO 交给未完成的查询；
+    - 查询收到自己的后向帧即返回，不再多等；超时后开启 orphan_guard 保护窗，
+      窗内到达的字节一律视为孤儿丢弃，避免被算作下一条查询的应答。
+    透传帧的应答没有标识，所以默认 window=1（同一时刻仅一条查询在途）。
+    timeout=None 的查询使用 RttEstimator 按实测往返时间给出的自适应超时。
+    transport.explicit_replies 时（批量封包）窗口内的查询封进同一个数据包一次写出，
+    每条查询都有明确的应答/无应答，无应答的查询不必等到超时。
+    """
+    DRAIN_PASSES = 8
+    def __init__(self, transport: Transport, backward_size: int = 1,
+                 orphan_guard: float = 0.03, window: int = 1,
+                 rtt: RttEstimator | None = None):
+        self._transport = transport
+        self.rtt = rtt or RttEstimator()
+        self.backward_size = max(1, int(backward_size))
+        self.orphan_guard = max(0.0, float(orphan_guard))
+        self.window = max(1, int(window))
+        self._outstanding: deque[_Outstanding] = deque()
+        self._guard_until = 0.0
+        self._log = logging.getLogger("QueryCorrelator")
+        self._stats: Dict[str, int] = {
+            "queries": 0, "answered": 0, "timeouts": 0,
+            "orphan_bytes": 0, "coalesced_reads": 0, "no_reply": 0,
+        }
+
+    @property
+    def transport(self) -> Transport:
+        return self._transport
+
+    def send(self, frame: bytes) -> None:
+        self._transport.send(frame)
+
+    def send_many(self, frames: bytes | bytearray | memoryview) -> int:
+        return self._transport.send_many(frames)
+
+    def query(self, frame: bytes, timeout: float | None = 0.3) -> bytes | None:
+        return self.query_many([frame], timeout)[0]
+
+    def query_many(self, frames: Sequence[bytes], timeout: float | None = 0.3) -> List[bytes | None]:
+        """依次发出多条查询，按窗口大小保持在途数量，返回与 frames 一一对应的应答。"""
+        self.drain_orphans()
+        if timeout is None:
+            timeout = self.rtt.timeout()
+        items = [_Outstanding(bytes(f), 0.0) for f in frames]
+        todo = deque(items)
+        explicit = getattr(self._transport, "explicit_replies", False)
+        while todo or self._outstanding:
+            if explicit:
+                batch = []
+                while todo and len(self._outstanding) + len(batch) < self.window:
+                    batch.append(todo.popleft())
+                if batch:
+                    self._transport.send_many(b"".join(it.frame for it in batch), expect_reply=True)
+                    now = time.monotonic()
+                    n = len(batch)
+                    for it in batch:
+                        # 网关逐条上总线后整包一起应答：按包内条数放宽超时、折算单条往返时间
+                        it.sent, it.slot, it.deadline = now, n, now + timeout * n
+                    self._outstanding.extend(batch)
+                    self._stats["queries"] += len(batch)
+            while todo and len(self._outstanding) < self.window:
+                it = todo.popleft()
+                self._transport.send(it.frame)
+                it.sent = time.monotonic()
+                it.deadline = it.sent + timeout
+                self._outstanding.append(it)
+                self._stats["queries"] += 1
+            self._collect()
+        return [it.reply for it in items]
+
+    def drain_orphans(self) -> int:
+        """丢弃当前滞留的字节；处于保护窗内时等到窗口结束。返回丢弃的字节数。
+
+        保护窗结束后最多再排空 DRAIN_PASSES 次：总线上一直有字节到达时也会返回，
+        剩余字节留给查询按 FIFO 处理。
+        """
+        dropped = 0
+        passes = 0
+        while True:
+            data = self._drain_once()
+            dropped += len(data)
+            remain = self._guard_until - time.monotonic()
+            if remain <= 0:
+                passes += 1
+                if not data or passes >= self.DRAIN_PASSES:
+                    break
+                continue
+            data = self._transport.recv(timeout=min(remain, 0.01))
+            if data:
+                dropped += len(data)
+        if dropped:
+            self._stats["orphan_bytes"] += dropped
+            self._log.debug("discarded %d orphan byte(s)", dropped)
+        return dropped
+
+    def reset(self) -> None:
+        """丢弃未完成的查询与保护窗（链路重连后调用：断线前在途的查询不会再有应答）。"""
+        self._outstanding.clear()
+        self._guard_until = 0.0
+
+    def stats(self) -> Dict[str, float]:
+        out: Dict[str, float] = dict(self._stats)
+        out.update(self.rtt.snapshot())
+        return out
+
+    # ---------- 内部 ----------
+    def _drain_once(self) -> bytes:
+        drain = getattr(self._transport, "drain", None)
+        return drain() if callable(drain) else b""
+
+    def _collect(self):
+        head = self._outstanding[0]
+        remain = head.deadline - time.monotonic()
+        if getattr(self._transport, "explicit_replies", False):
+            data = self._transport.recv_replies(timeout=remain) if remain > 0 else None
+        else:
+            data = self._transport.recv(timeout=remain) if remain > 0 else None
+        if not data:
+            if time.monotonic() >= head.deadline:
+                self._outstanding.popleft()
+                head.done = True
+                self._stats["timeouts"] += 1
+                self._guard_until = time.monotonic() + self.orphan_guard
+            return
+        if isinstance(data, list):
+            chunks = data
+        else:
+            n = self.backward_size
+            chunks = [data[i:i + n] for i in range(0, len(data), n)]
+        if len(chunks) > 1:
+            self._stats["coalesced_reads"] += 1
+        for chunk in chunks:
+            if self._outstanding:
+                it = self._outstanding.popleft()
+                it.reply, it.done = (None if chunk is None else bytes(chunk)), True
+                self._stats["answered" if chunk is not None else "no_reply"] += 1
+                self.rtt.add((time.monotonic() - it.sent) / it.slot)
+            else:
+                self._stats["orphan_bytes"] += len(chunk or b"")
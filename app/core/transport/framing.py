@@ -0,0 +1,148 @@
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+Reply = Optional[bytes]
+
+
+class FrameCodec(ABC):
+    """网关封包编解码：把连续的 2 字节前向帧封成发给网关的数据包，并从网关的字节流里拆出应答。
+
+    主机侧：encode() / feed() / reset()；网关侧（仿真用）：parse_requests() / encode_replies()。
+    explicit_replies=True 表示封包对每条查询都给出“应答/无应答”，配对层无需等超时即可判定，
+    并且可以让多条查询同时在途（一个数据包内最多 max_frames 条）。
+    """
+    name = "base"
+    explicit_replies = False
+    max_frames = 1
+
+    # ---------- 主机侧 ----------
+    @abstractmethod
+    def encode(self, frames: bytes | bytearray | memoryview, expect_reply: bool = False) -> List[bytes]: ...
+
+    @abstractmethod
+    def feed(self, data: bytes) -> List[Reply]:
+        """喂入收到的字节，返回已完整解出的应答（explicit_replies 时 None 表示该查询无应答）。"""
+
+    def reset(self) -> None:
+        pass
+
+    # ---------- 网关侧 ----------
+    @abstractmethod
+    def parse_requests(self, buf: bytearray) -> List[Tuple[bool, bytes]]:
+        """从 buf 中取走完整的请求包，返回 [(是否需要应答, 连续前向帧), ...]。"""
+
+    @abstractmethod
+    def encode_replies(self, replies: List[Reply]) -> bytes: ...
+
+
+class RawCodec(FrameCodec):
+    """透传：前向帧直接拼接，后向帧为裸的 1 字节（无应答即不回）。"""
+    name = "raw"
+    max_frames = 1
+
+    def encode(self, frames, expect_reply=False):
+        return [frames]
+
+    def feed(self, data):
+        return [data[i:i + 1] for i in range(len(data))]
+
+    def parse_requests(self, buf):
+        n = len(buf) // 2 * 2
+        frames = bytes(buf[:n])
+        del buf[:n]
+        return [(False, frames)] if frames else []
+
+    def encode_replies(self, replies):
+        return b"".join(r for r in replies if r)
+
+
+def _xor(data) -> int:
+    x = 0
+    for b in data:
+        x ^= b
+    return x
+
+
+class LengthPrefixedCodec(FrameCodec):
+    """长度前缀批量封包（lpb）：
+
+    请求  A5 | flags | n | n × (addr, data) | chk      flags bit0=各帧均为查询
+    应答  5A | n | n × (status, value) | chk           status 0=无应答 1=应答 2=帧错误（多台同时应答）
+    chk 为 magic 之后各字节的异或。只有查询包才有应答包，应答与请求帧一一对应；
+    校验失败、magic 不符或条数越界时丢弃一个字节重新同步。
+    """
+    name = "lpb"
+    explicit_replies = True
+    REQ = 0xA5
+    RSP = 0x5A
+
+    def __init__(self, max_frames: int = 16):
+        self.max_frames = max(1, min(255, int(max_frames)))
+        self._buf = bytearray()
+
+    def encode(self, frames, expect_reply=False):
+        view = memoryview(frames)
+        step = 2 * self.max_frames
+        out = []
+        for off in range(0, len(view) - 1, step):
+            chunk = view[off:off + step]
+            body = bytes((1 if expect_reply else 0, len(chunk) // 2)) + bytes(chunk)
+            out.append(bytes((self.REQ,)) + body + bytes((_xor(body),)))
+        return out
+
+    def feed(self, data):
+        self._buf += data
+        out: List[Reply] = []
+        for body in self._packets(self._buf, self.RSP, 1):
+            for i in range(1, len(body), 2):
+                status, value = body[i], body[i + 1]
+                out.append(None if status == 0 else bytes((value if status == 1 else 0xFF,)))
+        return out
+
+    def reset(self):
+        self._buf.clear()
+
+    def parse_requests(self, buf):
+        return [(bool(body[0] & 1), bytes(body[2:]))
+                for body in self._packets(buf, self.REQ, 2)]
+
+    def encode_replies(self, replies):
+        body = bytearray((len(replies),))
+        for r in replies:
+            body += bytes((1, r[0])) if r else b"\x00\x00"
+        return bytes((self.RSP,)) + bytes(body) + bytes((_xor(body),))
+
+    def _packets(self, buf: bytearray, magic: int, count_at: int):
+        """从 buf 头部取走完整、校验通过的包体（magic 与 chk 之间的字节）；count_at 为条数字节的位置。
+        条数超过 max_frames 的视为错位，同样丢弃一个字节。"""
+        out = []
+        while buf:
+            if buf[0] != magic:
+                del buf[0]
+                continue
+            if len(buf) < count_at + 1:
+                break
+            if buf[count_at] > self.max_frames:
+                del buf[0]
+                continue
+            end = 1 + count_at + buf[count_at] * 2
+            if len(buf) < end + 1:
+                break
+            body = bytes(buf[1:end])
+            if _xor(body) != buf[end]:
+                del buf[0]
+                continue
+            del buf[:end + 1]
+            out.append(body)
+        return out
+
+
+def make_codec(name: str | None = "raw", max_frames: int = 16) -> FrameCodec:
+    """按配置名构造封包：raw（透传，默认）| lpb（长度前缀批量）。"""
+    name = str(name or "raw").lower()
+    if name == "raw":
+        return RawCodec()
+    if name == "lpb":
+        return LengthPrefixedCodec(max_frames)
+    raise ValueError(f"未知的网关封包格式：{name}")
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from .base import Transport
+from ..dali.timing import BusPacer
+
+
+class PacedTransport(Transport):
+    """给任意 Transport 加上 DALI 时序配速与总线占用统计。
+
+    send_many() 按 max_batch 分段：每段先为整段预留总线时间，再一次写给下层，
+    网关按线路时序逐帧上总线；max_batch=1 退化为逐帧配速。
+    """
+    def __init__(self, inner: Transport, pacer: BusPacer, max_batch: int = 32):
+        self.inner = inner
+        self.pacer = pacer
+        self.max_batch = max(1, int(max_batch))
+
+    def connect(self) -> None:
+        self.inner.connect()
+
+    def disconnect(self) -> None:
+        self.inner.disconnect()
+
+    def send(self, frame: bytes) -> None:
+        self.pacer.acquire(1)
+        self.inner.send(frame)
+
+    @property
+    def explicit_replies(self) -> bool:
+        return getattr(self.inner, "explicit_replies", False)
+
+    def send_many(self, frames: bytes | bytearray | memoryview, expect_reply: bool = False) -> int:
+        view = memoryview(frames)
+        n = len(view) // 2
+        step = 2 * self.max_batch
+        for off in range(0, 2 * n, step):
+            chunk = view[off:off + step]
+            self.pacer.acquire(len(chunk) // 2)
+            self.inner.send_many(chunk, expect_reply)
+        return n
+
+    def recv_replies(self, timeout: float = 0.5) -> list[bytes | None] | None:
+        replies = self.inner.recv_replies(timeout=timeout)
+        for r in replies or ():
+            if r is not None:
+                self.pacer.note_backward()
+        return replies
+
+    def recv(self, timeout: float = 0.5) -> bytes | None:
+        data = self.inner.recv(timeout=timeout)
+        if data:
+            self.pacer.note_backward()
+        return data
+
+    def drain(self) -> bytes:
+        return self.inner.drain()
+
+    def is_connected(self) -> bool:
+        return self.inner.is_connected()
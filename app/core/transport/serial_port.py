@@ -1,28 +1,246 @@
 from __future__ import annotations
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List
 
-from .base import Transport
+from .base import ConnectionLost, Transport
+from .framing import FrameCodec, RawCodec, Reply
+
+
+class ByteRing:
+    """单生产者/单消费者字节环形缓冲。
+
+    写端（读线程）只推进 _head，读端只推进 _tail，两个计数只增不减，彼此只读对方的计数，
+    因此不需要锁；写满时丢弃新到的字节并计入 dropped。
+    """
+    def __init__(self, size: int = 4096):
+        self.size = max(16, int(size))
+        self._buf = bytearray(self.size)
+        self._head = 0
+        self._tail = 0
+        self.dropped = 0
+
+    def available(self) -> int:
+        return self._head - self._tail
+
+    def write(self, data: bytes) -> int:
+        n = min(len(data), self.size - (self._head - self._tail))
+        if n < len(data):
+            self.dropped += len(data) - n
+        pos = self._head % self.size
+        first = min(n, self.size - pos)
+        self._buf[pos:pos + first] = data[:first]
+        self._buf[:n - first] = data[first:n]
+        self._head += n          # 拷贝完成后再发布
+        return n
+
+    def read(self, n: int | None = None) -> bytes:
+        avail = self._head - self._tail
+        n = avail if n is None else min(int(n), avail)
+        pos = self._tail % self.size
+        first = min(n, self.size - pos)
+        out = bytes(self._buf[pos:pos + first]) + bytes(self._buf[:n - first])
+        self._tail += n
+        return out
 
 
 class SerialGateway(Transport):
-    """占位 Serial Transport，实现留待未来拓展。"""
+    """USB 串口 DALI 接口（需要 pyserial）。
+
+    - 读线程持续把串口字节写入 ByteRing，recv() 只从环形缓冲取数，超时内无数据返回 None；
+    - send_many() 按 codec 封包后整段写出；frame_gap_ms > 0 时按接口要求的帧间隔配速：
+      每次最多写 burst_frames 帧，下一次写入不早于上一段帧数 × 帧间隔之后（跨调用保持）；
+    - port 可以是设备名（COM3、/dev/ttyUSB0）或 pyserial URL（loop://、socket://…）；
+    - stats() 给出收发字节/帧/写入次数、环形缓冲溢出与帧间隔等待，以及平均吞吐。
+    """
+    READ_POLL = 0.05
 
-    def __init__(self, port: str, baudrate: int = 19200, timeout: float = 0.8):
+    def __init__(self, port: str, baudrate: int = 19200, timeout: float = 0.8,
+                 codec: FrameCodec | None = None, frame_gap_ms: float = 0.0,
+                 burst_frames: int = 16, ring_size: int = 4096):
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
+        self.codec = codec or RawCodec()
+        self.frame_gap = max(0.0, float(frame_gap_ms)) / 1000.0
+        self.burst_frames = max(1, int(burst_frames))
+        self._raw = isinstance(self.codec, RawCodec)
+        self._ring = ByteRing(ring_size)
+        self._ready = threading.Event()
+        self._replies: deque[Reply] = deque()
+        self._ser = None
+        self._reader: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._error: BaseException | None = None
+        self._next_write = 0.0
+        self._since = 0.0
+        self._log = logging.getLogger("SerialGateway")
+        self._counts: Dict[str, float] = {}
+        self._reset_counts()
 
-    def connect(self) -> None:  # pragma: no cover - 未实现
-        raise NotImplementedError("SerialGateway 仍未实现")
+    @property
+    def explicit_replies(self) -> bool:
+        return self.codec.explicit_replies
 
-    def disconnect(self) -> None:  # pragma: no cover - 未实现
-        raise NotImplementedError("SerialGateway 仍未实现")
+    # ---------- 连接 ----------
+    def connect(self) -> None:
+        if self._ser is not None:
+            return
+        try:
+            import serial
+        except ModuleNotFoundError as exc:
+            raise RuntimeError("串口网关需要 pyserial：pip install pyserial") from exc
+        self._ser = serial.serial_for_url(self.port, baudrate=int(self.baudrate), bytesize=8, parity="N",
+                                          stopbits=1, timeout=self.READ_POLL, write_timeout=self.timeout)
+        self.codec.reset()
+        self._replies.clear()
+        self._ring.read()
+        self._error = None
+        self._stop.clear()
+        self._since = time.monotonic()
+        self._reset_counts()
+        self._reader = threading.Thread(target=self._read_loop, name=f"serial-rx-{self.port}", daemon=True)
+        self._reader.start()
+        self._log.info("Serial connected %s @ %s", self.port, self.baudrate)
 
-    def send(self, frame: bytes) -> None:  # pragma: no cover - 未实现
-        raise NotImplementedError("SerialGateway 仍未实现")
-
-    def recv(self, timeout: float = 0.5) -> bytes | None:  # pragma: no cover - 未实现
-        raise NotImplementedError("SerialGateway 仍未实现")
+    def disconnect(self) -> None:
+        ser, self._ser = self._ser, None
+        if ser is None:
+            return
+        self._stop.set()
+        try:
+            ser.cancel_read()
+        except Exception:
+            pass
+        if self._reader is not None and self._reader is not threading.current_thread():
+            self._reader.join(1.0)
+        self._reader = None
+        try:
+            ser.close()
+        finally:
+            self._log.info("Serial disconnected")
 
     def is_connected(self) -> bool:
-        return False
+        return self._ser is not None and self._error is None
+
+    # ---------- 发送 ----------
+    def send(self, frame: bytes) -> None:
+        self.send_many(frame)
+
+    def send_many(self, frames: bytes | bytearray | memoryview, expect_reply: bool = False) -> int:
+        ser = self._ser
+        if ser is None or self._error is not None:
+            raise ConnectionLost("Not connected")
+        view = memoryview(frames)
+        n = len(view) // 2
+        step = 2 * (self.burst_frames if self.frame_gap > 0 else max(1, n))
+        for off in range(0, 2 * n, step):
+            chunk = view[off:off + step]
+            k = len(chunk) // 2
+            packets = self.codec.encode(chunk, expect_reply)
+            data = packets[0] if len(packets) == 1 else b"".join(packets)
+            self._pace(k)
+            try:
+                ser.write(data)
+            except Exception as exc:
+                self._log.warning("Serial write failed, closing port: %s", exc)
+                self.disconnect()
+                raise ConnectionLost(f"Serial write failed: {exc}") from exc
+            c = self._counts
+            c["tx_frames"] += k
+            c["tx_bytes"] += len(data)
+            c["tx_writes"] += 1
+        self._log.debug("SEND %d frames", n)
+        return n
+
+    def _pace(self, frames: int) -> None:
+        if self.frame_gap <= 0:
+            return
+        now = time.monotonic()
+        if now < self._next_write:
+            time.sleep(self._next_write - now)
+            self._counts["gap_wait_ms"] += (self._next_write - now) * 1000.0
+            now = self._next_write
+        self._next_write = now + frames * self.frame_gap
+
+    # ---------- 接收 ----------
+    def recv(self, timeout: float = 0.5) -> bytes | None:
+        if not self._raw:
+            data = b"".join(r for r in (self.recv_replies(timeout) or ()) if r)
+            return data or None
+        if not self._wait(timeout):
+            return None
+        data = self._ring.read()
+        self._log.debug("RECV %s", data.hex(" "))
+        return data
+
+    def recv_replies(self, timeout: float = 0.5) -> List[Reply] | None:
+        if self._raw:
+            return super().recv_replies(timeout)
+        deadline = time.monotonic() + timeout
+        while not self._replies and self._wait(deadline - time.monotonic()):
+            self._replies.extend(self.codec.feed(self._ring.read()))
+        if not self._replies:
+            return None
+        out = list(self._replies)
+        self._replies.clear()
+        return out
+
+    def drain(self) -> bytes:
+        data = self._ring.read()
+        if not self._raw and (data or self._replies):
+            self._replies.clear()
+            self.codec.reset()
+        if data:
+            self._log.info("DRAIN %s", data.hex(" "))
+        return data
+
+    def _wait(self, timeout: float) -> bool:
+        """等到环形缓冲有数据；读线程异常退出时抛 ConnectionLost。"""
+        if self._ring.available():
+            return True
+        if self._ser is None:
+            return False
+        if timeout > 0:
+            self._ready.clear()
+            if not self._ring.available():
+                self._ready.wait(timeout)
+        if self._error is not None and not self._ring.available():
+            err = self._error
+            self.disconnect()
+            raise ConnectionLost(f"Serial read failed: {err}")
+        return self._ring.available() > 0
+
+    def _read_loop(self) -> None:
+        ser = self._ser
+        c = self._counts
+        while not self._stop.is_set():
+            try:
+                data = ser.read(max(1, ser.in_waiting))
+            except Exception as exc:
+                if not self._stop.is_set():
+                    self._error = exc
+                    self._log.warning("Serial read failed: %s", exc)
+                self._ready.set()
+                return
+            if data:
+                self._ring.write(data)
+                c["rx_bytes"] += len(data)
+                c["rx_reads"] += 1
+                self._ready.set()
+
+    # ---------- 计量 ----------
+    def _reset_counts(self) -> None:
+        self._counts = {"tx_frames": 0, "tx_bytes": 0, "tx_writes": 0, "rx_bytes": 0, "rx_reads": 0,
+                        "gap_wait_ms": 0.0}
 
+    def stats(self) -> Dict[str, float]:
+        out = dict(self._counts)
+        out["rx_overflow"] = self._ring.dropped
+        out["rx_buffered"] = self._ring.available()
+        up = time.monotonic() - self._since if self._since else 0.0
+        out["tx_fps"] = out["tx_frames"] / up if up > 0 else 0.0
+        out["rx_Bps"] = out["rx_bytes"] / up if up > 0 else 0.0
+        return out
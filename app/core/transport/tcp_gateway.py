@@ -1,25 +1,41 @@
 from __future__ import annotations
 import socket
 import logging
-from .base import Transport
+import time
+from collections import deque
+from typing import List
+
+from .base import ConnectionLost, Transport
+from .framing import FrameCodec, RawCodec, Reply
 
 class TcpGateway(Transport):
-    """简化版 TCP 透传：把2字节DALI前向帧直接写到网关。
-    实际网关若有自定义封包，可在此改装（例如加前缀/校验/长度）。
+    """TCP 网关：按 codec 封包写出 DALI 前向帧（默认 RawCodec，2 字节帧直接透传）。
+    网关自定义的前缀/长度/校验实现为 FrameCodec；批量封包一包可带多帧、一包应答带多条结果。
     """
-    def __init__(self, host: str, port: int, timeout: float = 0.8):
+    def __init__(self, host: str, port: int, timeout: float = 0.8, codec: FrameCodec | None = None):
         self.host = host
         self.port = port
         self.timeout = timeout
+        self.codec = codec or RawCodec()
+        self._raw = isinstance(self.codec, RawCodec)
+        self._replies: deque[Reply] = deque()
         self._sock: socket.socket | None = None
         self._log = logging.getLogger("TcpGateway")
 
+    @property
+    def explicit_replies(self) -> bool:
+        return self.codec.explicit_replies
+
     def connect(self) -> None:
         if self._sock:
             return
         s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # 2 字节小包不能等 Nagle 合并，否则与对端的延迟 ACK 叠加会让每次查询多等几十毫秒
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         s.settimeout(self.timeout)
         s.connect((self.host, self.port))
+        self.codec.reset()
+        self._replies.clear()
         self._sock = s
         self._log.info("TCP connected %s:%s", self.host, self.port)
 
@@ -32,8 +48,11 @@ class TcpGateway(Transport):
                 self._log.info("TCP disconnected")
 
     def send(self, frame: bytes) -> None:
+        if not self._raw:
+            self.send_many(frame)
+            return
         if not self._sock:
-            raise RuntimeError("Not connected")
+            raise ConnectionLost("Not connected")
         # 大多数网关支持短包直发；若需要可在此加协议头
         self._log.info("SEND %s", frame.hex(" "))
         try:
@@ -41,19 +60,97 @@ class TcpGateway(Transport):
         except (BrokenPipeError, ConnectionResetError, OSError) as exc:
             self._log.warning("TCP send failed, closing socket: %s", exc)
             self.disconnect()
-            raise RuntimeError("TCP connection lost") from exc
+            raise ConnectionLost("TCP connection lost") from exc
+
+    def send_many(self, frames: bytes | bytearray | memoryview, expect_reply: bool = False) -> int:
+        """按 codec 封包后整段一次 sendall，不逐帧记 INFO 日志。"""
+        if not self._sock:
+            raise ConnectionLost("Not connected")
+        view = memoryview(frames)
+        packets = self.codec.encode(view, expect_reply)
+        data = packets[0] if len(packets) == 1 else b"".join(packets)
+        self._log.debug("SEND %d frames in %d packet(s) (%d B)", len(view) // 2, len(packets), len(data))
+        try:
+            self._sock.sendall(data)
+        except (BrokenPipeError, ConnectionResetError, OSError) as exc:
+            self._log.warning("TCP send failed, closing socket: %s", exc)
+            self.disconnect()
+            raise ConnectionLost("TCP connection lost") from exc
+        return len(view) // 2
 
     def recv(self, timeout: float = 0.5) -> bytes | None:
+        if not self._raw:
+            data = b"".join(r for r in (self.recv_replies(timeout) or ()) if r)
+            return data or None
         if not self._sock:
             return None
         self._sock.settimeout(timeout)
         try:
             data = self._sock.recv(1024)
-            if data:
-                self._log.info("RECV %s", data.hex(" "))
-            return data or None
         except socket.timeout:
             return None
+        except OSError as exc:
+            self._lost(exc)
+        if not data:
+            self._lost("peer closed")
+        self._log.info("RECV %s", data.hex(" "))
+        return data
+
+    def recv_replies(self, timeout: float = 0.5) -> List[Reply] | None:
+        """按 codec 解包读取应答，直到至少解出一条或超时；explicit_replies 时 None 项表示无应答。"""
+        if self._raw:
+            return super().recv_replies(timeout)
+        deadline = time.monotonic() + timeout
+        while not self._replies and self._sock:
+            remain = deadline - time.monotonic()
+            if remain <= 0:
+                break
+            self._sock.settimeout(remain)
+            try:
+                data = self._sock.recv(4096)
+            except socket.timeout:
+                break
+            except OSError as exc:
+                self._lost(exc)
+            if not data:
+                self._lost("peer closed")
+            self._replies.extend(self.codec.feed(data))
+        if not self._replies:
+            return None
+        out = list(self._replies)
+        self._replies.clear()
+        return out
+
+    def _lost(self, why) -> None:
+        self._log.warning("TCP connection lost: %s", why)
+        self.disconnect()
+        raise ConnectionLost(f"TCP connection lost: {why}")
+
+    def drain(self) -> bytes:
+        if not self._sock:
+            return b""
+        out = bytearray()
+        self._sock.setblocking(False)
+        try:
+            while True:
+                data = self._sock.recv(1024)
+                if not data:
+                    break
+                out.extend(data)
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            pass
+        finally:
+            if self._sock:
+                self._sock.settimeout(self.timeout)
+        if not self._raw and (out or self._replies):
+            # 封包模式下滞留的都是迟到的应答，连同半个包一起丢弃
+            self._replies.clear()
+            self.codec.reset()
+        if out:
+            self._log.info("DRAIN %s", bytes(out).hex(" "))
+        return bytes(out)
 
     def is_connected(self) -> bool:
         return self._sock is not None
@@ -0,0 +1,326 @@
+from __future__ import annotations
+import select
+import socket
+import struct
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .base import ConnectionLost, Transport
+from .framing import Reply
+from ..dali.timing import DaliTiming
+
+# 数据报格式（大端）：
+#   请求  D1 | seq u16 | flags | n | n × (addr, data)          flags bit0=各帧均为查询
+#   应答  D2 | seq u16 | n | n × (status, value)               status 0=无应答 1=应答 2=帧错误
+# 每个请求都有应答（非查询 n=0，作确认）；网关按 (来源, seq) 去重，重传的请求只回放缓存的应答。
+REQ = 0xD1
+RSP = 0xD2
+_HDR = struct.Struct(">BHBB")
+_RSP_HDR = struct.Struct(">BHB")
+
+
+def encode_request(seq: int, frames: bytes | memoryview, expect_reply: bool) -> bytes:
+    return _HDR.pack(REQ, seq & 0xFFFF, 1 if expect_reply else 0, len(frames) // 2) + bytes(frames)
+
+
+def decode_request(data: bytes) -> Optional[Tuple[int, bool, bytes]]:
+    if len(data) < _HDR.size or data[0] != REQ:
+        return None
+    _, seq, flags, n = _HDR.unpack_from(data)
+    frames = data[_HDR.size:_HDR.size + 2 * n]
+    return (seq, bool(flags & 1), frames) if len(frames) == 2 * n else None
+
+
+def encode_reply(seq: int, replies: List[Reply]) -> bytes:
+    body = b"".join(bytes((1, r[0])) if r else b"\x00\x00" for r in replies)
+    return _RSP_HDR.pack(RSP, seq & 0xFFFF, len(replies)) + body
+
+
+def decode_reply(data: bytes) -> Optional[Tuple[int, List[Reply]]]:
+    if len(data) < _RSP_HDR.size or data[0] != RSP:
+        return None
+    _, seq, n = _RSP_HDR.unpack_from(data)
+    body = data[_RSP_HDR.size:_RSP_HDR.size + 2 * n]
+    if len(body) != 2 * n:
+        return None
+    out: List[Reply] = []
+    for i in range(0, 2 * n, 2):
+        status, value = body[i], body[i + 1]
+        out.append(None if status == 0 else bytes((value if status == 1 else 0xFF,)))
+    return seq, out
+
+
+class UdpHub:
+    """多个 UdpGateway 共用的 UDP 套接字与收包线程：按来源地址把应答分发给对应网关，
+    并为有未确认数据报的网关驱动重传计时。shared() 返回进程级共用实例。"""
+    _shared: Optional["UdpHub"] = None
+    _shared_lock = threading.Lock()
+    TICK = 0.01
+
+    def __init__(self, bind: Tuple[str, int] = ("0.0.0.0", 0)):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind(bind)
+        self._sock.setblocking(False)
+        self._gateways: Dict[Tuple[str, int], "UdpGateway"] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._log = logging.getLogger("UdpHub")
+
+    @classmethod
+    def shared(cls) -> "UdpHub":
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._sock.getsockname()
+
+    def register(self, addr: Tuple[str, int], gw: "UdpGateway") -> None:
+        with self._lock:
+            if addr in self._gateways and self._gateways[addr] is not gw:
+                raise ValueError(f"UDP 端点 {addr} 已被占用")
+            self._gateways[addr] = gw
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name="udp-hub", daemon=True)
+                self._thread.start()
+
+    def unregister(self, addr: Tuple[str, int]) -> None:
+        with self._lock:
+            self._gateways.pop(addr, None)
+
+    def sendto(self, data: bytes, addr: Tuple[str, int]) -> None:
+        self._sock.sendto(data, addr)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        self._sock.close()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                ready, _, _ = select.select([self._sock], [], [], self.TICK)
+            except (OSError, ValueError):
+                return
+            while ready:
+                try:
+                    data, addr = self._sock.recvfrom(2048)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError:
+                    # Windows 上对端端口不可达会在下一次 recvfrom 报 ConnectionResetError
+                    continue
+                gw = self._gateways.get(addr[:2])
+                if gw is not None:
+                    gw._on_datagram(data)
+            now = time.monotonic()
+            with self._lock:
+                active = [gw for gw in self._gateways.values() if gw._out is not None]
+            for gw in active:
+                gw._tick(now)
+
+
+@dataclass
+class _Pending:
+    seq: int
+    packet: bytes
+    expect: bool
+    frames: int
+    deadline: float
+    tries: int = 1
+
+
+class UdpGateway(Transport):
+    """UDP 网关：一个数据报最多带 max_frames 帧，应答按序号配对，丢包时有限次重传。
+
+    - 每个网关同一时刻只有一个未确认的数据报（停等），保证帧在总线上的先后顺序；
+      发送下一段前等前一段的确认，确认由共用 UdpHub 的收包线程处理；
+    - 首次超时 = 按 DaliTiming 估算的总线时间 + rto，之后按 rto × 2^k 重传，最多 retries 次；仍无应答时放弃，
+      计入 lost 并视为链路中断：在途的 recv_replies() 与之后的 send/recv 抛 ConnectionLost，由断线重连接管；
+    - connect() 发一个空数据报探测网关，收到确认才算连上，网关不在时连接失败；
+    - 多个 UdpGateway 共用一个套接字（hub，默认 UdpHub.shared()），上百条总线也只占一个端口。
+    """
+    explicit_replies = True
+
+    def __init__(self, host: str, port: int, timeout: float = 0.8, hub: UdpHub | None = None,
+                 max_frames: int = 16, rto: float = 0.1, retries: int = 3,
+                 timing: DaliTiming | None = None):
+        self.host = host
+        self.port = int(port)
+        self.timeout = float(timeout)
+        self.max_frames = max(1, min(255, int(max_frames)))
+        self.rto = max(0.001, float(rto))
+        self.retries = max(0, int(retries))
+        self.timing = timing or DaliTiming()
+        self._hub = hub
+        self._addr: Optional[Tuple[str, int]] = None
+        self._seq = 0
+        self._out: Optional[_Pending] = None
+        self._replies: List[Reply] = []
+        self._error: Optional[ConnectionLost] = None
+        self._cond = threading.Condition()
+        self._log = logging.getLogger("UdpGateway")
+        self._counts: Dict[str, int] = {
+            "datagrams_tx": 0, "datagrams_rx": 0, "frames_tx": 0,
+            "retransmits": 0, "lost": 0, "stale_rx": 0,
+        }
+
+    # ---------- 连接 ----------
+    def connect(self) -> None:
+        if self._addr is not None:
+            return
+        if self._hub is None:
+            self._hub = UdpHub.shared()
+        info = socket.getaddrinfo(self.host, self.port, socket.AF_INET, socket.SOCK_DGRAM)
+        addr = info[0][4][:2]
+        self._hub.register(addr, self)
+        self._addr = addr
+        self._error = None
+        try:
+            # 空数据报（n=0）只换回一个确认
+            self._send_chunk(b"", False)
+            with self._cond:
+                self._await_idle()
+        except ConnectionLost:
+            self.disconnect()
+            raise
+        self._log.info("UDP gateway %s:%s via %s", self.host, self.port, self._hub.address)
+
+    def disconnect(self) -> None:
+        addr, self._addr = self._addr, None
+        if addr is None:
+            return
+        self._hub.unregister(addr)
+        with self._cond:
+            self._out = None
+            self._error = None
+            self._replies.clear()
+            self._cond.notify_all()
+        self._log.info("UDP gateway %s:%s released", self.host, self.port)
+
+    def is_connected(self) -> bool:
+        return self._addr is not None
+
+    # ---------- 发送 ----------
+    def send(self, frame: bytes) -> None:
+        self.send_many(frame)
+
+    def send_many(self, frames: bytes | bytearray | memoryview, expect_reply: bool = False) -> int:
+        with self._cond:
+            self._raise_lost()
+        if self._addr is None:
+            raise ConnectionLost("Not connected")
+        view = memoryview(frames)
+        n = len(view) // 2
+        step = 2 * self.max_frames
+        for off in range(0, 2 * n, step):
+            self._send_chunk(view[off:off + step], expect_reply)
+        return n
+
+    def _send_chunk(self, chunk: bytes | memoryview, expect_reply: bool) -> None:
+        k = len(chunk) // 2
+        bus_s = self.timing.estimate_ms(k, k if expect_reply else 0) / 1000.0
+        with self._cond:
+            self._await_idle()
+            addr = self._addr
+            if addr is None:
+                raise ConnectionLost("Not connected")
+            self._seq = (self._seq + 1) & 0xFFFF
+            pkt = encode_request(self._seq, chunk, expect_reply)
+            self._out = _Pending(self._seq, pkt, expect_reply, k, time.monotonic() + bus_s + self.rto)
+            self._counts["datagrams_tx"] += 1
+            self._counts["frames_tx"] += k
+        self._hub.sendto(pkt, addr)
+
+    def _await_idle(self) -> None:
+        """（持有 _cond）等前一个数据报被确认；已被放弃时抛 ConnectionLost。"""
+        self._raise_lost()
+        out = self._out
+        if out is None:
+            return
+        bus_s = self.timing.estimate_ms(out.frames, out.frames if out.expect else 0) / 1000.0
+        limit = time.monotonic() + bus_s + self.rto * (2 ** (self.retries + 1)) + self.timeout
+        while self._out is not None:
+            remain = limit - time.monotonic()
+            if remain <= 0 or self._addr is None:
+                raise ConnectionLost(f"UDP gateway {self.host}:{self.port} 无响应")
+            self._cond.wait(remain)
+            self._raise_lost()
+
+    def _raise_lost(self) -> None:
+        """（持有 _cond）数据报重传耗尽后释放端点并抛出 ConnectionLost（只抛一次）。"""
+        err = self._error
+        if err is None:
+            return
+        self._error = None
+        self.disconnect()
+        raise err
+
+    # ---------- 接收 ----------
+    def recv(self, timeout: float = 0.5) -> bytes | None:
+        data = b"".join(r for r in (self.recv_replies(timeout) or ()) if r)
+        return data or None
+
+    def recv_replies(self, timeout: float = 0.5) -> List[Reply] | None:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not self._replies:
+                self._raise_lost()
+                remain = deadline - time.monotonic()
+                if remain <= 0:
+                    return None
+                self._cond.wait(remain)
+            out, self._replies = self._replies, []
+        return out
+
+    def drain(self) -> bytes:
+        with self._cond:
+            self._replies = []
+        return b""
+
+    # ---------- 收包线程回调 ----------
+    def _on_datagram(self, data: bytes) -> None:
+        rsp = decode_reply(data)
+        with self._cond:
+            out = self._out
+            if rsp is None or out is None or rsp[0] != out.seq:
+                self._counts["stale_rx"] += 1
+                return
+            self._counts["datagrams_rx"] += 1
+            if out.expect:
+                self._replies.extend(rsp[1])
+            self._out = None
+            self._cond.notify_all()
+
+    def _tick(self, now: float) -> None:
+        resend = None
+        with self._cond:
+            out = self._out
+            if out is None or now < out.deadline:
+                return
+            if out.tries <= self.retries:
+                out.tries += 1
+                out.deadline = now + self.rto * (2 ** (out.tries - 1))
+                self._counts["retransmits"] += 1
+                resend = out.packet
+            else:
+                self._counts["lost"] += 1
+                self._error = ConnectionLost(
+                    f"UDP gateway {self.host}:{self.port} 无响应（重传 {self.retries} 次）")
+                self._out = None
+                self._cond.notify_all()
+        if resend is not None and self._addr is not None:
+            self._hub.sendto(resend, self._addr)
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            return dict(self._counts)
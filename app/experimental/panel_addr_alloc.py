@@ -1,27 +1,84 @@
 # app/experimental/panel_addr_alloc.py
 from __future__ import annotations
 
+import threading
+
 from PySide6 import QtWidgets, QtCore
 
+from app.core.bus.commission import Commissioner
+
+
+class _Bridge(QtCore.QObject):
+    progress = QtCore.Signal(int, int)   # short, random
+    finished = QtCore.Signal(str)
+
 
 class AddressAllocPanel(QtWidgets.QWidget):
-    def __init__(self, parent=None):
+    """随机地址分配：在后台线程运行 Commissioner，逐台输出分配结果与各阶段耗时/帧数。"""
+
+    def __init__(self, parent=None, controller=None):
         super().__init__(parent)
+        self.ctrl = controller
         self.setObjectName("PanelAddrAlloc")
-        self.setWindowTitle("地址分配策略")
+        self.setWindowTitle("地址分配")
         layout = QtWidgets.QVBoxLayout(self)
         self.combo = QtWidgets.QComboBox()
-        self.combo.addItems(["二分搜索法", "随机冲突解析", "预分配映射"])
+        self.combo.addItems(["仅未寻址设备", "全部重新分配"])
         layout.addWidget(self.combo)
-        self.btn_run = QtWidgets.QPushButton("模拟执行")
-        layout.addWidget(self.btn_run)
+        row = QtWidgets.QHBoxLayout()
+        self.btn_run = QtWidgets.QPushButton("开始分配")
+        self.btn_stop = QtWidgets.QPushButton("停止")
+        self.btn_stop.setEnabled(False)
+        row.addWidget(self.btn_run)
+        row.addWidget(self.btn_stop)
+        layout.addLayout(row)
         self.out = QtWidgets.QPlainTextEdit()
         self.out.setReadOnly(True)
         layout.addWidget(self.out)
-        self.btn_run.clicked.connect(self._simulate)
+        self.btn_run.clicked.connect(self._run)
+        self.btn_stop.clicked.connect(self._stop_run)
 
-    def _simulate(self):
-        idx = self.combo.currentIndex()
-        msg = ["执行：二分搜索法", "执行：随机冲突解析", "执行：预分配映射"][idx]
-        self.out.appendPlainText(msg)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._bridge = _Bridge()
+        self._bridge.progress.connect(self._on_progress)
+        self._bridge.finished.connect(self._on_finished)
 
+    def _run(self):
+        if self.ctrl is None or not self.ctrl.is_connected():
+            self.out.appendPlainText("未连接网关")
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        mode = "unaddressed" if self.combo.currentIndex() == 0 else "all"
+        self._stop.clear()
+        self.btn_run.setEnabled(False)
+        self.btn_stop.setEnabled(True)
+        self.out.appendPlainText(f"执行：随机地址分配（{self.combo.currentText()}）")
+
+        def work():
+            try:
+                rep = Commissioner(self.ctrl, mode=mode).run(
+                    on_progress=self._bridge.progress.emit, stop=self._stop)
+                msg = rep.summary()
+                if rep.exhausted:
+                    msg += "\n短地址已用完，仍有设备未分配"
+                if rep.failed_verify:
+                    msg += f"\n校验失败：{rep.failed_verify}"
+            except Exception as e:
+                msg = f"分配失败：{e!r}"
+            self._bridge.finished.emit(msg)
+
+        self._thread = threading.Thread(target=work, name="commission", daemon=True)
+        self._thread.start()
+
+    def _stop_run(self):
+        self._stop.set()
+
+    def _on_progress(self, short: int, rand: int):
+        self.out.appendPlainText(f"短址 {short:2d} ← 随机地址 0x{rand:06X}")
+
+    def _on_finished(self, msg: str):
+        self.out.appendPlainText(msg)
+        self.btn_run.setEnabled(True)
+        self.btn_stop.setEnabled(False)
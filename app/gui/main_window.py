@@ -3,6 +3,7 @@ from PySide6.QtWidgets import (
     QMainWindow, QTabWidget, QStatusBar, QMessageBox, QApplication
 )
 from PySide6.QtGui import QAction
+from PySide6.QtCore import Qt
 import logging
 
 from app.core.controller import Controller
@@ -91,6 +92,9 @@ class MainWindow(QMainWindow):
         self.act_disconnect.triggered.connect(self._on_disconnect)
         menu_tools.addAction(self.act_connect)
         menu_tools.addAction(self.act_disconnect)
+        self.act_addr_alloc = QAction(_tr_static("地址分配..."), self)
+        self.act_addr_alloc.triggered.connect(self._on_addr_alloc)
+        menu_tools.addAction(self.act_addr_alloc)
 
         # 帮助菜单
         menu_help = self.menuBar().addMenu(_tr_static("帮助"))
@@ -119,6 +123,15 @@ class MainWindow(QMainWindow):
             self.statusBar().showMessage(i18n.t("status.disconnected.brief", _tr_static("已断开")), 1500)
             self._update_status()
 
+    def _on_addr_alloc(self):
+        from app.experimental.panel_addr_alloc import AddressAllocPanel
+        panel = getattr(self, "_addr_alloc", None)
+        if panel is None:
+            panel = self._addr_alloc = AddressAllocPanel(self, controller=self.ctrl)
+            panel.setWindowFlag(Qt.Window, True)
+        panel.show()
+        panel.raise_()
+
     def _on_about(self):
         QMessageBox.information(
             self,
@@ -164,9 +164,12 @@ class PanelBenchmark(BasePanel):
         self.lbl_avg = QLabel("Avg:")
         self.lbl_min = QLabel("Min:")
         self.lbl_max = QLabel("Max:")
+        self.lb_util = QLabel("0.0 %")
+        self.lbl_util = QLabel("Bus:")
         sg.addWidget(self.lbl_sent, 0, 0); sg.addWidget(self.lb_sent, 0, 1)
         sg.addWidget(self.lbl_ok, 0, 2); sg.addWidget(self.lb_ok, 0, 3)
         sg.addWidget(self.lbl_err, 0, 4); sg.addWidget(self.lb_err, 0, 5)
+        sg.addWidget(self.lbl_util, 0, 6); sg.addWidget(self.lb_util, 0, 7)
         sg.addWidget(self.lbl_last, 1, 0); sg.addWidget(self.lb_last, 1, 1)
         sg.addWidget(self.lbl_avg, 1, 2); sg.addWidget(self.lb_avg, 1, 3)
         sg.addWidget(self.lbl_min, 1, 4); sg.addWidget(self.lb_min, 1, 5)
@@ -255,6 +258,7 @@ class PanelBenchmark(BasePanel):
         self.lb_avg.setText(f"{payload.get('avg_ms', 0.0):.1f} ms")
         self.lb_min.setText(f"{payload.get('min_ms', 0.0):.1f} ms")
         self.lb_max.setText(f"{payload.get('max_ms', 0.0):.1f} ms")
+        self.lb_util.setText(f"{payload.get('bus_util_pct', 0.0):.1f} %")
         tooltip = payload.get("last_log")
         if tooltip:
             self.lb_last.setToolTip(tooltip)
@@ -324,6 +328,7 @@ class PanelBenchmark(BasePanel):
         _bind_text(self.lbl_avg, "Avg:", "Avg:", self._i18n_widgets)
         _bind_text(self.lbl_min, "Min:", "Min:", self._i18n_widgets)
         _bind_text(self.lbl_max, "Max:", "Max:", self._i18n_widgets)
+        _bind_text(self.lbl_util, "总线占用:", "Bus util:", self._i18n_widgets)
 
         # Combo items
         for index, (zh, en, _key) in enumerate(self._task_items):
@@ -42,10 +42,14 @@ class PanelConfigIO(QWidget):
         self.chk_scenes = QCheckBox()
         self.chk_recall = QCheckBox()
         self.chk_presets = QCheckBox()
+        self.chk_delta = QCheckBox()
+        self.chk_delta.setChecked(True)
+        self.btn_dry = QPushButton()
         self.btn_apply = QPushButton()
 
         self.btn_browse.clicked.connect(self._browse)
         self.btn_apply.clicked.connect(self._apply)
+        self.btn_dry.clicked.connect(lambda: self._apply(dry_run=True))
 
         ig.addWidget(self.le_path, 0, 0, 1, 3)
         ig.addWidget(self.btn_browse, 0, 3)
@@ -54,6 +58,8 @@ class PanelConfigIO(QWidget):
         ig.addWidget(self.chk_scenes, 2, 0)
         ig.addWidget(self.chk_recall, 2, 1)
         ig.addWidget(self.chk_presets, 3, 0)
+        ig.addWidget(self.chk_delta, 3, 1)
+        ig.addWidget(self.btn_dry, 4, 2)
         ig.addWidget(self.btn_apply, 4, 3)
         root.addWidget(self.box_in)
 
@@ -86,6 +92,8 @@ class PanelConfigIO(QWidget):
         self.chk_scenes.setText(tr("应用 场景亮度表", "Apply scene brightness table"))
         self.chk_recall.setText(tr("写入场景后回放验证", "Playback verification after writing"))
         self.chk_presets.setText(tr("导入 DT8 预设（写入用户预设文件）", "Import DT8 presets (write to user preset files)"))
+        self.chk_delta.setText(tr("仅下发差异（先读回比对）", "Send differences only (read back first)"))
+        self.btn_dry.setText(tr("预演", "Dry run"))
         self.btn_apply.setText(tr("导入并应用", "Import and apply"))
 
         self.box_out.setTitle(tr("导出", "Export"))
@@ -134,15 +142,28 @@ class PanelConfigIO(QWidget):
             lines.append(f"  preset: {preset.get('name')}")
         self.te_info.setPlainText('\n'.join(lines))
 
-    def _apply(self):
+    def _apply(self, dry_run: bool = False):
         if not self._loaded:
             self._show("请先加载 JSON", "Load the JSON file first", 2000)
             return
         state = self._loaded
+        delta = self.chk_delta.isChecked()
+        lines = []
         if self.chk_groups.isChecked() and state.groups:
-            apply_groups(self.ctrl, state.groups, clear_others=self.chk_clear_others.isChecked())
+            rep = apply_groups(self.ctrl, state.groups, clear_others=self.chk_clear_others.isChecked(),
+                               delta=delta, dry_run=dry_run)
+            lines.append("groups " + rep.summary())
+            lines.extend("  " + c for c in rep.changes[:50])
         if self.chk_scenes.isChecked() and state.scenes:
-            apply_scenes(self.ctrl, state.scenes, recall_after_store=self.chk_recall.isChecked())
+            rep = apply_scenes(self.ctrl, state.scenes, recall_after_store=self.chk_recall.isChecked(),
+                               delta=delta, dry_run=dry_run)
+            lines.append("scenes " + rep.summary())
+            lines.extend("  " + c for c in rep.changes[:50])
+        if lines:
+            self.te_info.setPlainText("\n".join(lines))
+        if dry_run:
+            self._show("预演完成", "Dry run complete", 2500)
+            return
         if self.chk_presets.isChecked() and state.dt8_presets is not None:
             user_path = self.root_dir / "数据" / "presets.json"
             save_user_presets(user_path, state.dt8_presets)
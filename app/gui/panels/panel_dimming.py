@@ -12,6 +12,7 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt
 from app.gui.widgets.base_panel import BasePanel
 from app.gui.widgets.address_target import AddressTargetWidget
+from app.core.bus.executor import Lane
 from app.i18n import tr, trf
 
 
@@ -43,6 +44,8 @@ class PanelDimming(BasePanel):
         # 双向联动
         self.slider.valueChanged.connect(self.spin.setValue)
         self.spin.valueChanged.connect(self.slider.setValue)
+        # 拖动滑条时实时下发；未发出的旧值由控制器按目标合并，只保留最新值
+        self.slider.valueChanged.connect(self._on_slider_drag)
 
         self.btn_min = QPushButton()
         self.btn_mid = QPushButton()
@@ -76,6 +79,17 @@ class PanelDimming(BasePanel):
         self.apply_language()
 
     # ---------- helpers ----------
+    def _on_slider_drag(self, val: int):
+        if not self.slider.isSliderDown() or not self.ctrl.is_connected():
+            return
+        try:
+            with self.ctrl.lane(Lane.INTERACTIVE):
+                self.ctrl.send_arc(self.addr_widget.mode(), int(val),
+                                   addr_val=self.addr_widget.addr_value(),
+                                   unaddr=self.addr_widget.unaddressed(), wait=False)
+        except Exception as e:
+            self.show_msg(trf("发送失败：{error}", "Send failed: {error}", error=e), 5000)
+
     # ---------- actions ----------
     def _send_arc(self, val: int):
         # 确保UI一致
@@ -85,7 +99,9 @@ class PanelDimming(BasePanel):
         addr_val = self.addr_widget.addr_value()
         unaddr = self.addr_widget.unaddressed()
         try:
-            self.ctrl.send_arc(mode, int(val), addr_val=addr_val, unaddr=unaddr)
+            # 界面调光走 interactive 通道：压测/扫描进行中也只需等一个在途程序
+            with self.ctrl.lane(Lane.INTERACTIVE):
+                self.ctrl.send_arc(mode, int(val), addr_val=addr_val, unaddr=unaddr)
             self.show_msg(trf("已发送 ARC={value}", "Sent ARC={value}", value=int(val)), 2000)
         except Exception as e:
             self._log.error(tr("发送ARC失败", "ARC send failed"), exc_info=True)
@@ -44,6 +44,8 @@ class PanelDt8Tc(BasePanel):
         self.spinK.valueChanged.connect(self.slider.setValue)
         self.spinK.valueChanged.connect(self._update_mirek)
         self._update_mirek(self.spinK.value())
+        # 拖动色温滑条时实时下发（控制器合并未发出的旧值）
+        self.slider.valueChanged.connect(self._on_slider_drag)
 
         self.btn_send = QPushButton()
         self.btn_send.clicked.connect(self._on_send)
@@ -68,6 +70,16 @@ class PanelDt8Tc(BasePanel):
         except Exception:
             pass
 
+    def _on_slider_drag(self, k: int):
+        if not self.slider.isSliderDown() or not self.ctrl.is_connected():
+            return
+        try:
+            self.ctrl.dt8_set_tc_kelvin(self.addr_widget.mode(), int(k),
+                                        addr_val=self.addr_widget.addr_value(),
+                                        unaddr=self.addr_widget.unaddressed(), wait=False)
+        except Exception as e:
+            self.show_msg(trf("失败：{error}", "Failed: {error}", error=e), 5000)
+
     def _on_send(self):
         mode = self.addr_widget.mode()
         addr_val = self.addr_widget.addr_value()
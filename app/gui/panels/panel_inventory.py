@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 import json
+import threading
 from pathlib import Path
 from typing import Dict, List
 
-from PySide6.QtCore import Qt, QDateTime
+from PySide6.QtCore import Qt, QDateTime, QObject, Signal
 from PySide6.QtWidgets import (
     QFileDialog,
     QGroupBox,
@@ -17,10 +18,18 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+from app.core.bus.executor import Lane
 from app.gui.widgets.base_panel import BasePanel
 from app.i18n import tr, trf
 
 
+class _ScanBridge(QObject):
+    """把扫描线程的结果以排队信号送回 GUI 线程。"""
+    found = Signal(int, int)      # short, status
+    finished = Signal(int)        # count
+    failed = Signal(str)          # error
+
+
 class PanelInventory(BasePanel):
     """设备读回与导出面板。"""
 
@@ -28,6 +37,11 @@ class PanelInventory(BasePanel):
         super().__init__(controller, statusbar)
         self.root_dir = root_dir
         self._devices: Dict[int, Dict[str, object]] = {}
+        self._scan_thread: threading.Thread | None = None
+        self._bridge = _ScanBridge()
+        self._bridge.found.connect(self._on_scan_found)
+        self._bridge.finished.connect(self._on_scan_finished)
+        self._bridge.failed.connect(self._on_scan_failed)
 
         self._build_ui()
         self.apply_language()
@@ -68,25 +82,46 @@ class PanelInventory(BasePanel):
 
     # ------------------ Actions ------------------
     def _scan_devices(self):
-        found = self.ctrl.scan_devices()
-        self._devices = {
-            short: {
-                "status": True,
-                "groups": {},
-                "scenes": {},
-            }
-            for short in found
-        }
+        """后台线程扫描，发现一台即加入表格，GUI 不阻塞。"""
+        if self._scan_thread is not None and self._scan_thread.is_alive():
+            return
+        self._devices = {}
         self._refresh_table()
-        self.show_msg(trf("扫描完成：{count} 台", "Scan finished: {count} device(s)", count=len(found)), 2000)
+        self.btn_scan.setEnabled(False)
+        self.show_msg(tr("正在扫描…", "Scanning..."), 1500)
+
+        def run():
+            try:
+                found = self.ctrl.scan_devices(
+                    on_found=lambda hit: self._bridge.found.emit(hit.short, hit.status))
+            except Exception as e:
+                self._bridge.failed.emit(repr(e))
+            else:
+                self._bridge.finished.emit(len(found))
+
+        self._scan_thread = threading.Thread(target=run, name="inventory-scan", daemon=True)
+        self._scan_thread.start()
+
+    def _on_scan_found(self, short: int, _status: int):
+        self._devices[short] = {"status": True, "groups": {}, "scenes": {}}
+        self._refresh_table()
+
+    def _on_scan_finished(self, count: int):
+        self.btn_scan.setEnabled(self.ctrl.is_connected())
+        self.show_msg(trf("扫描完成：{count} 台", "Scan finished: {count} device(s)", count=count), 2000)
+
+    def _on_scan_failed(self, error: str):
+        self.btn_scan.setEnabled(self.ctrl.is_connected())
+        self.show_msg(trf("扫描失败：{error}", "Scan failed: {error}", error=error), 5000)
 
     def _read_groups(self):
         if not self._devices:
             self.show_msg(tr("请先扫描设备", "Scan devices first"), 2000)
             return
-        for short in list(self._devices.keys()):
-            groups = self.ctrl.query_groups(short)
-            self._devices[short]["groups"] = groups
+        with self.ctrl.lane(Lane.BULK):
+            for short in list(self._devices.keys()):
+                groups = self.ctrl.query_groups(short)
+                self._devices[short]["groups"] = groups
         self._refresh_table()
         self.show_msg(tr("已读取组成员信息", "Group memberships updated"), 2000)
 
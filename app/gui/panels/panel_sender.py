@@ -211,8 +211,8 @@ class PanelSender(BasePanel):
         except Exception as exc:
             self.show_msg(trf("解析失败：{error}", "Parse failed: {error}", error=exc), 4000)
             return
-        for addr, data in pairs:
-            self.ctrl.send_raw(addr, data)
+        # 整段作为一个原子程序下发，连续帧一次写出
+        self.ctrl.send_sequence(pairs)
         self._push_history(pairs, "RAW")
         self.show_msg(trf("已发送 {count} 帧", "Sent {count} frame(s)", count=len(pairs)), 2000)
 
@@ -238,8 +238,7 @@ class PanelSender(BasePanel):
         if row < 0:
             return
         item = self._history[row]
-        for addr, data in item["frames"]:
-            self.ctrl.send_raw(int(addr), int(data))
+        self.ctrl.send_sequence([(int(addr), int(data)) for addr, data in item["frames"]])
         self.show_msg(tr("已重放", "Replayed"), 1500)
 
     def _delete(self):
@@ -0,0 +1,31 @@
+import pytest
+
+from app.core.config import default_ops
+from app.core.controller import Controller
+from app.core.sim.bus import SimBus
+from app.core.sim.server import SimGatewayServer
+
+
+@pytest.fixture
+def sim_ctrl():
+    """工厂：sim_ctrl(bus 或短址列表, **gateway 段) → 已连上本地仿真网关（TCP）的 Controller。
+
+    time_scale / codec 传给 SimGatewayServer；要读服务端计数或中途停机时传入自建的 server=；
+    ops 缺省为 default_ops()。测试结束时依次关闭 Controller 与仿真网关。
+    """
+    made = []
+
+    def make(bus, *, time_scale=0.0, codec=None, server=None, ops=None, **gw):
+        if not isinstance(bus, SimBus):
+            bus = SimBus(bus)
+        srv = server or SimGatewayServer(bus, time_scale=time_scale, codec=codec)
+        ctrl = Controller({"gateway": {"type": "tcp", "host": "127.0.0.1", "port": srv.start(), **gw},
+                           "ops": default_ops() if ops is None else ops})
+        made.append((ctrl, srv))
+        assert ctrl.connect()
+        return ctrl
+
+    yield make
+    for ctrl, srv in made:
+        ctrl.close()
+        srv.stop()
@@ -0,0 +1,32 @@
+from app.core.io.apply import apply_groups, apply_scenes
+from app.core.io.state_io import GroupEntry, SceneEntry
+from app.core.sim.bus import SimBus
+
+
+def test_delta_apply_sends_only_differences(sim_ctrl):
+    bus = SimBus(range(4))
+    for g in bus.gears:
+        g.groups = 0b101                        # 组 0、2
+        g.scenes[1] = 100
+    ctrl = sim_ctrl(bus, timeout_sec=1.0)
+    groups = [GroupEntry(s, [0, 2]) for s in range(4)]
+    groups[3] = GroupEntry(3, [0, 5])
+    scenes = [SceneEntry(s, {"1": 100}) for s in range(4)]
+    scenes[2] = SceneEntry(2, {"1": 100, "4": 30})
+
+    dry = apply_groups(ctrl, groups, clear_others=True, delta=True, dry_run=True)
+    assert dry.naive_frames == 64 and dry.frames == 2 and dry.queries == 8
+    assert dry.est_ms > 0
+    assert bus.gear(3).groups == 0b101                     # 预演不写设备
+
+    rep = apply_groups(ctrl, groups, clear_others=True, delta=True)
+    assert rep.frames == 2 and rep.queries == 0             # 读回结果来自影子
+    srep = apply_scenes(ctrl, scenes, delta=True)
+    assert srep.naive_frames == 20 and srep.frames == 4 and srep.queries == 5
+    ctrl.query_status(0, timeout=2.0)
+    assert bus.gear(3).groups == 0b100001
+    assert bus.gear(2).scenes[4] == 30
+
+    # 再次应用：已全部一致
+    assert apply_groups(ctrl, groups, clear_others=True, delta=True).frames == 0
+    assert apply_scenes(ctrl, scenes, delta=True).frames == 0
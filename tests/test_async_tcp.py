@@ -0,0 +1,149 @@
+import asyncio
+import socket
+import struct
+
+import pytest
+
+from app.core.transport.aio import AsyncTransportAdapter, LoopThread
+from app.core.transport.async_tcp_gateway import AsyncTcpGateway
+from app.core.transport.base import ConnectionLost
+
+
+async def _start_echo_gateway(received: list):
+    """每收到一帧记录下来；仅对 data=0x90 的帧回 1 字节 (addr ^ data)。"""
+    async def handle(reader, writer):
+        buf = b""
+        while True:
+            data = await reader.read(64)
+            if not data:
+                break
+            buf += data
+            while len(buf) >= 2:
+                frame, buf = buf[:2], buf[2:]
+                received.append(frame)
+                if frame[1] == 0x90:
+                    writer.write(bytes([frame[0] ^ frame[1]]))
+                    await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_pipelined_sends_and_query_matching():
+    async def scenario():
+        received = []
+        server, port = await _start_echo_gateway(received)
+        gw = AsyncTcpGateway("127.0.0.1", port, max_inflight=4)
+        await gw.connect()
+        for v in range(10):
+            await gw.send(bytes([0xFE, v]))
+        reply = await gw.query(bytes([0x03, 0x90]), timeout=1.0)
+        silent = await gw.query(bytes([0x03, 0x91]), timeout=0.05)
+        await gw.disconnect()
+        server.close()
+        return received, reply, silent
+
+    received, reply, silent = asyncio.run(scenario())
+    assert received[:10] == [bytes([0xFE, v]) for v in range(10)]
+    assert reply == bytes([0x03 ^ 0x90])
+    assert silent is None
+
+
+def test_many_gateways_share_one_loop():
+    async def scenario():
+        servers, gws = [], []
+        for _ in range(8):
+            server, port = await _start_echo_gateway([])
+            servers.append(server)
+            gw = AsyncTcpGateway("127.0.0.1", port)
+            await gw.connect()
+            gws.append(gw)
+        replies = await asyncio.gather(*(
+            gw.query(bytes([(i << 1) | 1, 0x90]), timeout=1.0) for i, gw in enumerate(gws)
+        ))
+        for gw in gws:
+            await gw.disconnect()
+        for server in servers:
+            server.close()
+        return replies
+
+    replies = asyncio.run(scenario())
+    assert replies == [bytes([((i << 1) | 1) ^ 0x90]) for i in range(8)]
+
+
+def test_adapter_drives_async_gateway_from_sync_code():
+    loop = LoopThread("test-aio")
+    try:
+        server, port = loop.run(_start_echo_gateway([]))
+        tr = AsyncTransportAdapter(AsyncTcpGateway("127.0.0.1", port), loop)
+        tr.connect()
+        assert tr.is_connected()
+        tr.send(bytes([0x05, 0x90]))
+        assert tr.recv(timeout=1.0) == bytes([0x05 ^ 0x90])
+        tr.disconnect()
+        assert not tr.is_connected()
+        server.close()
+    finally:
+        loop.stop()
+
+
+def test_connection_reset_fails_pending_query_and_disconnects():
+    async def scenario():
+        async def handle(reader, writer):
+            await reader.read(64)
+            # SO_LINGER=0 后关闭：对端收到 RST，读任务里 read() 抛 ConnectionResetError
+            sock = writer.get_extra_info("socket")
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            writer.transport.abort()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        gw = AsyncTcpGateway("127.0.0.1", server.sockets[0].getsockname()[1])
+        await gw.connect()
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        with pytest.raises(ConnectionLost):
+            await gw.query(bytes([0x03, 0x90]), timeout=5.0)
+        elapsed = loop.time() - t0
+        connected = gw.is_connected()
+        with pytest.raises(ConnectionLost):
+            await gw.send(bytes([0xFE, 0x00]))
+        await gw.disconnect()
+        server.close()
+        return elapsed, connected
+
+    elapsed, connected = asyncio.run(scenario())
+    assert elapsed < 1.0
+    assert not connected
+
+
+def test_late_reply_is_not_attributed_to_next_query():
+    async def scenario():
+        async def handle(reader, writer):
+            buf = b""
+            while True:
+                data = await reader.read(64)
+                if not data:
+                    break
+                buf += data
+                while len(buf) >= 2:
+                    frame, buf = buf[:2], buf[2:]
+                    # 地址 0x01 的应答 150 ms 后才到，晚于该查询的 100 ms 超时
+                    if frame[0] == 0x01:
+                        await asyncio.sleep(0.15)
+                    writer.write(bytes([frame[0] ^ frame[1]]))
+                    await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        gw = AsyncTcpGateway("127.0.0.1", server.sockets[0].getsockname()[1], orphan_guard=0.1)
+        await gw.connect()
+        replies = [await gw.query(bytes([a, 0x90]), timeout=0.1) for a in (0x01, 0x03, 0x05)]
+        orphans = gw.orphan_bytes
+        await gw.disconnect()
+        server.close()
+        return replies, orphans
+
+    replies, orphans = asyncio.run(scenario())
+    assert replies == [None, bytes([0x03 ^ 0x90]), bytes([0x05 ^ 0x90])]
+    assert orphans == 1
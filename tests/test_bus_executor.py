@@ -0,0 +1,133 @@
+import threading
+import time
+
+from app.core.bus.executor import BusExecutor, Lane
+from app.core.bus.program import ProgramBuilder
+from app.core.transport.base import Transport
+from app.core.transport.correlator import QueryCorrelator
+
+
+class RecordingTransport(Transport):
+    """记录发送顺序；对 data=0x90 的查询回 (addr ^ data)。"""
+
+    def __init__(self, frame_delay=0.0):
+        self.sent = []
+        self._reply = None
+        self._delay = frame_delay
+
+    def connect(self): pass
+    def disconnect(self): pass
+    def is_connected(self): return True
+
+    def send(self, frame):
+        if self._delay:
+            time.sleep(self._delay)
+        self.sent.append(bytes(frame))
+        self._reply = bytes([frame[0] ^ frame[1]]) if frame[1] == 0x90 else None
+
+    def recv(self, timeout=0.5):
+        data, self._reply = self._reply, None
+        return data
+
+
+def make_executor(**kw):
+    tr = RecordingTransport(**kw)
+    return tr, BusExecutor(QueryCorrelator(tr), name="test")
+
+
+def test_programs_from_many_threads_are_never_interleaved():
+    tr, ex = make_executor(frame_delay=0.0005)
+
+    def worker(tag):
+        for _ in range(5):
+            pb = ProgramBuilder(f"t{tag}")
+            for i in range(4):
+                pb.send(0xA3 + tag, i)
+            ex.run(pb.build())
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ex.close()
+
+    assert len(tr.sent) == 4 * 5 * 4
+    for i in range(0, len(tr.sent), 4):
+        block = tr.sent[i:i + 4]
+        assert len({f[0] for f in block}) == 1
+        assert [f[1] for f in block] == [0, 1, 2, 3]
+
+
+def test_query_results_and_stats():
+    tr, ex = make_executor()
+    prog = ProgramBuilder("q").send(0xFE, 10).query(0x03, 0x90).query(0x05, 0x90).build()
+    fut = ex.submit(prog)
+    assert fut.result(timeout=2) == [bytes([0x03 ^ 0x90]), bytes([0x05 ^ 0x90])]
+    st = ex.stats()
+    ex.close()
+    assert st["executed"] == 1
+    assert st["frames"] == 3
+    assert st["queue_depth"] == 0
+    assert "service_mean_ms" in st and "wait_max_ms" in st
+
+
+def test_call_runs_on_executor_thread():
+    _tr, ex = make_executor()
+    names = []
+    ex.call(lambda: names.append(threading.current_thread().name))
+    ex.close()
+    assert names == ["bus-test"]
+
+
+def test_interactive_lane_overtakes_queued_bulk_programs():
+    tr, ex = make_executor(frame_delay=0.002)
+    bulk = [ex.submit(ProgramBuilder("bulk").send(0x01, i).build(), Lane.BULK) for i in range(20)]
+    sched = ex.submit(ProgramBuilder("sched").send(0x03, 0xAA).build(), Lane.SCHEDULED)
+    inter = ex.submit(ProgramBuilder("ui").send(0x05, 0xBB).build(), Lane.INTERACTIVE)
+    for f in bulk + [sched, inter]:
+        f.result(timeout=5)
+    ex.close()
+
+    order = [f[0] for f in tr.sent]
+    # 只有提交时已在执行的 bulk 程序会排在交互命令之前
+    assert order.index(0x05) <= 2
+    assert order.index(0x05) < order.index(0x03) < len(order) - 1
+    assert ex.stats()["queue_depth"] == 0
+
+
+def test_pending_updates_for_same_target_are_coalesced():
+    tr, ex = make_executor(frame_delay=0.005)
+    # 先占住执行线程，使后续更新都停留在队列里
+    busy = ex.submit(ProgramBuilder("busy").send(0x09, 0).send(0x09, 1).build())
+    futs = [ex.submit(ProgramBuilder("arc").send(0x06, v).build(), key=("short", 3, "arc"))
+            for v in range(10, 60, 10)]
+    other = ex.submit(ProgramBuilder("arc").send(0x08, 99).build(), key=("short", 4, "arc"))
+    for f in [busy, other] + futs:
+        f.result(timeout=5)
+    st = ex.stats()
+    ex.close()
+
+    arc3 = [f[1] for f in tr.sent if f[0] == 0x06]
+    assert arc3 == [50]
+    assert st["coalesced"] == 4
+    assert st["frames_saved"] == 4
+    assert all(f.done() and f.exception() is None for f in futs)
+
+
+def test_consecutive_frames_are_written_as_one_batch():
+    class BatchTransport(RecordingTransport):
+        def send_many(self, frames, expect_reply=False):
+            self.writes = getattr(self, "writes", []) + [bytes(frames)]
+            return super().send_many(frames, expect_reply)
+
+    tr = BatchTransport()
+    ex = BusExecutor(QueryCorrelator(tr), name="test")
+    prog = (ProgramBuilder("b").send(0xFE, 1).send(0xFE, 2).query(0x03, 0x90)
+            .send(0xFE, 3).send(0xFE, 4).send(0xFE, 5).build())
+    assert ex.run(prog) == [bytes([0x03 ^ 0x90])]
+    st = ex.stats()
+    ex.close()
+    assert tr.writes == [b"\xfe\x01\xfe\x02", b"\xfe\x03\xfe\x04\xfe\x05"]
+    assert [f[1] for f in tr.sent] == [1, 2, 0x90, 3, 4, 5]
+    assert st["batches"] == 2 and st["batched_frames"] == 5 and st["frames"] == 6
@@ -0,0 +1,53 @@
+import time
+
+from app.core.dali.timing import BusPacer, DaliTiming, TE_MS
+from app.core.transport.base import MockTransport
+from app.core.transport.paced import PacedTransport
+
+
+def test_frame_durations_follow_1200_baud():
+    t = DaliTiming()
+    assert abs(t.forward_ms - 15.83) < 0.01
+    assert abs(t.backward_ms - 9.17) < 0.01
+    assert t.forward_ms == 38 * TE_MS
+    assert t.estimate_ms(3, queries=1) == 2 * t.frame_slot_ms(False) + t.frame_slot_ms(True)
+    assert DaliTiming.from_cfg({"settle_forward_ms": 20, "bogus": 1}).settle_forward_ms == 20.0
+
+
+def test_pacer_spaces_frames_at_bus_rate():
+    t = DaliTiming(forward_ms=5.0, settle_forward_ms=5.0)
+    pacer = BusPacer(t, enforce=True)
+    t0 = time.monotonic()
+    for _ in range(11):
+        pacer.acquire()
+    elapsed = time.monotonic() - t0
+    # 第 1 帧立即发出，其后每帧间隔 forward + settle = 10 ms
+    assert elapsed >= 0.095
+    assert pacer.stats()["forward"] == 11
+
+
+def test_metering_only_mode_reports_utilisation_without_waiting():
+    pacer = BusPacer(DaliTiming(), enforce=False, window_s=1.0)
+    tr = PacedTransport(MockTransport(), pacer)
+    tr.connect()
+    t0 = time.monotonic()
+    for _ in range(20):
+        tr.send(b"\xfe\x80")
+    assert time.monotonic() - t0 < 0.1
+    assert pacer.stats()["paced_wait_ms"] == 0.0
+    # 20 帧 × 15.8 ms 计入占用，但最多 100 %
+    assert 0.0 < pacer.utilisation() <= 100.0
+
+
+def test_send_many_reserves_bus_per_chunk():
+    class Writes(MockTransport):
+        def send_many(self, frames, expect_reply=False):
+            self.writes = getattr(self, "writes", []) + [len(frames) // 2]
+            return super().send_many(frames, expect_reply)
+
+    pacer = BusPacer(DaliTiming(), enforce=False)
+    inner = Writes()
+    tr = PacedTransport(inner, pacer, max_batch=4)
+    assert tr.send_many(memoryview(b"\xfe\x80" * 10)) == 10
+    assert inner.writes == [4, 4, 2]
+    assert pacer.stats()["forward"] == 10
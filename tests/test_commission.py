@@ -0,0 +1,117 @@
+from app.core.bus.commission import Commissioner
+from app.core.sim.bus import SimBus
+
+
+# 扫描/搜索用短超时，仿真无延时
+_GW = {"scan_timeout_sec": 0.05, "rto_floor_sec": 0.003, "orphan_guard_sec": 0.001}
+
+
+def test_commissioning_addresses_all_unaddressed_gears(sim_ctrl):
+    bus = SimBus(shorts=[0, 5], seed=11)
+    for _ in range(20):
+        bus.add_gear(None)
+    ctrl = sim_ctrl(bus, **_GW)
+    progress = []
+    rep = Commissioner(ctrl, randomise_wait=0).run(on_progress=lambda s, r: progress.append(s))
+    shorts = sorted(g.short for g in bus.gears)
+    assert shorts == sorted(set(shorts)) and None not in shorts
+    assert sorted(rep.assigned) == progress and len(progress) == 20
+    assert 0 not in rep.assigned and 5 not in rep.assigned
+    # 分配到的随机地址确实属于对应设备
+    by_short = {g.short: g.random_addr for g in bus.gears}
+    assert all(by_short[s] == r for s, r in rep.assigned.items())
+    assert not rep.failed_verify and not rep.exhausted
+    # 每轮从上一台之后继续搜索，少于每台从 0 开始的 24+2 次 COMPARE
+    assert rep.compares < 20 * 25
+    assert rep.search_frames_saved > 0
+    assert set(rep.phases) >= {"scan", "initialise", "randomise", "search", "program", "terminate"}
+    assert rep.frames == sum(p.frames for p in rep.phases.values()) > 0
+    assert ctrl.scan_devices() == sorted(shorts)
+    assert not any(g.initialised for g in bus.gears)
+
+
+def test_commissioning_stops_when_short_pool_is_exhausted(sim_ctrl):
+    bus = SimBus(seed=3)
+    for _ in range(3):
+        bus.add_gear(None)
+    ctrl = sim_ctrl(bus, **_GW)
+    rep = Commissioner(ctrl, shorts=[10, 11], randomise_wait=0).run()
+    assert sorted(rep.assigned) == [10, 11]
+    assert rep.exhausted
+    assert sum(g.short is None for g in bus.gears) == 1
+
+
+class _DirectCtrl:
+    """不经网络，直接把帧程序喂给 SimBus。"""
+    def __init__(self, bus):
+        self.bus = bus
+
+    def run_program(self, prog, lane=None):
+        replies = []
+        for i in range(len(prog)):
+            r = self.bus.process(prog.frame(i))
+            if i in prog.queries:
+                replies.append(r)
+        return replies
+
+
+def test_full_bus_needs_fewer_compares_than_plain_bisection():
+    bus = SimBus(seed=5)
+    for _ in range(64):
+        bus.add_gear(None)
+    rep = Commissioner(_DirectCtrl(bus), mode="all", randomise_wait=0).run()
+    assert sorted(rep.assigned) == list(range(64))
+    assert sorted(g.short for g in bus.gears) == list(range(64))
+    # 普通二分每台 24 次 + 1 次“还有没有”检查
+    assert rep.compares / 64 < 23
+
+
+class _LossyCtrl(_DirectCtrl):
+    """丢掉指定序号的 COMPARE 应答，模拟 YES 迟到被判为 NO。"""
+    def __init__(self, bus, drop):
+        super().__init__(bus)
+        self.drop = set(drop)
+        self.n = 0
+
+    def run_program(self, prog, lane=None):
+        replies = super().run_program(prog, lane)
+        if prog.label == "compare":
+            self.n += 1
+            if self.n in self.drop:
+                return [None]
+        return replies
+
+
+def test_missed_compare_reply_triggers_research():
+    bus = SimBus(seed=8)
+    for _ in range(10):
+        bus.add_gear(None)
+    rep = Commissioner(_LossyCtrl(bus, drop=[40, 90]), mode="all", randomise_wait=0).run()
+    assert sorted(g.short for g in bus.gears) == list(range(10))
+    assert rep.researches >= 1 and not rep.failed_verify
+
+
+def test_apply_levels_does_not_broadcast_after_commissioning(sim_ctrl):
+    bus = SimBus(shorts=[0, 1], seed=5)
+    ctrl = sim_ctrl(bus, **_GW)
+    assert ctrl.scan_devices() == [0, 1]
+    assert ctrl.known_population() == {0, 1}
+    new = bus.add_gear(None)
+    rep = Commissioner(ctrl, randomise_wait=0).run()
+    assert list(rep.assigned) == [new.short] and ctrl.known_population() is None
+    # 新编址的设备不在映射里：只能逐台发短地址帧，不能因“在线设备都是目标”而广播
+    plan = ctrl.apply_levels({0: 80, 1: 80})
+    assert [f.mode for f in plan.frames] == ["short", "short"]
+    ctrl.query_status(0, timeout=2.0)
+    assert new.level != 80
+
+
+def test_raw_frames_invalidate_known_population(sim_ctrl):
+    bus = SimBus(shorts=[0, 1])
+    ctrl = sim_ctrl(bus, **_GW)
+    assert ctrl.scan_devices() == [0, 1]
+    ctrl.send_raw(0xB7, (2 << 1) | 1)          # PROGRAM SHORT ADDRESS
+    assert ctrl.known_population() is None
+    assert ctrl.scan_devices() == [0, 1]
+    ctrl.send_command("short", 128, addr_val=1)  # DTR0 AS SHORT ADDRESS
+    assert ctrl.known_population() is None
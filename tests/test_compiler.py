@@ -0,0 +1,46 @@
+from app.core.bus.compiler import CommandCompiler
+from app.core.config import default_ops
+from app.core.sim.bus import SimBus
+
+
+def test_compile_is_memoised_and_frames_match():
+    c = CommandCompiler(default_ops())
+    a = c.compile("dt8_tc_kelvin", "short", 3, False, 4000)
+    b = c.compile("dt8_tc_kelvin", "short", 3, False, 4000)
+    assert a is b
+    assert c.stats()["hits"] == 1 and c.stats()["misses"] == 1
+    assert a.program.pairs() == [(163, 250), (195, 0), (193, 8), (7, 231)]
+    assert a.key == ("short", 3, "dt8_tc") and a.result_dict() == {"kelvin": 4000, "mirek": 250}
+
+    arc = c.compile("arc", "group", 2, False, 300)
+    assert arc.program.pairs() == [(0x84, 254)] and arc.notes == (("level", 254),)
+    rm = c.compile("scene_remove", "broadcast", None, False, 5)
+    assert rm.program.pairs() == [(0xFF, 149)] and rm.key is None
+
+
+def test_compiler_fills_missing_ops():
+    c = CommandCompiler({})
+    cmd = c.compile("dt8_xy", "broadcast", None, False, 0.5, 0.25)
+    assert [f[1] for f in cmd.program.pairs() if f[0] == 0xFF] == [224, 225]
+
+
+def test_dt8_xy_notes_match_clamped_frames():
+    cmd = CommandCompiler(default_ops()).compile("dt8_xy", "short", 1, False, 1.2, -0.1)
+    pairs = cmd.program.pairs()
+    assert pairs[0] == (163, 0xFF) and pairs[1] == (195, 0xFF)          # x 夹到 65535
+    assert pairs[4] == (163, 0) and pairs[5] == (195, 0)                # y 夹到 0
+    assert cmd.notes == (("colour:x", 65535), ("colour:y", 0))
+    assert cmd.result_dict()["x_u16"] == 65535 and cmd.result_dict()["y_u16"] == 0
+
+
+def test_controller_compile_execute_on_sim(sim_ctrl):
+    bus = SimBus([0, 1])
+    ctrl = sim_ctrl(bus, timeout_sec=1.0)
+    for _ in range(5):
+        ctrl.execute(ctrl.compile("arc", "short", 1, False, 77))
+    ctrl.scene_store_level("short", 2, 120, addr_val=0)
+    ctrl.scene_recall("short", 2, addr_val=0)
+    assert ctrl.compiler_stats()["hits"] == 4
+    ctrl.query_status(0, timeout=2.0)
+    assert bus.gear(1).level == 77 and bus.gear(0).level == 120
+    assert ctrl.registry.peek(0, "level").value == 120
@@ -0,0 +1,76 @@
+import time
+
+from app.core.transport.base import Transport
+from app.core.transport.correlator import QueryCorrelator
+
+
+class ScriptedTransport(Transport):
+    """按脚本吐出接收数据的假传输：rx 为 [(ready_at_offset_s, bytes)]。"""
+
+    def __init__(self, rx=None, stale=b""):
+        self.sent = []
+        self._rx = list(rx or [])
+        self._stale = stale
+        self._t0 = time.monotonic()
+
+    def connect(self): pass
+    def disconnect(self): pass
+    def is_connected(self): return True
+
+    def send(self, frame):
+        self.sent.append(bytes(frame))
+
+    def drain(self):
+        data, self._stale = self._stale, b""
+        return data
+
+    def recv(self, timeout=0.5):
+        if not self._rx:
+            time.sleep(timeout)
+            return None
+        at, data = self._rx[0]
+        wait = self._t0 + at - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return None
+        time.sleep(max(0.0, wait))
+        self._rx.pop(0)
+        return data
+
+
+def test_stale_bytes_are_drained_before_query():
+    tr = ScriptedTransport(rx=[(0.0, b"\x42")], stale=b"\x99\x98")
+    link = QueryCorrelator(tr)
+    assert link.query(b"\x03\x90", timeout=0.2) == b"\x42"
+    assert link.stats()["orphan_bytes"] == 2
+
+
+def test_coalesced_read_is_split_across_outstanding_queries():
+    tr = ScriptedTransport(rx=[(0.0, b"\x10\x20\x30")])
+    link = QueryCorrelator(tr, window=3)
+    replies = link.query_many([b"\x01\x90", b"\x03\x90", b"\x05\x90"], timeout=0.2)
+    assert replies == [b"\x10", b"\x20", b"\x30"]
+    assert link.stats()["coalesced_reads"] == 1
+
+
+def test_late_answer_is_not_attributed_to_next_query():
+    # 第一条查询 50ms 超时；其应答 80ms 才到，落在保护窗内应被丢弃
+    tr = ScriptedTransport(rx=[(0.08, b"\x77"), (0.25, b"\x55")])
+    link = QueryCorrelator(tr, orphan_guard=0.1)
+    assert link.query(b"\x01\x90", timeout=0.05) is None
+    assert link.query(b"\x03\x90", timeout=0.5) == b"\x55"
+    st = link.stats()
+    assert st["timeouts"] == 1
+    assert st["orphan_bytes"] == 1
+
+
+def test_drain_orphans_returns_on_busy_bus():
+    class Chatty(ScriptedTransport):
+        def drain(self):
+            self.drains = getattr(self, "drains", 0) + 1
+            return b"\x99"
+
+    tr = Chatty()
+    link = QueryCorrelator(tr)
+    assert link.drain_orphans() == QueryCorrelator.DRAIN_PASSES
+    assert tr.drains == QueryCorrelator.DRAIN_PASSES
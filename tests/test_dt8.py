@@ -26,3 +26,40 @@ def test_dt8_tc_clamp():
     res_high = ctrl.dt8_set_tc_kelvin("short", 9000, addr_val=1)
     assert res_high["kelvin"] == 8000
 
+
+
+def test_dt8_batch_shares_dtr_writes(sim_ctrl):
+    from app.core.sim.bus import SimBus
+
+    bus = SimBus(range(20))
+    ctrl = sim_ctrl(bus, timeout_sec=1.0, dtr_cache_sec=0)
+    targets = {s: (3000 if s < 15 else 5000) for s in range(20)}
+    plan = ctrl.dt8_set_tc_batch(targets)
+    assert plan.naive == 80 and len(plan.frames) == 4 + 2 * 20
+    xy = ctrl.dt8_set_xy_batch({1: (0.3, 0.3), 2: (0.3, 0.3), ("group", 4): (0.5, 0.3)})
+    assert xy.saved > 0
+    prim = ctrl.dt8_set_primary_batch("r", {s: 100 for s in range(10)})
+    assert len(prim.frames) == 1 + 2 * 10
+    ctrl.query_status(0, timeout=2.0)
+    assert {g.short: g.tc_mirek for g in bus.gears} == {
+        s: int(round(1_000_000 / k)) for s, k in targets.items()}
+    assert bus.gear(2).x == bus.gear(2).y == round(0.3 * 65535)
+    assert bus.gear(9).primaries["r"] == 100 and bus.gear(10).primaries["r"] == 0
+
+
+def test_dt8_rgbw_activate_path(sim_ctrl):
+    from app.core.config import default_ops
+    from app.core.sim.bus import SimBus
+
+    ops = default_ops()
+    ops["dt8_rgbw_mode"] = "activate"
+    bus = SimBus([1, 2], ops=ops)
+    ctrl = sim_ctrl(bus, ops=ops, timeout_sec=1.0, dtr_cache_sec=0)
+    ctrl.dt8_set_rgbw("short", 10, 20, 30, 40, addr_val=1)
+    f0 = ctrl.bus_stats()["frames"]
+    ctrl.dt8_set_rgbw("short", 11, 21, 31, 40, addr_val=1)    # W 未变：省去 WAF
+    assert ctrl.bus_stats()["frames"] - f0 == 7
+    ctrl.dt8_set_rgbw("broadcast", 5, 6, 7, 8, path="activate")
+    ctrl.query_status(1, timeout=2.0)
+    assert bus.gear(1).primaries == bus.gear(2).primaries == {"r": 5, "g": 6, "b": 7, "w": 8}
+    assert bus.gear(1).temp == {}
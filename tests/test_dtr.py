@@ -0,0 +1,69 @@
+from app.core.bus.dtr import DtrShadow
+from app.core.bus.executor import BusExecutor
+from app.core.bus.program import ProgramBuilder
+from app.core.config import default_ops
+from app.core.controller import Controller
+
+
+class _Link:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, frame):
+        self.sent.append(bytes(frame))
+
+    def send_many(self, frames, expect_reply=False):
+        frames = bytes(frames)
+        self.sent.extend(frames[i:i + 2] for i in range(0, len(frames), 2))
+        return len(frames) // 2
+
+    def query(self, frame, timeout=None):
+        self.sent.append(bytes(frame))
+        return None
+
+
+def test_shadow_elides_only_provably_redundant_writes():
+    now = [0.0]
+    ops = default_ops()
+    dtr = DtrShadow(ops, ttl=5.0, clock=lambda: now[0])
+    assert dtr.admit(bytes([0xA3, 10]))
+    assert not dtr.admit(bytes([0xA3, 10]))                     # 冗余
+    assert dtr.admit(bytes([0xC1, 8])) and dtr.admit(bytes([0x03, ops["dt8_set_tc_opcode"]]))
+    assert not dtr.admit(bytes([0xA3, 10]))                     # DT8 设置不改 DTR
+    assert dtr.admit(bytes([0x03, ops["write_dtr"]]))           # 寻址 write_dtr 改写 DTR0
+    assert dtr.admit(bytes([0xA3, 10]))
+    now[0] = 6.0
+    assert dtr.admit(bytes([0xA3, 10]))                         # 过期
+    assert not dtr.admit(bytes([0xA3, 10]))
+    assert dtr.admit(bytes([0xA5, 0]))                          # 其它特殊命令作废影子
+    assert dtr.admit(bytes([0xA3, 10]))
+
+
+def test_executor_skips_redundant_dtr_but_not_raw_programs():
+    link = _Link()
+    ex = BusExecutor(link, dtr=DtrShadow(default_ops()))
+    try:
+        tc = ProgramBuilder("tc").send(0xA3, 1).send(0xC3, 2).send(0xC1, 8).send(0x03, 231).build()
+        ex.run(tc)
+        ex.run(tc)
+        assert len(link.sent) == 4 + 2
+        raw = ProgramBuilder("raw", raw=True).send(0xA3, 1).build()
+        ex.run(raw)
+        ex.run(tc)
+        assert len(link.sent) == 6 + 1 + 4                      # 原始帧照发，并作废影子
+        assert ex.stats()["dtr_elided"] == 2
+    finally:
+        ex.close()
+
+
+def test_tc_sweep_frames_drop_with_shadow():
+    ctrl = Controller({"gateway": {"type": "mock", "dtr_cache_sec": 10}, "ops": default_ops()})
+    assert ctrl.connect()
+    try:
+        for k in range(2700, 2800, 10):                         # mirek 高字节不变
+            ctrl.dt8_set_tc_kelvin("short", k, addr_val=1)
+        st = ctrl.bus_stats()
+        assert st["dtr_elided"] == 9
+        assert st["frames"] == 10 * 4 - 9
+    finally:
+        ctrl.close()
@@ -0,0 +1,84 @@
+import asyncio
+import random
+
+import numpy as np
+import pytest
+
+from app.core.config import default_ops
+from app.core.sim.bus import SimBus
+from app.core.sim.fleet import FleetBus, FleetServer
+from app.core.transport.aio import LoopThread
+from app.core.transport.async_tcp_gateway import AsyncTcpGateway
+
+
+def _random_frame(rng: random.Random) -> bytes:
+    short = rng.randrange(8)
+    kind = rng.randrange(10)
+    if kind == 0:
+        return bytes([short << 1, rng.randrange(256)])                       # ARC
+    if kind == 1:
+        return bytes([0x80 | (rng.randrange(4) << 1), rng.randrange(255)])   # 组 ARC
+    if kind == 2:
+        return bytes([rng.choice([0xA3, 0xC3, 0xC5]), rng.randrange(256)])   # DTR
+    if kind == 3:
+        return bytes([0xC1, 8])                                              # 使能 DT8
+    if kind == 4:
+        return bytes([0xFF, rng.choice([0, 163])])
+    cmd = rng.choice([64, 80, 96, 112, 144, 176]) + rng.randrange(16)
+    cmd = rng.choice([cmd, 192, 193, 160, 163, 224, 225, 226, 229, 231, 235, 236])
+    addr = rng.choice([(short << 1) | 1, 0x81 | (rng.randrange(4) << 1), 0xFF])
+    return bytes([addr, cmd])
+
+
+@pytest.mark.parametrize("rgbw_mode", ["primary", "activate"])
+def test_fleet_matches_scalar_simulator(rgbw_mode):
+    rng = random.Random(7)
+    ops = default_ops()
+    ops["dt8_rgbw_mode"] = rgbw_mode
+    present = [[0, 1, 2, 5], [1, 3], [0, 1, 2, 3, 4, 5, 6, 7]]
+    fleet = FleetBus(3, present=np.array([[i in p for i in range(64)] for p in present]), ops=ops)
+    scalars = [SimBus(p, ops=ops) for p in present]
+    for _ in range(600):
+        frames = [_random_frame(rng) for _ in scalars]
+        raw = np.frombuffer(b"".join(frames), dtype=np.uint8).reshape(-1, 2)
+        replies = fleet.process_round(np.arange(3), raw[:, 0], raw[:, 1])
+        for bi, (bus, frame) in enumerate(zip(scalars, frames)):
+            exp = bus.process(frame)
+            assert replies[bi] == (exp[0] if exp else -1), (bi, frame.hex())
+    for bi, bus in enumerate(scalars):
+        for g in bus.gears:
+            s = g.short
+            assert fleet.level[bi, s] == g.level
+            assert fleet.groups[bi, s] == g.groups
+            assert list(fleet.scenes[bi, s]) == g.scenes
+            assert fleet.tc_mirek[bi, s] == g.tc_mirek
+            assert list(fleet.xy[bi, s]) == [g.x, g.y]
+            assert list(fleet.primaries[bi, s]) == [g.primaries[c] for c in "rgbw"]
+
+
+def test_fleet_server_serves_many_ports_from_one_loop():
+    fleet = FleetBus(20, present=[0, 1, 2])
+    srv = FleetServer(fleet)
+    ports = srv.start()
+    host = LoopThread("fleet-host")
+    gws = [AsyncTcpGateway("127.0.0.1", p) for p in ports]
+
+    async def drive(i, gw):
+        await gw.connect()
+        await gw.send(bytes([0x02, 10 + i]))                          # 短址 1 ARC
+        level = await gw.query(bytes([0x03, 0xA0]), timeout=2.0)
+        absent = await gw.query(bytes([0x07, 0x90]), timeout=0.05)    # 短址 3 不在线
+        await gw.disconnect()
+        return level, absent
+
+    async def scenario():
+        return await asyncio.gather(*(drive(i, gw) for i, gw in enumerate(gws)))
+
+    try:
+        results = host.run(scenario(), timeout=10.0)
+    finally:
+        host.stop()
+        srv.stop()
+    assert results == [(bytes([10 + i]), None) for i in range(20)]
+    # 并发的多条总线在同一轮里被一起处理
+    assert max(srv.batch_sizes) > 1
@@ -0,0 +1,38 @@
+from app.core.bus.scan import ScanEngine
+from app.core.sim.bus import SimBus
+from app.core.sim.server import SimGatewayServer
+from app.core.transport.framing import LengthPrefixedCodec, make_codec
+
+
+def test_lpb_round_trip_and_resync():
+    host, gw = LengthPrefixedCodec(max_frames=4), LengthPrefixedCodec()
+    packets = host.encode(bytes(range(20)), expect_reply=True)
+    assert len(packets) == 3
+    # 前面混入垃圾字节也能重新同步
+    buf = bytearray(b"\x00\xa5\x01" + b"".join(packets))
+    reqs = gw.parse_requests(buf)
+    assert [len(f) // 2 for _, f in reqs] == [4, 4, 2] and all(q for q, _ in reqs)
+    assert b"".join(f for _, f in reqs) == bytes(range(20)) and not buf
+
+    reply = gw.encode_replies([b"\x10", None, b"\x20"])
+    assert host.feed(reply[:4]) == []
+    assert host.feed(reply[4:]) == [b"\x10", None, b"\x20"]
+    bad = bytearray(reply)
+    bad[-1] ^= 0xFF
+    assert host.feed(bytes(bad)) == []
+    host.reset()
+    assert make_codec("raw").encode(b"\x01\x02") == [b"\x01\x02"]
+
+
+def test_lpb_scan_and_commands_on_sim(sim_ctrl):
+    bus = SimBus([0, 5, 9, 40])
+    srv = SimGatewayServer(bus, time_scale=0, codec=make_codec("lpb"))
+    ctrl = sim_ctrl(bus, server=srv, timeout_sec=1.0, scan_timeout_sec=0.5, framing="lpb")
+    assert ScanEngine({"a": ctrl}, chunk=16).scan(range(64)) == {"a": [0, 5, 9, 40]}
+    # 64 条查询只用了少数几个请求包
+    assert srv.counters["frames_in"] >= 64 and srv.counters["packets_in"] <= 8
+    ctrl.send_arc("short", 99, addr_val=5)
+    ctrl.dt8_set_tc_kelvin("short", 4000, addr_val=9)
+    assert ctrl.query_status(5, timeout=1.0) is not None
+    assert ctrl.query_status(6, timeout=1.0) is None
+    assert bus.gear(5).level == 99 and bus.gear(9).tc_mirek == 250
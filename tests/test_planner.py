@@ -0,0 +1,83 @@
+import random
+
+from app.core.bus.planner import plan_levels
+from app.core.sim.bus import SimBus
+
+
+def _simulate(plan, memberships, start):
+    levels = dict(start)
+    for f in plan.frames:
+        for s, m in memberships.items():
+            if f.mode == "broadcast" or (f.mode == "group" and (m >> f.addr) & 1) or \
+                    (f.mode == "short" and f.addr == s):
+                levels[s] = f.level
+    return levels
+
+
+def test_plan_reaches_targets_and_never_touches_other_devices():
+    rng = random.Random(3)
+    for _ in range(200):
+        n = rng.randint(1, 64)
+        memberships = {s: rng.getrandbits(16) & rng.getrandbits(16) for s in range(n)}
+        targets = {s: rng.choice([0, 100, 254]) for s in rng.sample(range(n), rng.randint(1, n))}
+        start = {s: 7 for s in memberships}
+        plan = plan_levels(targets, memberships, population=memberships)
+        out = _simulate(plan, memberships, start)
+        assert all(out[s] == v for s, v in targets.items())
+        assert all(out[s] == 7 for s in memberships if s not in targets)
+        assert len(plan.frames) <= len(targets)
+
+
+def test_plan_compresses_zoned_update():
+    # 64 台分 4 个区（组 0..3），每区一个亮度，另有 3 台例外
+    memberships = {s: 1 << (s // 16) for s in range(64)}
+    targets = {s: (s // 16) * 50 for s in range(64)}
+    targets.update({5: 254, 20: 1, 63: 2})
+    plan = plan_levels(targets, memberships, population=memberships)
+    assert len(plan.frames) <= 7 and plan.saved >= 57
+    assert _simulate(plan, memberships, {}) == targets
+
+
+def test_unknown_population_uses_short_frames_only():
+    memberships = {s: 1 for s in range(4)}
+    targets = {s: 50 for s in range(4)}
+    assert {f.mode for f in plan_levels(targets, memberships).frames} == {"short"}
+    # 有在线设备的组位图未知：不能用组帧，广播仍可用
+    plan = plan_levels(targets, {0: 1, 1: 1}, population=range(4))
+    assert [f.mode for f in plan.frames] == ["broadcast"]
+    plan = plan_levels({0: 50, 1: 50}, {0: 1, 1: 1}, population=range(4))
+    assert {f.mode for f in plan.frames} == {"short"}
+
+
+def test_controller_apply_levels_on_sim(sim_ctrl):
+    bus = SimBus(range(12))
+    for g in bus.gears:
+        g.groups = 1 << (g.short % 3)
+    ctrl = sim_ctrl(bus)
+    targets = {s: 30 + 10 * (s % 3) for s in range(12)}
+    targets[4] = 200
+    plan = ctrl.apply_levels(targets, present=range(12))
+    assert len(plan.frames) == 4
+    ctrl.query_status(0, timeout=2.0)                 # 等仿真端处理完前面的帧
+    assert {g.short: g.level for g in bus.gears} == targets
+    # 影子已知全部亮度：再次下发相同目标不产生帧
+    assert ctrl.apply_levels(targets).frames == []
+
+
+def test_apply_levels_leaves_unmentioned_gears_alone(sim_ctrl):
+    bus = SimBus(range(12))
+    for g in bus.gears:
+        g.level = 7
+    ctrl = sim_ctrl(bus)
+    hits = ctrl.registry_stats()["hits"]
+    plan = ctrl.apply_levels({0: 50, 1: 50})
+    assert [f.mode for f in plan.frames] == ["short", "short"]
+    ctrl.query_status(0, timeout=2.0)
+    assert {g.short: g.level for g in bus.gears} == {s: 50 if s < 2 else 7 for s in range(12)}
+    assert ctrl.registry_stats()["hits"] == hits
+    # 全地址扫描之后在线设备已知，全部目标相同时可用一帧广播
+    assert ctrl.scan_devices(range(64)) == list(range(12))
+    plan = ctrl.apply_levels({s: 90 for s in range(12)})
+    assert [f.mode for f in plan.frames] == ["broadcast"]
+    ctrl.query_status(0, timeout=2.0)
+    assert all(g.level == 90 for g in bus.gears)
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from app.core.config import default_ops
+from app.core.pool import GatewayPool, Target
+
+
+def _pool(n, time_scale=0.0):
+    # pacing：每条总线按 DALI 帧时序配速，命令耗时与真实总线相当
+    cfg = {"gateway": {"type": "sim", "sim_gears": "0-3", "sim_time_scale": time_scale, "timeout_sec": 0.5,
+                       "pacing": time_scale > 0},
+           "gateways": [{"bus": f"B{i}", "sim_gears": f"{i}-{i + 3}"} for i in range(n)],
+           "ops": default_ops()}
+    pool = GatewayPool(cfg)
+    assert all(pool.connect().values())
+    return pool
+
+
+def test_target_parse():
+    assert Target.parse("A:short:5") == Target("A", "short", 5)
+    assert Target.parse("A:broadcast") == Target("A")
+    with pytest.raises(ValueError):
+        Target.parse("A:scene:1")
+
+
+def test_routes_targets_to_their_bus():
+    pool = _pool(3)
+    try:
+        assert pool.buses == ["B0", "B1", "B2"]
+        res = pool.execute("arc", [Target("B1", "short", 2), Target("B2", "short", 4)], 42)
+        assert all(e is None for e in res.values())
+        assert pool.controller("B1").query_level(2, max_age=0) == 42
+        assert pool.controller("B2").query_level(4, max_age=0) == 42
+        assert pool.controller("B0").query_level(2, max_age=0) != 42
+        err = pool.execute("arc", Target("nope", "short", 1), 10)[Target("nope", "short", 1)]
+        assert isinstance(err, ValueError)
+    finally:
+        pool.close()
+
+
+def test_site_broadcast_fans_out_in_parallel():
+    one = _pool(1, time_scale=1.0)
+    try:
+        t0 = time.perf_counter()
+        for k in (3000, 4000, 5000):
+            one.broadcast("dt8_tc_kelvin", k)
+        single = time.perf_counter() - t0
+    finally:
+        one.close()
+    pool = _pool(6, time_scale=1.0)
+    try:
+        t0 = time.perf_counter()
+        for k in (3000, 4000, 5000):
+            res = pool.broadcast("dt8_tc_kelvin", k)
+        elapsed = time.perf_counter() - t0
+        assert set(res) == set(pool.buses) and all(e is None for e in res.values())
+        # 6 条总线并行，耗时远小于逐条执行
+        assert elapsed < 3 * single
+        assert all(st["frames"] >= 3 for st in pool.bus_stats().values())
+    finally:
+        pool.close()
+
+
+def test_fan_out_reports_per_bus_latency_and_skew():
+    pool = _pool(4)
+    try:
+        res = pool.scene_recall(3)
+        assert res.ok and set(res.buses) == set(pool.buses)
+        assert all(r.latency_ms >= 0 for r in res.buses.values())
+        assert 0 <= res.skew_ms <= max(r.latency_ms for r in res.buses.values())
+        assert res.frame_ms > 15
+
+        res = pool.dt8_set_tc_kelvin(3000, buses=["B0", "B2", "missing"])
+        assert res.failed == ["missing"] and set(res.buses) == {"B0", "B2", "missing"}
+        assert pool.controller("B2").bus_stats()["frames"] > pool.controller("B1").bus_stats()["frames"]
+        st = pool.fan_out_stats()
+        assert st["fan_outs"] == 2 and st["bus_failures"] == 1
+        assert res.summary()["failed"] == 1
+    finally:
+        pool.close()
+
+
+def test_fan_out_timeout_cancels_queued_command():
+    pool = _pool(2)
+    gate = threading.Event()
+    try:
+        b1 = pool.controller("B1")
+        b1.send_arc("short", 10, addr_val=1)
+        frames = b1.bus_stats()["frames"]
+        # B1 的执行线程被占住：场景调用只能排队，超时后应被取消而不是稍后上总线
+        b1._exec.submit_call(gate.wait)
+        res = pool.fan_out("scene_recall", 2, timeout=0.2)
+        assert res.failed == ["B1"] and res.buses["B0"].ok
+        assert not res.buses["B1"].in_flight
+        gate.set()
+        b1.query_status(1)
+        assert b1.bus_stats()["frames"] == frames + 1
+        assert b1.registry.get(1, "level") is None
+    finally:
+        gate.set()
+        pool.close()
@@ -0,0 +1,101 @@
+import random
+import threading
+import time
+
+import pytest
+
+from app.core.bus.executor import BusExecutor
+from app.core.bus.program import ProgramBuilder
+from app.core.bus.reconnect import Backoff, LinkSupervisor
+from app.core.sim.bus import SimBus
+from app.core.sim.server import SimGatewayServer
+from app.core.transport.base import ConnectionLost
+
+
+def test_backoff_grows_with_jitter_and_cap():
+    b = Backoff(initial=0.1, maximum=1.0, factor=2.0, jitter=0.2, rng=random.Random(1))
+    delays = [b.delay(n) for n in range(8)]
+    assert 0.08 <= delays[0] <= 0.12 and 0.16 <= delays[1] <= 0.24
+    assert all(0.8 <= d <= 1.2 for d in delays[4:])
+
+
+class _FlakyLink:
+    def __init__(self):
+        self.up = True
+        self.sent = []
+
+    def send_many(self, frames, expect_reply=False):
+        if not self.up:
+            raise ConnectionLost("down")
+        self.sent.append(bytes(frames))
+        return len(frames) // 2
+
+
+def test_idempotent_programs_replay_after_reconnect():
+    link = _FlakyLink()
+    sup = LinkSupervisor(lambda: setattr(link, "up", True), Backoff(initial=0.02, jitter=0), queue_max=4)
+    ex = BusExecutor(link, name="test", supervisor=sup)
+    sup.on_up = ex.resume
+    sup.mark_up()
+    try:
+        link.up = False
+        with pytest.raises(ConnectionLost):
+            ex.run(ProgramBuilder("raw", raw=True).send(0xFE, 1).build(), timeout=2)
+        assert sup.stats()["disconnects"] == 1
+        deadline = time.monotonic() + 2
+        while sup.state != sup.UP and time.monotonic() < deadline:
+            time.sleep(0.01)
+        link.up = False
+        prog = ProgramBuilder("arc", idempotent=True).send(0xFE, 2).build()
+        assert ex.run(prog, timeout=2) == []
+        st = ex.stats()
+        assert link.sent[-1] == b"\xfe\x02"
+        assert st["replayed"] == 1 and st["held_now"] == 0
+        assert sup.stats()["reconnects"] == 2 and sup.state == sup.UP
+    finally:
+        ex.close()
+
+
+def test_held_programs_run_before_programs_submitted_during_recovery():
+    link = _FlakyLink()
+    sup = LinkSupervisor(lambda: setattr(link, "up", True), Backoff(initial=0.02, jitter=0), queue_max=8)
+    ex = BusExecutor(link, name="test", supervisor=sup)
+    late = []
+
+    def prepare():
+        # 复位在执行线程内进行，此时链路仍是 down；这期间提交的程序排在挂起的程序之后
+        assert sup.is_down()
+        late.append(ex.submit(ProgramBuilder("late", idempotent=True).send(0xFE, 9).build()))
+
+    sup.on_up = lambda: ex.resume(prepare)
+    sup.mark_up()
+    try:
+        link.up = False
+        first = ex.submit(ProgramBuilder("a", idempotent=True).send(0xFE, 1).build())
+        second = ex.submit(ProgramBuilder("b", idempotent=True).send(0xFE, 2).build())
+        first.result(2), second.result(2), late[0].result(2)
+        assert link.sent == [b"\xfe\x01", b"\xfe\x02", b"\xfe\x09"]
+        assert sup.state == sup.UP and sup.stats()["reconnects"] == 1
+    finally:
+        ex.close()
+
+
+def test_controller_rides_out_gateway_restart(sim_ctrl):
+    bus = SimBus([1])
+    srv = SimGatewayServer(bus, time_scale=0)
+    ctrl = sim_ctrl(bus, server=srv, timeout_sec=1.0, reconnect_initial_sec=0.05, reconnect_max_sec=0.2)
+    srv2 = SimGatewayServer(bus, port=srv.port, time_scale=0)
+    try:
+        assert ctrl.query_status(1, timeout=1.0) is not None
+        srv.stop()
+        threading.Timer(0.3, srv2.start).start()
+        # 查询遇到断线后挂起，网关恢复后重放并拿到应答
+        assert ctrl.query_status(1, timeout=1.0) is not None
+        ctrl.send_arc("short", 42, addr_val=1)
+        ctrl.query_status(1, timeout=1.0)
+        assert bus.gear(1).level == 42
+        st = ctrl.reconnect_stats()
+        assert st["disconnects"] == 1 and st["reconnects"] == 1 and st["down"] == 0
+        assert st["replayed"] == 1 and st["downtime_s"] > 0
+    finally:
+        srv2.stop()
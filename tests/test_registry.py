@@ -0,0 +1,44 @@
+from app.core.registry import DeviceRegistry, SRC_COMMAND, SRC_QUERY
+from app.core.sim.bus import SimBus
+
+
+def test_registry_ttl_and_group_inference():
+    now = [0.0]
+    reg = DeviceRegistry(ttl=10.0, clock=lambda: now[0])
+    reg.record(1, "groups", 0b01)
+    reg.record(2, "groups", 0b10)
+    reg.record_target("group", 0, "level", 100)
+    assert reg.get(1, "level").value == 100 and reg.get(1, "level").source == SRC_COMMAND
+    assert reg.get(2, "level") is None
+    now[0] = 11.0
+    assert reg.get(1, "groups") is None                  # 过期
+    assert reg.peek(1, "groups").source == SRC_QUERY
+    # 成员关系过期后，组命令不再推断，只作废
+    reg.record(1, "level", 5)
+    reg.record_target("group", 0, "level", 7)
+    assert reg.peek(1, "level") is None
+
+
+def test_controller_reads_served_from_shadow(sim_ctrl):
+    bus = SimBus([0, 1, 2])
+    ctrl = sim_ctrl(bus)
+    ctrl.group_add("short", 3, addr_val=1)
+    ctrl.scene_store_level("short", 2, 77, addr_val=1)
+    assert ctrl.query_groups(1, timeout=1.0)[3] == 1
+    frames = bus.counters["frames"]
+    for _ in range(5):
+        assert ctrl.query_groups(1)[3] == 1
+        assert ctrl.query_scene_levels(1)[2] == 77
+    # 组已读回，场景 2 由命令推断，其余 15 个场景首轮读回后也进入影子
+    assert bus.counters["frames"] - frames == 15
+    ctrl.group_remove("group", 3, addr_val=3)
+    assert ctrl.query_groups(1)[3] == 0
+    ctrl.send_arc("group", 3, addr_val=3)              # 设备 1 已不在组 3：影子不受影响
+    assert ctrl.query_level(1) == 77
+    ctrl.send_arc("short", 10, addr_val=1)
+    ctrl.scene_recall("broadcast", 2)
+    assert ctrl.registry.get(1, "level").value == 77
+    assert ctrl.query_level(1, max_age=0, timeout=1.0) == bus.gear(1).level == 77
+    ctrl.send_raw(0x03, 0x00)                          # 原始帧：作废该设备影子
+    assert ctrl.registry.peek(1, "groups") is None
+    assert ctrl.registry_stats()["hits"] > 0
@@ -0,0 +1,31 @@
+import time
+
+from app.core.bus.scan import ScanEngine
+from app.core.transport.correlator import RttEstimator
+
+
+def test_rtt_estimator_adapts_within_bounds():
+    est = RttEstimator(floor=0.01, ceiling=0.3)
+    assert est.timeout() == 0.3            # 样本不足时保守
+    for _ in range(10):
+        est.add(0.004)
+    assert est.timeout() == 0.01           # 夹到下限
+    est.add(0.1)
+    assert 0.1 < est.timeout() <= 0.3      # 慢样本立即抬高超时
+
+
+def test_concurrent_adaptive_scan_streams_hits(sim_ctrl):
+    gw = dict(time_scale=0.1, scan_timeout_sec=0.3, rto_floor_sec=0.01)
+    a = sim_ctrl([0, 1, 2, 40], **gw)
+    b = sim_ctrl([3, 7, 63], **gw)
+    t0 = time.perf_counter()
+    hits = list(ScanEngine({"a": a, "b": b}).iter_scan(range(64)))
+    elapsed = time.perf_counter() - t0
+    assert sorted((h.gateway, h.short) for h in hits) == [
+        ("a", 0), ("a", 1), ("a", 2), ("a", 40), ("b", 3), ("b", 7), ("b", 63)]
+    # 每个网关内按地址顺序流式交出
+    assert [h.short for h in hits if h.gateway == "a"] == [0, 1, 2, 40]
+    # 固定 0.3 s 超时需要 2 × 60 × 0.3 s；自适应 + 并发应远小于此
+    assert elapsed < 4.0
+    assert a.link_stats()["rto_ms"] < 100
+    assert a.scan_devices(range(8)) == [0, 1, 2]
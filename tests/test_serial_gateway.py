@@ -0,0 +1,75 @@
+import sys
+import time
+
+import pytest
+
+from app.core.transport.serial_port import ByteRing
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="pty 仅 POSIX")
+
+
+def test_byte_ring_wraps_and_counts_overflow():
+    ring = ByteRing(16)
+    assert ring.write(b"a" * 10) == 10 and ring.read(6) == b"a" * 6
+    assert ring.write(bytes(range(12))) == 12          # 跨越缓冲末尾
+    assert ring.read() == b"a" * 4 + bytes(range(12))
+    assert ring.write(b"x" * 20) == 16 and ring.dropped == 4
+    assert ring.available() == 16
+
+
+def _controller(dev, **gw):
+    from app.core.config import default_ops
+    from app.core.controller import Controller
+
+    ctrl = Controller({"gateway": {"type": "serial", "port": dev.port, "timeout_sec": 1.0, **gw},
+                       "ops": default_ops()})
+    assert ctrl.connect()
+    return ctrl
+
+
+@pytest.mark.parametrize("framing", ["raw", "lpb"])
+def test_serial_gateway_against_pty_device(framing):
+    pytest.importorskip("serial")
+    from app.core.sim.bus import SimBus
+    from app.core.sim.serial_device import SimSerialDevice
+    from app.core.transport.framing import make_codec
+
+    bus = SimBus([2, 7])
+    dev = SimSerialDevice(bus, codec=make_codec(framing))
+    dev.start()
+    ctrl = _controller(dev, framing=framing, frame_gap_ms=2.0, burst_frames=4)
+    try:
+        assert ctrl.scan_devices(range(10), timeout=0.1) == [2, 7]
+        t0 = time.monotonic()
+        ctrl.send_sequence([(0x04, 10 + i) for i in range(12)])
+        ctrl.send_arc("short", 77, addr_val=7)
+        assert ctrl.query_status(7, timeout=1.0) is not None
+        # 12 帧按 4 帧一段、每帧 2 ms 的间隔写出
+        assert time.monotonic() - t0 >= 0.016
+        assert bus.gear(2).level == 21 and bus.gear(7).level == 77
+        st = ctrl.transport_stats()
+        assert st["tx_frames"] >= 12 + 1 + 10 and st["rx_bytes"] > 0 and st["rx_overflow"] == 0
+        assert st["gap_wait_ms"] > 0
+    finally:
+        ctrl.close()
+        dev.stop()
+
+
+def test_serial_stats_restart_on_reconnect():
+    pytest.importorskip("serial")
+    from app.core.sim.bus import SimBus
+    from app.core.sim.serial_device import SimSerialDevice
+
+    dev = SimSerialDevice(SimBus([2]))
+    dev.start()
+    ctrl = _controller(dev)
+    try:
+        ctrl.send_sequence([(0x04, 10 + i) for i in range(8)])
+        assert ctrl.transport_stats()["tx_frames"] >= 8
+        ctrl.disconnect()
+        assert ctrl.connect()
+        # 计数与 _since 一起从重连时刻开始，tx_fps 不会被上一次连接的帧数抬高
+        assert ctrl.transport_stats()["tx_frames"] == 0
+    finally:
+        ctrl.close()
+        dev.stop()
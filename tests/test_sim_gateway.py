@@ -0,0 +1,68 @@
+from app.core.controller import Controller
+from app.core.sim.bus import SimBus
+from app.core.sim.server import SimGatewayServer
+
+
+def _sync(ctrl, short):
+    """TCP 发送不等待总线；用一次查询往返确认之前的帧都已被仿真处理。"""
+    assert ctrl.query_status(short, timeout=2.0) is not None
+
+
+def test_scan_groups_and_scenes_against_simulator(sim_ctrl):
+    bus = SimBus(shorts=[1, 5, 9])
+    ctrl = sim_ctrl(bus, timeout_sec=1.0, scan_timeout_sec=0.05)
+    assert ctrl.scan_devices(range(12)) == [1, 5, 9]
+
+    ctrl.group_add("short", 3, addr_val=5)
+    ctrl.group_add("short", 10, addr_val=5)
+    groups = ctrl.query_groups(5)
+    assert [g for g, on in groups.items() if on] == [3, 10]
+
+    ctrl.scene_store_level("short", 2, 120, addr_val=9)
+    assert ctrl.query_scene_levels(9)[2] == 120
+    ctrl.send_arc("broadcast", 0)
+    ctrl.scene_recall("short", 2, addr_val=9)
+    _sync(ctrl, 9)
+    assert bus.gear(9).level == 120 and bus.gear(1).level == 0
+
+    ctrl.send_arc("group", 77, addr_val=3)
+    _sync(ctrl, 5)
+    assert bus.gear(5).level == 77 and bus.gear(1).level == 0
+
+
+def test_dt8_colour_state_and_timing(sim_ctrl):
+    bus = SimBus(shorts=[0])
+    srv = SimGatewayServer(bus, time_scale=1.0)
+    ctrl = sim_ctrl(bus, server=srv, timeout_sec=1.0)
+    out = ctrl.dt8_set_tc_kelvin("short", 4000, addr_val=0)
+    _sync(ctrl, 0)
+    assert bus.gear(0).tc_mirek == out["mirek"] == 250
+    ctrl.dt8_set_rgbw("short", 10, 20, 30, 40, addr_val=0)
+    _sync(ctrl, 0)
+    assert bus.gear(0).primaries == {"r": 10, "g": 20, "b": 30, "w": 40}
+    # 4 + 12 帧命令 + 2 次查询，每帧至少 29 ms 的总线时间
+    st = ctrl.bus_stats()
+    assert st["frames"] == 18
+    assert srv.counters["frames_in"] == 18
+    assert st["service_mean_ms"] * st["executed"] >= 16 * 29 * 0.9
+
+
+def test_sim_gateway_type_starts_in_process_server():
+    ctrl = Controller({"gateway": {"type": "sim", "sim_gears": "2-3", "sim_time_scale": 0,
+                                   "scan_timeout_sec": 0.05}})
+    try:
+        assert ctrl.connect()
+        assert ctrl.scan_devices(range(6)) == [2, 3]
+    finally:
+        ctrl.close()
+
+
+def test_send_sequence_buffer_in_one_write(sim_ctrl):
+    bus = SimBus([1, 2, 3])
+    ctrl = sim_ctrl(bus, timeout_sec=1.0)
+    ctrl.send_sequence(bytes([0x02, 10, 0x04, 20, 0x06, 30]))
+    ctrl.send_sequence([(0x06, 31)])
+    ctrl.query_status(1, timeout=2.0)
+    assert [bus.gear(s).level for s in (1, 2, 3)] == [10, 20, 31]
+    st = ctrl.bus_stats()
+    assert st["batches"] == 2 and st["batched_frames"] == 4
@@ -0,0 +1,149 @@
+import threading
+import time
+
+from app.core.bus.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    sf = SingleFlight()
+    calls = []
+    gate = threading.Event()
+
+    def slow():
+        calls.append(1)
+        gate.wait(1.0)
+        return b"\x2a"
+
+    out = []
+    threads = [threading.Thread(target=lambda: out.append(sf.do(("q", 5, 0x90), slow))) for _ in range(6)]
+    for t in threads:
+        t.start()
+    while sf.stats()["hits"] < 5:
+        time.sleep(0.005)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert calls == [1] and out == [b"\x2a"] * 6
+    assert sf.stats() == {"hits": 5, "misses": 1, "errors": 0, "inflight": 0}
+    # 结束后不缓存：再次调用重新执行
+    sf.do(("q", 5, 0x90), slow)
+    assert len(calls) == 2
+
+
+def test_errors_propagate_to_all_waiters():
+    sf = SingleFlight()
+    gate = threading.Event()
+
+    def failing():
+        gate.wait(1.0)
+        raise RuntimeError("bus")
+
+    errors = []
+
+    def caller():
+        try:
+            sf.do("k", failing)
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=caller) for _ in range(3)]
+    for t in threads:
+        t.start()
+    while sf.stats()["hits"] < 2:
+        time.sleep(0.005)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(errors) == 3 and len({id(e) for e in errors}) == 1
+    assert sf.stats() == {"hits": 2, "misses": 1, "errors": 1, "inflight": 0}
+
+
+def test_joinable_decides_whether_to_share_an_inflight_call():
+    sf = SingleFlight()
+    gate = threading.Event()
+    calls = []
+
+    def slow(tag):
+        calls.append(tag)
+        gate.wait(1.0)
+        return tag
+
+    out = {}
+    first = threading.Thread(target=lambda: out.setdefault("a", sf.do("k", lambda: slow(1), 1)))
+    first.start()
+    while sf.stats()["inflight"] < 1:
+        time.sleep(0.005)
+    # 只肯加入 tag >= 2 的在途执行：另起一次；之后 tag <= 2 的调用方加入这两次中的第一个
+    second = threading.Thread(target=lambda: out.setdefault("b", sf.do("k", lambda: slow(2), 2,
+                                                                        lambda t: t >= 2)))
+    second.start()
+    while sf.stats()["inflight"] < 2:
+        time.sleep(0.005)
+    third = threading.Thread(target=lambda: out.setdefault("c", sf.do("k", lambda: slow(3), 3,
+                                                                       lambda t: t <= 2)))
+    third.start()
+    while sf.stats()["hits"] < 1:
+        time.sleep(0.005)
+    gate.set()
+    for t in (first, second, third):
+        t.join()
+    assert calls == [1, 2] and out == {"a": 1, "b": 2, "c": 1}
+    assert sf.stats() == {"hits": 1, "misses": 2, "errors": 0, "inflight": 0}
+
+
+def _lane_hit(ctrl, first, second, timeouts=(0.5, 0.5)) -> int:
+    """first 通道的查询在途时，second 通道的同一查询是否搭上它（返回 hits 增量）。"""
+    hits = ctrl.query_dedup_stats()["hits"]
+    inflight = ctrl.query_dedup_stats()["inflight"]
+
+    def query(lane, timeout):
+        with ctrl.lane(lane):
+            ctrl.query_status(2, timeout=timeout)
+
+    t1 = threading.Thread(target=query, args=(first, timeouts[0]))
+    t1.start()
+    while ctrl.query_dedup_stats()["inflight"] == inflight:
+        time.sleep(0.001)
+    t2 = threading.Thread(target=query, args=(second, timeouts[1]))
+    t2.start()
+    t1.join()
+    t2.join()
+    return ctrl.query_dedup_stats()["hits"] - hits
+
+
+def test_controller_dedups_concurrent_queries():
+    from app.core.config import default_ops
+    from app.core.controller import Controller
+
+    ctrl = Controller({"gateway": {"type": "sim", "sim_gears": "2", "sim_time_scale": 1.0, "timeout_sec": 0.5},
+                       "ops": default_ops()})
+    assert ctrl.connect()
+    try:
+        start = threading.Barrier(8)
+        out = []
+
+        def worker():
+            start.wait()
+            out.append(ctrl.query_status(2))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(out) == 8 and all(r is not None for r in out)
+        st = ctrl.query_dedup_stats()
+        assert st["hits"] + st["misses"] == 8 and st["hits"] > 0
+        assert ctrl.bus_stats()["frames"] == st["misses"]
+        # 不同通道：在途查询的通道不低于调用方时才加入
+        assert _lane_hit(ctrl, "interactive", "scheduled") == 1
+        assert _lane_hit(ctrl, "bulk", "interactive") == 0
+        # 超时：在途查询的超时不短于调用方时才加入
+        assert _lane_hit(ctrl, "bulk", "bulk", timeouts=(0.5, 0.3)) == 1
+        assert _lane_hit(ctrl, "bulk", "bulk", timeouts=(0.3, 0.5)) == 0
+        st = ctrl.query_dedup_stats()
+        # 写命令不经过合并
+        ctrl.send_command("short", 0x05, addr_val=2)
+        assert ctrl.query_dedup_stats()["misses"] == st["misses"]
+    finally:
+        ctrl.close()
@@ -0,0 +1,133 @@
+from app.core.sim.bus import SimBus
+from app.core.sim.server import SimUdpGateway
+from app.core.transport.aio import LoopThread
+from app.core.transport.udp_gateway import (UdpGateway, UdpHub, decode_reply, decode_request,
+                                            encode_reply, encode_request)
+
+
+def test_datagram_roundtrip():
+    pkt = encode_request(0x1234, bytes([0x05, 0xA0, 0x07, 0x90]), expect_reply=True)
+    assert decode_request(pkt) == (0x1234, True, bytes([0x05, 0xA0, 0x07, 0x90]))
+    assert decode_request(pkt[:-1]) is None
+    assert decode_reply(encode_reply(7, [b"\x2a", None])) == (7, [b"\x2a", None])
+
+
+def test_many_gateways_share_one_socket():
+    loop = LoopThread("sim-udp-test")
+    hub = UdpHub(("127.0.0.1", 0))
+    sims, gws = [], []
+    try:
+        for i in range(8):
+            sim = SimUdpGateway(SimBus([i, 10 + i]), time_scale=0, loop=loop)
+            gw = UdpGateway("127.0.0.1", sim.start(), hub=hub, timeout=0.5)
+            gw.connect()
+            sims.append(sim)
+            gws.append(gw)
+        for i, gw in enumerate(gws):
+            gw.send_many(bytes([2 * i + 1, 0x05]))     # 短地址 i：RECALL MAX
+            gw.send_many(bytes([2 * i + 1, 0xA0, 0x41, 0x90, 2 * (10 + i) + 1, 0xA0]), expect_reply=True)
+        for i, gw in enumerate(gws):
+            replies = gw.recv_replies(1.0)
+            assert replies[1] is None and replies[0] is not None and replies[2] is not None
+        assert all(sim.counters["datagrams_in"] == 3 for sim in sims)   # 含 connect 的探测包
+        assert all(gw.stats()["retransmits"] == 0 for gw in gws)
+    finally:
+        for gw in gws:
+            gw.disconnect()
+        for sim in sims:
+            sim.stop()
+        hub.close()
+        loop.stop()
+
+
+def test_loss_is_recovered_by_retransmit_without_replaying_frames():
+    bus = SimBus([3])
+    sim = SimUdpGateway(bus, time_scale=0, loss=0.3, seed=1)
+    hub = UdpHub(("127.0.0.1", 0))
+    gw = UdpGateway("127.0.0.1", sim.start(), hub=hub, rto=0.02, retries=8)
+    gw.connect()
+    try:
+        for i in range(40):
+            gw.send_many(bytes([0x07, 0xA0]), expect_reply=True)   # QUERY ACTUAL LEVEL
+            assert gw.recv_replies(2.0) == [bytes([bus.gear(3).level])]
+        st = gw.stats()
+        assert st["retransmits"] > 0 and st["lost"] == 0
+        # 重传的请求只回放缓存的应答
+        assert sim.counters["frames_in"] == 40
+    finally:
+        gw.disconnect()
+        sim.stop()
+        hub.close()
+
+
+def test_controller_over_sim_udp():
+    from app.core.config import default_ops
+    from app.core.controller import Controller
+
+    ctrl = Controller({"gateway": {"type": "sim", "sim_protocol": "udp", "sim_gears": "1,4",
+                                   "sim_time_scale": 0, "timeout_sec": 0.5}, "ops": default_ops()})
+    assert ctrl.connect()
+    try:
+        assert ctrl.scan_devices(range(8), timeout=0.2) == [1, 4]
+        ctrl.send_arc("short", 90, addr_val=4)
+        assert ctrl.query_status(4, timeout=0.5) is not None
+        assert ctrl.transport_stats()["datagrams_tx"] > 0
+    finally:
+        ctrl.close()
+
+
+def test_dead_endpoint_raises_connection_lost():
+    import socket
+
+    import pytest
+
+    from app.core.transport.base import ConnectionLost
+
+    # 绑定后不应答的端口：数据报有去无回
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    hub = UdpHub(("127.0.0.1", 0))
+    gw = UdpGateway("127.0.0.1", sink.getsockname()[1], hub=hub, rto=0.01, retries=2, timeout=0.2)
+    try:
+        with pytest.raises(ConnectionLost):
+            gw.connect()
+        assert not gw.is_connected() and gw.stats()["lost"] == 1
+    finally:
+        sink.close()
+        hub.close()
+
+
+def test_controller_reconnects_when_udp_gateway_dies():
+    import threading
+    import time
+
+    from app.core.config import default_ops
+    from app.core.controller import Controller
+
+    sim = SimUdpGateway(SimBus([1]), time_scale=0)
+    port = sim.start()
+    ctrl = Controller({"gateway": {"type": "udp", "host": "127.0.0.1", "port": port, "timeout_sec": 0.2,
+                                   "udp_rto_sec": 0.01, "udp_retries": 2, "reconnect_initial_sec": 0.05},
+                       "ops": default_ops()})
+    assert ctrl.connect()
+    try:
+        assert ctrl.scan_devices(range(4), timeout=0.1) == [1]
+        sim.loss = 1.0                                   # 网关“掉线”：所有数据报都丢
+        # 断线期间扫描程序挂起，重连后重放
+        out = []
+        t = threading.Thread(target=lambda: out.append(ctrl.scan_devices(range(4), timeout=0.1)))
+        t.start()
+        deadline = time.monotonic() + 3.0
+        while ctrl.reconnect_stats().get("disconnects", 0) < 1 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert ctrl.reconnect_stats()["disconnects"] >= 1
+        sim.loss = 0.0
+        while ctrl.reconnect_stats()["down"] and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert ctrl.reconnect_stats()["reconnects"] >= 1
+        t.join(3.0)
+        assert out == [[1]]
+        assert ctrl.scan_devices(range(4), timeout=0.1) == [1]
+    finally:
+        ctrl.close()
+        sim.stop()
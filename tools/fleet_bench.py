@@ -0,0 +1,95 @@
+# tools/fleet_bench.py
+"""用向量化仿真驱动大量网关，测量上位机侧每个网关的 CPU 与内存开销。
+
+仿真（FleetServer）跑在子进程里，本进程只承担“上位机”一侧：
+每个网关一个 AsyncTcpGateway，全部挂在同一个事件循环线程上。
+
+    python tools/fleet_bench.py --gateways 1000 --frames 20
+"""
+from __future__ import annotations
+import os, sys, time, asyncio, argparse, resource, multiprocessing as mp
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.sim.fleet import FleetBus, FleetServer           # noqa: E402
+from app.core.transport.aio import LoopThread                   # noqa: E402
+from app.core.transport.async_tcp_gateway import AsyncTcpGateway  # noqa: E402
+
+
+def _serve(n: int, time_scale: float, conn):
+    srv = FleetServer(FleetBus(n, present=range(16)), time_scale=time_scale)
+    conn.send((srv.start(), srv.fleet.nbytes()))
+    conn.recv()            # 等待结束信号
+    rounds = srv.fleet.counters["rounds"]
+    frames = srv.fleet.counters["frames"]
+    srv.stop()
+    conn.send({"rounds": rounds, "frames": frames})
+
+
+def _rss_kb() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * (os.sysconf("SC_PAGE_SIZE") // 1024)
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _cpu_s() -> float:
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    return ru.ru_utime + ru.ru_stime
+
+
+async def _drive(gws, frames: int):
+    async def one(gw):
+        for v in range(frames):
+            await gw.send(bytes([0xFE, v & 0xFF]))
+        return await gw.query(bytes([0x01, 0xA0]), timeout=5.0)
+
+    return await asyncio.gather(*(one(gw) for gw in gws))
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="多网关仿真压测：上位机侧 CPU/内存")
+    ap.add_argument("--gateways", type=int, default=200)
+    ap.add_argument("--frames", type=int, default=20, help="每个网关发送的前向帧数（另加 1 条查询）")
+    ap.add_argument("--time-scale", type=float, default=0.0, help="仿真时序倍率，0 表示不延时")
+    args = ap.parse_args(argv)
+
+    parent, child = mp.Pipe()
+    proc = mp.Process(target=_serve, args=(args.gateways, args.time_scale, child), daemon=True)
+    proc.start()
+    ports, sim_bytes = parent.recv()
+
+    loop = LoopThread("fleet-bench")
+    rss0, cpu0 = _rss_kb(), _cpu_s()
+    gws = [AsyncTcpGateway("127.0.0.1", p) for p in ports]
+    for gw in gws:
+        loop.run(gw.connect(), timeout=5.0)
+    rss1, cpu1 = _rss_kb(), _cpu_s()
+
+    t0 = time.perf_counter()
+    replies = loop.run(_drive(gws, args.frames), timeout=600.0)
+    wall = time.perf_counter() - t0
+    rss2, cpu2 = _rss_kb(), _cpu_s()
+
+    for gw in gws:
+        loop.run(gw.disconnect(), timeout=5.0)
+    loop.stop()
+    parent.send("stop")
+    sim = parent.recv()
+    proc.join(5.0)
+
+    n = len(gws)
+    ok = sum(1 for r in replies if r is not None)
+    total = n * (args.frames + 1)
+    print(f"gateways          : {n}  (answered {ok}/{n})")
+    print(f"frames            : {total} in {wall:.2f} s  ({total / wall:.0f} frames/s)")
+    print(f"sim rounds        : {sim['rounds']}  (avg batch {sim['frames'] / max(1, sim['rounds']):.1f})")
+    print(f"sim state         : {sim_bytes / 1024:.0f} KiB  ({sim_bytes / n:.0f} B/bus)")
+    print(f"host connect      : {(rss1 - rss0) / n:.1f} KiB RSS/gw, {(cpu1 - cpu0) * 1e3 / n:.2f} ms CPU/gw")
+    print(f"host traffic      : {(rss2 - rss1) / n:.1f} KiB RSS/gw, {(cpu2 - cpu1) * 1e6 / total:.1f} us CPU/frame")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())